@@ -0,0 +1,44 @@
+from typing import Type, Optional
+
+from pydantic import BaseModel, Field
+from superagi.tools.base_tool import BaseTool
+from agent_manager_helpers import dumps
+from agent_manager_helpers_data import poll_agent_run_statuses, parse_run_handle
+from agent_manager_helpers_db import tool_session
+
+
+class AgentRunStatusInput(BaseModel):
+    runs: list[str] = Field(
+        ...,
+        description="The run handles or agent execution ids to look up.",
+    )
+    timeout: Optional[int] = Field(
+        default=0,
+        description="The maximum number of seconds to wait until one of the runs changes. 0 only looks them up.",
+    )
+
+class AgentRunStatusTool(BaseTool):
+    """
+    Agent Run Status tool
+    Attributes:
+        name : The name.
+        args_schema : The args schema.
+        description : The description.
+        agent_id : Current agent id
+        agent_execution : Current agent execution
+    """
+    name: str = "Agent Run Status Tool"
+    args_schema: Type[AgentRunStatusInput] = AgentRunStatusInput
+    description: str = "Looks up the status, call and token counters and feed length of many agent runs at once, optionally waiting until one of them changes. Cheaper than the Await Agent Run Tool when only the progress is needed."
+    agent_id: int = None
+    agent_execution_id: int = None
+
+    def _execute(self, runs: list, timeout: int = 0):
+        """
+        Execute the Agent Run Status Tool.
+        Returns:
+            The status of every run, in the order given, and the runs that changed while waiting
+        """
+        agent_execution_ids = [parse_run_handle(run)[1] for run in runs]
+        with tool_session(self.toolkit_config) as session:
+            return dumps(poll_agent_run_statuses(session, agent_execution_ids, timeout, self.agent_execution_id))
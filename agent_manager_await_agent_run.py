@@ -0,0 +1,61 @@
+from typing import Type, Optional
+
+from pydantic import BaseModel, Field
+from superagi.tools.base_tool import BaseTool
+from agent_manager_helpers_data import await_agent_runs
+from agent_manager_helpers_db import tool_session
+from agent_manager_helpers_projection import project_run_result
+
+
+class AwaitAgentRunInput(BaseModel):
+    handles: list[str] = Field(
+        ...,
+        description="The run handles returned when the runs were started without waiting.",
+    )
+    timeout: Optional[int] = Field(
+        default=0,
+        description="The maximum number of seconds to wait. 0 only checks the runs.",
+    )
+    return_when_any: Optional[bool] = Field(
+        default=False,
+        description="Return as soon as one of the runs has finished.",
+    )
+    return_feed: Optional[bool] = Field(
+        default=True,
+        description="Return the feed entries written since the handle was issued.",
+    )
+    output_profile: Optional[str] = Field(
+        default="full",
+        description="\"full\" returns every field, \"summary\" only the key fields of the execution and resources.",
+    )
+    compact: Optional[bool] = Field(
+        default=False,
+        description="Return the resources as a table (column names once, then rows).",
+    )
+
+class AwaitAgentRunTool(BaseTool):
+    """
+    Await Agent Run tool
+    Attributes:
+        name : The name.
+        args_schema : The args schema.
+        description : The description.
+        agent_id : Current agent id
+        agent_execution : Current agent execution
+    """
+    name: str = "Await Agent Run Tool"
+    args_schema: Type[AwaitAgentRunInput] = AwaitAgentRunInput
+    description: str = "Checks on, or waits for, agent runs started without waiting. Returns their status, new feed entries, resources once finished and updated handles for the next check."
+    agent_id: int = None
+    agent_execution_id: int = None
+
+    def _execute(self, handles: list, timeout: int = 0, return_when_any: bool = False, return_feed: bool = True,
+                 output_profile: str = "full", compact: bool = False):
+        """
+        Execute the Await Agent Run Tool.
+        Returns:
+            The status of every run, in the order of the handles
+        """
+        with tool_session(self.toolkit_config) as session:
+            result = await_agent_runs(session, handles, timeout, return_when_any, return_feed, self.agent_execution_id)
+            return project_run_result(result, output_profile, compact)
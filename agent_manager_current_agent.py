@@ -1,10 +1,12 @@
 import json
  
-from typing import Type 
-from pydantic import BaseModel
+from typing import Type, Optional
+from pydantic import BaseModel, Field
 
 from superagi.tools.base_tool import BaseTool
 from superagi.models.agent import Agent
+from agent_manager_helpers_db import tool_session
+from agent_manager_helpers_projection import project, resolve_fields
 
 from datetime import date, datetime
 
@@ -16,7 +18,14 @@ class DateTimeEncoder(json.JSONEncoder):
         return super().default(obj)
     
 class CurrentAgentInput(BaseModel):
-    pass
+    fields: Optional[list[str]] = Field(
+        default=None,
+        description="The agent fields to return. Leave empty for the profile's fields.",
+    )
+    profile: Optional[str] = Field(
+        default="full",
+        description="\"full\" returns every field, \"summary\" only id, name and description.",
+    )
 
 
 class CurrentAgentTool(BaseTool):
@@ -36,7 +45,7 @@ class CurrentAgentTool(BaseTool):
     agent_id: int = None
     agent_execution_id: int = None    
 
-    def _execute(self):
+    def _execute(self, fields: Optional[list[str]] = None, profile: str = "full"):
         """
         Execute the Current Agent tool.
 
@@ -61,7 +70,8 @@ class CurrentAgentTool(BaseTool):
             "user_timezone": None
         } 
         """
-        agent = Agent.get_agent_from_id(session=self.toolkit_config.session, agent_id=self.agent_id)
-        agent_dict = {column.name: getattr(agent, column.name) for column in agent.__table__.columns}
+        with tool_session(self.toolkit_config) as session:
+            agent = Agent.get_agent_from_id(session=session, agent_id=self.agent_id)
+            agent_dict = project(agent, resolve_fields("agent", fields, profile))
         return json.dumps(agent_dict, cls=DateTimeEncoder)
 
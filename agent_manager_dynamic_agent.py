@@ -1,13 +1,14 @@
-from sqlalchemy.orm import Session
-from typing import Any, List, Type, Optional
-from pydantic import BaseModel, Field
+from typing import Type, Optional
+from pydantic import BaseModel, Field, PrivateAttr
 from superagi.tools.base_tool import BaseTool
 import traceback
-from agent_manager_helpers_data import get_agents, execute_save_scheduled_agent_tool, get_toolkit_by_name, add_or_update, get_agent, get_tool_by_class_name
-from sqlalchemy.orm import sessionmaker
-from superagi.models.db import connect_db
+from agent_manager_helpers_data import execute_save_scheduled_agent_tool, get_agent_goal
+from superagi.config.config import get_config
 from superagi.lib.logger import logger
 from agent_manager_helpers_resources import ResourceManager
+from agent_manager_helpers_cache import get_agent_catalog, render_agent_lines
+from agent_manager_helpers_db import tool_session
+from agent_manager_helpers_projection import project_run_result
 
 class DynamicAgentToolInput(BaseModel):
     target_agent_id: int = Field(
@@ -16,12 +17,28 @@ class DynamicAgentToolInput(BaseModel):
     )
     wait_for_complete: bool = Field(
         ...,
-        description="(Recommend True) Wait for the agent to finish.",
+        description="(Recommend True) Wait for the agent to finish. Otherwise the returned handle can be checked with the Await Agent Run Tool.",
     )
     return_feed: Optional[bool] = Field(
         ...,
         description="(Recommended for Errors) Return the result feed (requires wait for finish to be true).",
     )
+    output_profile: Optional[str] = Field(
+        default="full",
+        description="\"full\" returns every field, \"summary\" only the key fields of the execution and resources.",
+    )
+    compact: Optional[bool] = Field(
+        default=False,
+        description="Return the resources as a table (column names once, then rows).",
+    )
+    priority: Optional[int] = Field(
+        default=0,
+        description="Start priority when runs are queued by concurrency limits, higher starts first.",
+    )
+    feed_token_budget: Optional[int] = Field(
+        default=None,
+        description="Return a digest of the feed (final result, errors and latest entries) of at most this many tokens instead of the full feed.",
+    )
 
 
 def static_init(cls):
@@ -44,6 +61,8 @@ class DynamicAgentTool(BaseTool):
 
     DynamicAgentToolName: str = "Dynamic Agent Tool"
     DynamicAgentToolDescription: str = ""
+    # ((agent_id, agent_execution_id), description) of the last shortlist built by this instance
+    _agents_description: tuple = PrivateAttr(default=None)
 
     @classmethod
     def static_init(cls):
@@ -55,47 +74,64 @@ class DynamicAgentTool(BaseTool):
         if not hasattr(cls, "DynamicAgentToolDescription"):
             setattr(cls, "DynamicAgentToolDescription", description)
             setattr(cls, "description", description)
+        # pydantic drops properties named like fields from the class body, so it is installed here
+        cls.description = property(cls.get_description)
 
     def __init__(self):
         super().__init__()
-        self.set_attributes()
+        # No database access while building the tool, the agent list is loaded when the description
+        # is first read
+        self.name = DynamicAgentTool.DynamicAgentToolName if DynamicAgentTool.DynamicAgentToolName is not None else "Dynamic Agent Tool"
+
+    def get_description(self):
+        """
+        Returns the description of this instance, listing the agents it can run.
+
+        Built on first read, once SuperAGI has bound the tool to its execution, and again if it is
+        bound to another one, since the shortlist follows the execution's goal.
+        """
+        if self._agents_description is None or self._agents_description[0] != (self.agent_id, self.agent_execution_id):
+            self.set_attributes()
+        return self._agents_description[1] if self._agents_description is not None else self.__dict__.get("description")
 
     def set_attributes(self):
         try:
             self.name = DynamicAgentTool.DynamicAgentToolName if DynamicAgentTool.DynamicAgentToolName is not None else "Dynamic Agent Tool"
 
-            session = None
-
-            if not bool(self.toolkit_config) and not bool(self.toolkit_config.session):
-                session = self.toolkit_config.session
-            else:
-                engine = connect_db()
-                Session = sessionmaker(bind=engine)
-                session = Session()
-
-            target_tool = get_tool_by_class_name(session, self.__class__.__name__)
-
-            if bool(target_tool):
-                agents = get_agents(session, target_tool.toolkit_id).agents
-
-                DynamicAgentTool.DynamicAgentToolDescription = "Run other agents as tools.\n\r<br>Available Agents: (id, name, description):\n\r<br>"
-                for agent in agents:
-                    DynamicAgentTool.DynamicAgentToolDescription = DynamicAgentTool.DynamicAgentToolDescription + f"{agent.id}, {agent.name}, {agent.description}\n\r<br> | "
-
-                self.description = DynamicAgentTool.DynamicAgentToolDescription
+            with tool_session(self.toolkit_config) as session:
+                catalog = get_agent_catalog()
+                toolkit_id = catalog.get_toolkit_id(lambda: session, self.__class__.__name__)
+                if toolkit_id is None:
+                    return
+                entry = catalog.get(lambda: session, toolkit_id)
+
+                # Large catalogs are cut down to the agents most relevant to the caller's goal
+                top_k = int(get_config("AGENT_MANAGER_DYNAMIC_AGENT_TOP_K", 25))
+                if top_k <= 0 or len(entry.agents) <= top_k:
+                    agents_header = "Available Agents: (id, name, description):"
+                    agent_lines = entry.agent_lines
+                else:
+                    goal = get_agent_goal(session, self.agent_id, self.agent_execution_id) if self.agent_id is not None else ""
+                    agents_header = f"The {top_k} most relevant of {len(entry.agents)} Available Agents, find the others with the Search Agent Tool: (id, name, description):"
+                    agent_lines = render_agent_lines(entry.index.shortlist(goal, top_k))
+
+            self._agents_description = ((self.agent_id, self.agent_execution_id),
+                                        "Run other agents as tools.\n\r<br>" + agents_header + "\n\r<br>" + agent_lines)
         except:
-            logger.error(traceback.print_exc())
-
-    def _execute(self, target_agent_id: int = -1, wait_for_complete: bool = True, return_feed: bool = False):
-        self.set_attributes()
+            logger.error(traceback.format_exc())
 
-        resource_manager_obj = ResourceManager(target_agent_id, self.toolkit_config.session)
-        
-        files = resource_manager_obj.get_all_resources(self.agent_execution_id)
+    def _execute(self, target_agent_id: int = -1, wait_for_complete: bool = True, return_feed: bool = False,
+                 output_profile: str = "full", compact: bool = False, priority: int = 0,
+                 feed_token_budget: int = None):
+        with tool_session(self.toolkit_config) as session:
+            resource_manager_obj = ResourceManager(self.agent_id, session)
+            
+            files = resource_manager_obj.get_all_resources(self.agent_execution_id)
 
-        fileList: list[str] = []
+            fileList: list[str] = []
 
-        for file in files:
-            fileList.extend(file.name)
+            for file in files:
+                fileList.append(file.name)
 
-        return execute_save_scheduled_agent_tool(self.toolkit_config.session, self.agent_id, self.agent_execution_id, target_agent_id, fileList, wait_for_complete, return_feed)
\ No newline at end of file
+            result = execute_save_scheduled_agent_tool(session, self.agent_id, self.agent_execution_id, target_agent_id, fileList, wait_for_complete, return_feed, priority, feed_token_budget)
+            return project_run_result(result, output_profile, compact)
\ No newline at end of file
@@ -0,0 +1,80 @@
+from typing import Type, Optional
+
+from pydantic import BaseModel, Field
+from superagi.tools.base_tool import BaseTool
+from agent_manager_helpers_data import execute_fan_out_agent_tool
+from agent_manager_helpers_db import tool_session
+from agent_manager_helpers_projection import project_run_result
+
+
+class FanOutAgentJob(BaseModel):
+    target_agent_id: int = Field(
+        ...,
+        description="The agent id to create a run for.",
+    )
+    files_for_agent_run: list[str] = Field(
+        default=[],
+        description="A list of files to attach to the execution.",
+    )
+    priority: Optional[int] = Field(
+        default=0,
+        description="Start priority when runs are queued by concurrency limits, higher starts first.",
+    )
+
+class FanOutAgentInput(BaseModel):
+    jobs: list[FanOutAgentJob] = Field(
+        ...,
+        description="The agents to run at the same time, each with the files to attach (at most 20 by default).",
+    )
+    max_concurrency: Optional[int] = Field(
+        default=5,
+        description="The maximum number of agents running at the same time.",
+    )
+    job_timeout: Optional[int] = Field(
+        default=600,
+        description="The maximum number of seconds to wait for each agent, 0 for the default (at most 600 by default).",
+    )
+    return_feed: Optional[bool] = Field(
+        default=False,
+        description="Return the result feed of each agent.",
+    )
+    feed_token_budget: Optional[int] = Field(
+        default=None,
+        description="Return a digest of the feed (final result, errors and latest entries) of at most this many tokens instead of the full feed.",
+    )
+    output_profile: Optional[str] = Field(
+        default="full",
+        description="\"full\" returns every field, \"summary\" only the key fields of the execution and resources.",
+    )
+    compact: Optional[bool] = Field(
+        default=False,
+        description="Return the resources as a table (column names once, then rows).",
+    )
+
+class FanOutAgentTool(BaseTool):
+    """
+    Fan Out Agent tool
+    Attributes:
+        name : The name.
+        args_schema : The args schema.
+        description : The description.
+        agent_id : Current agent id
+        agent_execution : Current agent execution
+    """
+    name: str = "Fan Out Agent Tool"
+    args_schema: Type[FanOutAgentInput] = FanOutAgentInput
+    description: str = "Creates new runs for several agents at once, waits for all of them to finish and returns the combined results."
+    agent_id: int = None
+    agent_execution_id: int = None
+
+    def _execute(self, jobs: list, max_concurrency: int = 5, job_timeout: int = 600, return_feed: bool = False,
+                 feed_token_budget: int = None, output_profile: str = "full", compact: bool = False):
+        """
+        Execute the Fan Out Agent Tool.
+        Returns:
+            The combined results of all the runs, in the order of the jobs
+        """
+        jobs = [job.dict() if isinstance(job, BaseModel) else job for job in jobs]
+        with tool_session(self.toolkit_config) as session:
+            result = execute_fan_out_agent_tool(session, self.agent_id, self.agent_execution_id, jobs, max_concurrency, job_timeout, return_feed, feed_token_budget)
+            return project_run_result(result, output_profile, compact)
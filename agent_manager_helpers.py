@@ -1,42 +1,117 @@
-
 from sqlalchemy.ext.declarative import DeclarativeMeta
-from dataclasses import dataclass, asdict
 from sqlalchemy import inspect
 import decimal
+import json
 from datetime import date, datetime, time, timedelta
 from collections.abc import Iterable
 from sqlalchemy.orm.collections import InstrumentedList
 from uuid import UUID
 from enum import Enum
 
+from superagi.config.config import get_config
+
+try:
+    import orjson
+except ImportError:  # optional fast JSON backend
+    orjson = None
+
+# Encoders resolved per concrete class, and mapped column keys per ORM class
+_encoders = {}
+_column_keys = {}
+
+_PRIMITIVE_TYPES = frozenset((str, int, float, bool, type(None)))
+
+_json_backend = str(get_config("AGENT_MANAGER_JSON_BACKEND", "json")).lower()
+
+
+def get_column_keys(cls):
+    """
+    Returns the mapped column attribute keys of an ORM class, computed once per class.
+    """
+    keys = _column_keys.get(cls)
+    if keys is None:
+        keys = tuple(column.key for column in inspect(cls).column_attrs)
+        _column_keys[cls] = keys
+    return keys
+
+def _encode_orm(obj):
+    return {key: getattr(obj, key) for key in get_column_keys(type(obj))}
+
+def _encode_isoformat(obj):
+    return obj.isoformat()
+
+def _encode_iterable(obj):
+    return [serialize(item) for item in obj]
+
+def _resolve_encoder(cls):
+    if issubclass(cls, (datetime, date, time)):
+        return _encode_isoformat
+    elif issubclass(cls, timedelta):
+        return str
+    elif isinstance(cls, DeclarativeMeta):  # Handle all SQLAlchemy objects
+        return _encode_orm
+    elif issubclass(cls, UUID):  # Handle UUID objects.
+        return str
+    elif issubclass(cls, decimal.Decimal):  # Handle Decimal objects.
+        return float
+    elif issubclass(cls, Enum):  # Handle Enum objects.
+        return lambda obj: obj.name
+    elif issubclass(cls, (InstrumentedList, Iterable)):  # Handle SQLAlchemy relationship objects and other iterables.
+        return _encode_iterable
+    return None
+
 def json_serial(obj):
-    if isinstance(obj, (datetime, date, time)):
-        return obj.isoformat()
-    elif isinstance(obj, timedelta):
-        return str(obj)
-    elif isinstance(type(obj), DeclarativeMeta):  # Handle all SQLAlchemy objects
-        return {c.key: getattr(obj, c.key) for c in inspect(obj).mapper.column_attrs}
-    elif isinstance(obj, UUID):  # Handle UUID objects.
-        return str(obj)
-    elif isinstance(obj, decimal.Decimal):  # Handle Decimal objects.
-        return float(obj)
-    elif isinstance(obj, Enum):  # Handle Enum objects.
-        return obj.name
-    elif isinstance(obj, InstrumentedList):  # Handle SQLAlchemy relationship objects.
-        return [serialize(elem) for elem in obj]
-    elif isinstance(obj, Iterable):
-        return [serialize(item) for item in obj]
-    raise TypeError("Type %s not serializable" % type(obj)) 
+    cls = type(obj)
+    encoder = _encoders.get(cls)
+    if encoder is None:
+        encoder = _resolve_encoder(cls)
+        if encoder is None:
+            raise TypeError("Type %s not serializable" % cls)
+        _encoders[cls] = encoder
+    return encoder(obj)
 
 def serialize(obj):
-    if type(obj) is list:
-        return [serialize(i) for i in obj]
-    elif isinstance(obj, (str, int, float, bool)) or obj is None:
+    """
+    Convert `obj` into JSON-safe values, encoding other values with `json_serial`.
+
+    Lists and dicts whose items are already JSON-safe are returned as they are rather than copied,
+    so callers must not rely on getting a fresh container back.
+    """
+    cls = type(obj)
+    if cls in _PRIMITIVE_TYPES:
         return obj
-    elif isinstance(obj, dict):
-        obj = obj.copy()
-        for key in obj:
-            obj[key] = serialize(obj[key])
+    elif cls is list:
+        serialized = None
+        for index, item in enumerate(obj):
+            value = serialize(item)
+            if value is not item:
+                if serialized is None:
+                    serialized = list(obj)
+                serialized[index] = value
+        return obj if serialized is None else serialized
+    elif isinstance(obj, (str, int, float, bool)):
         return obj
+    elif isinstance(obj, dict):
+        serialized = None
+        for key, item in obj.items():
+            value = serialize(item)
+            if value is not item:
+                if serialized is None:
+                    serialized = obj.copy()
+                serialized[key] = value
+        return obj if serialized is None else serialized
     else:
-        return json_serial(obj)
\ No newline at end of file
+        # e.g. ORM objects, whose columns may hold datetimes or Enums in turn
+        return serialize(json_serial(obj))
+
+def dumps(obj):
+    """
+    Encode `obj` as a JSON string, using `json_serial` for values JSON does not support.
+
+    When AGENT_MANAGER_JSON_BACKEND is "orjson" and orjson is installed it is used instead of the
+    standard library. It writes compact JSON. The values are converted with `serialize` first, so
+    they are encoded as with the standard library, e.g. Enums by name rather than orjson's value.
+    """
+    if orjson is not None and _json_backend == "orjson":
+        return orjson.dumps(serialize(obj), default=json_serial, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=json_serial)
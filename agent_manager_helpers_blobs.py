@@ -0,0 +1,435 @@
+import argparse
+import hashlib
+import os
+import shutil
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from superagi.config.config import get_config
+from superagi.models.resource import Resource
+from superagi.types.storage_types import StorageType
+from superagi.lib.logger import logger
+from agent_manager_models import ResourceBlob, ResourceBlobRef, ensure_agent_manager_tables
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # ioctl request for copy-on-write clones (btrfs, xfs)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_reflink_support = {}
+_warned_roots = set()
+
+
+class HashingReader:
+    """
+    Read-only wrapper around a file object that counts and hashes the bytes read through it.
+
+    It deliberately exposes no seek/tell so uploaders read it strictly front to back, which keeps
+    the size and hash correct while the file is streamed.
+
+    Args:
+        file (File): The file object to read from.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    def read(self, size=-1):
+        chunk = self.file.read(size)
+        if chunk:
+            self.size += len(chunk)
+            self._hash.update(chunk)
+        return chunk
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+def write_chunks(reader, file_path, chunk_size):
+    """
+    Streams `reader` into `file_path` in fixed-size chunks.
+
+    The data is written to a temporary file next to the target and moved into place once complete,
+    so readers never see a partial file.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    partial_path = f"{file_path}.{uuid.uuid4().hex}.part"
+    try:
+        with open(partial_path, "wb") as f:
+            while True:
+                chunk = reader.read(chunk_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+        os.replace(partial_path, file_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+
+def clone_file(source_path, target_path, allow_copy=True):
+    """
+    Makes `target_path` an independent copy of `source_path` and returns the file size.
+
+    The copy is a copy-on-write clone where the filesystem supports it, so the bytes are shared
+    until either file is written, and a kernel-side copy otherwise. Never a hard link: writing to
+    one file must not change the other. The copy is moved into place once complete.
+
+    Raises:
+        OSError: If `allow_copy` is False and the file cannot be cloned.
+    """
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    partial_path = f"{target_path}.{uuid.uuid4().hex}.part"
+    try:
+        if not _reflink(source_path, partial_path):
+            if not allow_copy:
+                raise OSError(f"{source_path} cannot be cloned to {target_path}")
+            # copyfile uses sendfile on Linux, so the bytes still never pass through Python
+            shutil.copyfile(source_path, partial_path)
+        os.replace(partial_path, target_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return os.path.getsize(target_path)
+
+
+def supports_reflink(directory):
+    """
+    Returns whether files in `directory` can be cloned copy-on-write, checked once per directory.
+    """
+    directory = os.path.abspath(directory)
+    if directory not in _reflink_support:
+        os.makedirs(directory, exist_ok=True)
+        probe_path = os.path.join(directory, f".reflink-{uuid.uuid4().hex}")
+        try:
+            with open(probe_path, "wb") as f:
+                f.write(b"probe")
+            _reflink_support[directory] = _reflink(probe_path, f"{probe_path}.clone")
+        finally:
+            for path in (probe_path, f"{probe_path}.clone"):
+                if os.path.exists(path):
+                    os.remove(path)
+    return _reflink_support[directory]
+
+
+def _reflink(source_path, target_path):
+    """
+    Clones `source_path` into `target_path` on filesystems with copy-on-write support.
+
+    Returns:
+        bool: Whether the clone was made.
+    """
+    if fcntl is None:
+        return False
+    try:
+        with open(source_path, "rb") as source, open(target_path, "wb") as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        return True
+    except OSError:
+        return False
+
+
+class BlobStore:
+    """
+    Content-addressed store keeping every distinct resource content once, under its SHA-256.
+
+    For FILE storage the blobs live under AGENT_MANAGER_BLOB_ROOT and the per-agent resource paths
+    SuperAGI reads from are copy-on-write clones of them (see `clone_file`), so an agent writing to
+    its file never changes the blob or the other agents' files. For S3 the per-agent keys are
+    server-side copies of the blob. Each resource using a blob is recorded in
+    `agent_manager_resource_blob_refs` and counted in the blob's `ref_count`; `collect_garbage`
+    deletes blobs nobody references anymore.
+
+    Args:
+        db_session (Session): The session to make changes to the database.
+        s3 (S3.Client, optional): The client to use for S3 storage.
+    """
+
+    S3_PREFIX = "resources/blobs"
+
+    def __init__(self, db_session, s3=None):
+        self.db_session = db_session
+        self.s3 = s3
+        self.storage_type = StorageType.get_storage_type(get_config("STORAGE_TYPE", StorageType.FILE.value))
+        self.root = get_config("AGENT_MANAGER_BLOB_ROOT", "workspace/blobs")
+        ensure_agent_manager_tables(db_session.get_bind())
+
+    @staticmethod
+    def is_enabled():
+        """
+        Returns whether AGENT_MANAGER_DEDUP_RESOURCES is enabled and usable.
+
+        On FILE storage without copy-on-write support every per-agent file would be a full copy of
+        its blob, so the store is not used there and a warning is logged.
+        """
+        if str(get_config("AGENT_MANAGER_DEDUP_RESOURCES", "false")).lower() != "true":
+            return False
+        storage_type = StorageType.get_storage_type(get_config("STORAGE_TYPE", StorageType.FILE.value))
+        root = get_config("AGENT_MANAGER_BLOB_ROOT", "workspace/blobs")
+        if storage_type == StorageType.FILE and not supports_reflink(root):
+            if root not in _warned_roots:
+                _warned_roots.add(root)
+                logger.warning(f"AGENT_MANAGER_DEDUP_RESOURCES is ignored, {root} does not support copy-on-write clones")
+            return False
+        return True
+
+    def get_blob_path(self, digest):
+        if self.storage_type == StorageType.S3:
+            return f"{self.S3_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}"
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, file, chunk_size, transfer_config=None):
+        """
+        Streams a file into the store and returns its blob, reusing an existing one with the same content.
+
+        The content is written to a temporary location while it is hashed, then moved under its digest
+        (or dropped if that digest is already stored). The blob's reference count is not changed; call
+        `add_reference` once the resource using it exists.
+
+        Args:
+            file (File): The file object to read from.
+            chunk_size (int): Bytes per chunk.
+            transfer_config (TransferConfig, optional): Multipart settings for S3.
+
+        Returns:
+            ResourceBlob: The blob holding the content.
+        """
+        reader = HashingReader(file)
+        if self.storage_type == StorageType.S3:
+            bucket_name = get_config("BUCKET_NAME")
+            temp_key = f"{self.S3_PREFIX}/tmp/{uuid.uuid4().hex}"
+            self.s3.upload_fileobj(reader, bucket_name, temp_key, Config=transfer_config)
+            blob_path = self.get_blob_path(reader.hexdigest())
+            try:
+                if not self._object_exists(bucket_name, blob_path):
+                    self.s3.copy({"Bucket": bucket_name, "Key": temp_key}, bucket_name, blob_path)
+            finally:
+                self.s3.delete_object(Bucket=bucket_name, Key=temp_key)
+        else:
+            temp_path = os.path.join(self.root, "tmp", uuid.uuid4().hex)
+            write_chunks(reader, temp_path, chunk_size)
+            blob_path = self.get_blob_path(reader.hexdigest())
+            if os.path.exists(blob_path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(temp_path, blob_path)
+
+        return self._register_blob(reader.hexdigest(), blob_path, reader.size)
+
+    def add_reference(self, resource_id, digest):
+        """
+        Records that a resource uses a blob. Part of the caller's transaction, which must commit it.
+        """
+        self.db_session.add(ResourceBlobRef(resource_id=resource_id, digest=digest))
+        self.db_session.execute(update(ResourceBlob.__table__)
+                                .where(ResourceBlob.__table__.c.digest == digest)
+                                .values(ref_count=ResourceBlob.__table__.c.ref_count + 1,
+                                        updated_at=datetime.now()))
+
+    def release(self, resource_id):
+        """
+        Drops a resource's reference to its blob. Part of the caller's transaction, which must commit it.
+
+        Returns:
+            bool: Whether the resource referenced a blob.
+        """
+        ref = self.db_session.query(ResourceBlobRef).filter(ResourceBlobRef.resource_id == resource_id).first()
+        if ref is None:
+            return False
+        self.db_session.delete(ref)
+        self.db_session.execute(update(ResourceBlob.__table__)
+                                .where(ResourceBlob.__table__.c.digest == ref.digest)
+                                .values(ref_count=ResourceBlob.__table__.c.ref_count - 1,
+                                        updated_at=datetime.now()))
+        return True
+
+    def get_blobs_by_file_name(self, agent_execution_id, file_names):
+        """
+        Finds the blobs behind the named resources of an execution, in one query.
+
+        Returns:
+            dict: Resource name to ResourceBlob, for the resources stored in the blob store.
+        """
+        rows = self.db_session.query(Resource.name, ResourceBlob) \
+            .join(ResourceBlobRef, ResourceBlobRef.resource_id == Resource.id) \
+            .join(ResourceBlob, ResourceBlob.digest == ResourceBlobRef.digest) \
+            .filter(Resource.agent_execution_id == agent_execution_id, Resource.name.in_(list(file_names))) \
+            .all()
+        return {name: blob for name, blob in rows}
+
+    def collect_garbage(self, grace_seconds=None):
+        """
+        Deletes blobs that no resource references anymore.
+
+        References held by deleted resources are released first. Blobs touched within the last
+        `grace_seconds` are kept, so content that is being stored right now is never collected.
+
+        Args:
+            grace_seconds (float, optional): Minimum idle time, AGENT_MANAGER_BLOB_GC_GRACE by default.
+
+        Returns:
+            int: The number of blobs deleted.
+        """
+        if grace_seconds is None:
+            grace_seconds = float(get_config("AGENT_MANAGER_BLOB_GC_GRACE", 3600))
+
+        orphaned_refs = self.db_session.query(ResourceBlobRef.resource_id) \
+            .outerjoin(Resource, Resource.id == ResourceBlobRef.resource_id) \
+            .filter(Resource.id.is_(None)).all()
+        for (resource_id,) in orphaned_refs:
+            self.release(resource_id)
+        self.db_session.commit()
+
+        cutoff = datetime.now() - timedelta(seconds=grace_seconds)
+        blobs = self.db_session.query(ResourceBlob).filter(ResourceBlob.ref_count <= 0,
+                                                           ResourceBlob.updated_at < cutoff).all()
+        deleted = 0
+        for blob in blobs:
+            try:
+                if blob.storage_type == StorageType.S3.value:
+                    self.s3.delete_object(Bucket=get_config("BUCKET_NAME"), Key=blob.path)
+                elif os.path.exists(blob.path):
+                    os.remove(blob.path)
+                self.db_session.delete(blob)
+                deleted += 1
+            except Exception:
+                logger.error(f"Error occured while deleting blob {blob.digest}.\n\n{traceback.format_exc()}")
+        self.db_session.commit()
+
+        logger.info(f"collect_garbage: released {len(orphaned_refs)} orphaned references, deleted {deleted} blobs")
+        return deleted
+
+    def migrate_existing(self, batch_size=100):
+        """
+        Moves resources stored before deduplication was enabled into the blob store.
+
+        Local files are hashed and cloned into the store when their content is new, and duplicates
+        are replaced by clones of their blob. Files are never copied, so nothing is migrated where
+        AGENT_MANAGER_BLOB_ROOT does not support copy-on-write clones. S3 objects are hashed and
+        copied server-side to their blob key if new; the resources keep their per-agent keys.
+        Resources that fail are logged and skipped.
+
+        Args:
+            batch_size (int): Resources migrated per transaction.
+
+        Returns:
+            int: The number of resources migrated.
+        """
+        if self.storage_type == StorageType.FILE and not supports_reflink(self.root):
+            logger.warning(f"migrate_existing: {self.root} does not support copy-on-write clones, nothing migrated")
+            return 0
+
+        migrated = 0
+        failed = set()
+        while True:
+            query = self.db_session.query(Resource) \
+                .outerjoin(ResourceBlobRef, ResourceBlobRef.resource_id == Resource.id) \
+                .filter(ResourceBlobRef.resource_id.is_(None), Resource.storage_type == self.storage_type.value)
+            if failed:
+                query = query.filter(Resource.id.notin_(failed))
+            resources = query.order_by(Resource.id).limit(batch_size).all()
+            if not resources:
+                break
+
+            for resource in resources:
+                try:
+                    blob = self._migrate_resource(resource)
+                    self.add_reference(resource.id, blob.digest)
+                    migrated += 1
+                except Exception:
+                    failed.add(resource.id)
+                    logger.error(f"Error occured while migrating resource {resource.id}.\n\n{traceback.format_exc()}")
+            self.db_session.commit()
+
+        logger.info(f"migrate_existing: migrated {migrated} resources, {len(failed)} failed")
+        return migrated
+
+    def _migrate_resource(self, resource):
+        if self.storage_type == StorageType.S3:
+            bucket_name = get_config("BUCKET_NAME")
+            body = self.s3.get_object(Bucket=bucket_name, Key=resource.path)["Body"]
+            digest, size = self._hash_stream(body)
+            blob_path = self.get_blob_path(digest)
+            if not self._object_exists(bucket_name, blob_path):
+                self.s3.copy({"Bucket": bucket_name, "Key": resource.path}, bucket_name, blob_path)
+        else:
+            with open(resource.path, "rb") as f:
+                digest, size = self._hash_stream(f)
+            blob_path = self.get_blob_path(digest)
+            if not os.path.exists(blob_path):
+                clone_file(resource.path, blob_path, allow_copy=False)
+            else:
+                try:
+                    clone_file(blob_path, resource.path, allow_copy=False)
+                except OSError:
+                    # e.g. the resource lives on another filesystem, it keeps its own blocks
+                    pass
+        return self._register_blob(digest, blob_path, size)
+
+    def _register_blob(self, digest, path, size):
+        blob = self.db_session.query(ResourceBlob).filter(ResourceBlob.digest == digest).first()
+        if blob is not None:
+            # Touch the blob so garbage collection leaves it alone until the new reference is added
+            blob.updated_at = datetime.now()
+            self.db_session.flush()
+            return blob
+        try:
+            with self.db_session.begin_nested():
+                blob = ResourceBlob(digest=digest, storage_type=self.storage_type.value, path=path, size=size,
+                                    ref_count=0)
+                self.db_session.add(blob)
+        except IntegrityError:
+            # Registered concurrently by another session
+            blob = self.db_session.query(ResourceBlob).filter(ResourceBlob.digest == digest).first()
+        return blob
+
+    def _object_exists(self, bucket_name, key):
+        try:
+            self.s3.head_object(Bucket=bucket_name, Key=key)
+            return True
+        except self.s3.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    @staticmethod
+    def _hash_stream(stream):
+        reader = HashingReader(stream)
+        while reader.read(HASH_CHUNK_SIZE):
+            pass
+        return reader.hexdigest(), reader.size
+
+
+if __name__ == "__main__":
+    from agent_manager_helpers_db import session_scope
+    from agent_manager_helpers_resources import ResourceManager
+
+    parser = argparse.ArgumentParser(description="Maintain the agent manager resource blob store.")
+    parser.add_argument("command", choices=["migrate", "gc"],
+                        help="migrate: move existing resources into the store. gc: delete unreferenced blobs.")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--grace-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    try:
+        with session_scope() as session:
+            blob_store = BlobStore(session, ResourceManager.s3)
+            if args.command == "migrate":
+                print(f"Migrated {blob_store.migrate_existing(args.batch_size)} resources.")
+            else:
+                print(f"Deleted {blob_store.collect_garbage(args.grace_seconds)} blobs.")
+    except Exception:
+        logger.error(traceback.format_exc())
+        raise SystemExit(1)
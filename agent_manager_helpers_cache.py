@@ -0,0 +1,255 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import func
+
+from superagi.config.config import get_config
+from superagi.models.agent import Agent
+from superagi.models.agent_config import AgentConfiguration
+from agent_manager_helpers_search import AgentSearchIndex
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe cache whose entries expire after `ttl` seconds.
+
+    When `maxsize` is set the least recently used entries are evicted first.
+
+    Args:
+        ttl (float, optional): Seconds an entry stays valid. None means entries never expire.
+        maxsize (int, optional): Maximum number of entries. None means unbounded.
+    """
+
+    def __init__(self, ttl: float = None, maxsize: int = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value for `key`, calling `loader()` and caching its result on a miss.
+
+        None results are not cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def get_or_load_version(self, key, version, loader):
+        """
+        Returns the value cached for `key` if it was loaded at `version`, otherwise calls `loader()`
+        and caches its result under `version`.
+
+        `version` should be read from the database, e.g. the newest `updated_at` of the rows the value
+        is built from, so changes committed by any process are seen on the next read. None results
+        are not cached.
+        """
+        entry = self.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        value = loader()
+        if value is not None:
+            self.set(key, (version, value))
+        return value
+
+    def invalidate(self, key=_MISSING):
+        """
+        Drops one entry, or every entry when no key is given.
+        """
+        with self._lock:
+            if key is _MISSING:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """
+        Drops every entry for which `predicate(key, value)` is true.
+        """
+        with self._lock:
+            for key in [key for key, (value, _) in self._entries.items() if predicate(key, value)]:
+                del self._entries[key]
+
+
+@dataclass(frozen=True)
+class AgentCatalogEntry:
+    toolkit_id: int
+    project_id: int
+    agents: tuple
+    agent_lines: str
+    index: Any = None
+
+
+class AgentCatalog:
+    """
+    Process-wide cache of the agents visible to a toolkit, with their rendered description lines.
+
+    Entries are keyed by toolkit id and remember the project they were loaded from. Every read
+    compares the project's agent version (see `get_agents_version`) with the one the entry was
+    loaded at, so agents created, renamed or deleted by any process, e.g. from the SuperAGI UI, are
+    seen right away. Entries also expire after AGENT_MANAGER_CATALOG_TTL seconds. Each toolkit keeps
+    one search index across reloads, which is synced with the reloaded agents instead of being
+    rebuilt.
+
+    Args:
+        ttl (float): Seconds an entry stays valid.
+    """
+
+    def __init__(self, ttl: float):
+        self._tool_toolkits = TTLCache(ttl)
+        self._entries = TTLCache(ttl)
+        self._indexes = {}
+        self._indexes_lock = threading.Lock()
+
+    def get_toolkit_id(self, session_factory, class_name: str):
+        """
+        Returns the toolkit id of the tool registered with `class_name`.
+
+        Args:
+            session_factory (Callable[[], Session]): Called for a session only on a cache miss.
+            class_name (str): The tool class name.
+        """
+        from agent_manager_helpers_data import get_tool_by_class_name
+
+        def load():
+            tool = get_tool_by_class_name(session_factory(), class_name)
+            return tool.toolkit_id if tool is not None else None
+
+        return self._tool_toolkits.get_or_load(class_name, load)
+
+    def get(self, session_factory, toolkit_id: int) -> AgentCatalogEntry:
+        """
+        Returns the catalog entry of a toolkit, loading it when it is missing or out of date.
+
+        Args:
+            session_factory (Callable[[], Session]): Called for a session to check or load the entry.
+            toolkit_id (int): The toolkit id.
+        """
+        from agent_manager_helpers_data import get_agents
+
+        def load():
+            listing = get_agents(session_factory(), toolkit_id)
+            if listing is None:
+                return None
+            agents = tuple((agent.id, agent.name, agent.description) for agent in listing.agents)
+            index = self._get_index(toolkit_id)
+            index.sync(agents)
+            return AgentCatalogEntry(toolkit_id=toolkit_id, project_id=listing.project.id, agents=agents,
+                                     agent_lines=render_agent_lines(agents), index=index)
+
+        cached = self._entries.get(toolkit_id)
+        if cached is None:
+            # The version is read before the agents, so a change in between only causes a reload
+            project_id = get_default_project_id(session_factory(), toolkit_id)
+            if project_id is None:
+                return None
+        else:
+            project_id = cached[1].project_id
+        version = get_agents_version(session_factory(), project_id)
+        return self._entries.get_or_load_version(toolkit_id, version, load)
+
+    def _get_index(self, toolkit_id: int) -> AgentSearchIndex:
+        with self._indexes_lock:
+            return self._indexes.setdefault(toolkit_id, AgentSearchIndex())
+
+    def invalidate(self, toolkit_id: int = None, project_id: int = None):
+        """
+        Drops the entry of a toolkit, every entry of a project, or everything when neither is given.
+        """
+        if toolkit_id is not None:
+            self._entries.invalidate(toolkit_id)
+        elif project_id is not None:
+            self._entries.invalidate_where(lambda key, entry: entry[1].project_id == project_id)
+        else:
+            self._entries.invalidate()
+            self._tool_toolkits.invalidate()
+
+
+def get_default_project_id(session, toolkit_id: int):
+    """
+    Returns the id of the project whose agents a toolkit lists: the first project of its organisation.
+    """
+    from superagi.models.project import Project
+    from superagi.models.toolkit import Toolkit
+
+    return session.query(func.min(Project.id)) \
+        .join(Toolkit, Toolkit.organisation_id == Project.organisation_id) \
+        .filter(Toolkit.id == toolkit_id).scalar()
+
+
+def get_agents_version(session, project_id: int) -> tuple:
+    """
+    Returns a value that changes whenever an agent of a project is created, updated or deleted.
+
+    Combines the number of agents, the highest agent id and the newest `updated_at`, which SuperAGI
+    sets on every change made through its models, in one indexed aggregate query.
+    """
+    return tuple(session.query(func.count(Agent.id), func.max(Agent.id), func.max(Agent.updated_at))
+                 .filter(Agent.project_id == project_id).one())
+
+
+def get_agent_config_version(session, agent_id: int) -> tuple:
+    """
+    Returns a value that changes whenever a configuration row of an agent is added, updated or
+    deleted, like `get_agents_version`.
+    """
+    return tuple(session.query(func.count(AgentConfiguration.id), func.max(AgentConfiguration.id),
+                               func.max(AgentConfiguration.updated_at))
+                 .filter(AgentConfiguration.agent_id == agent_id).one())
+
+
+def render_agent_lines(agents) -> str:
+    """
+    Renders `(id, name, description)` tuples as the agent list used in tool descriptions.
+    """
+    return "".join(f"{agent_id}, {name}, {description}\n\r<br> | " for agent_id, name, description in agents)
+
+
+_agent_catalog = AgentCatalog(ttl=float(get_config("AGENT_MANAGER_CATALOG_TTL", 60)))
+
+
+def get_agent_catalog() -> AgentCatalog:
+    return _agent_catalog
+
+
+_agent_config_cache = TTLCache(ttl=float(get_config("AGENT_MANAGER_CONFIG_TTL", 300)), maxsize=1000)
+
+
+def get_agent_config_cache() -> TTLCache:
+    return _agent_config_cache
+
+
+_parsed_feed_cache = TTLCache(maxsize=int(get_config("AGENT_MANAGER_FEED_CACHE_SIZE", 10000)))
+
+
+def get_parsed_feed_cache() -> TTLCache:
+    return _parsed_feed_cache
@@ -1,17 +1,18 @@
 from typing import Any, Optional, Union
 from datetime import datetime
 import time
-from sqlalchemy import func, or_, desc
+from sqlalchemy import func, or_, and_, desc, false
+from sqlalchemy.orm import aliased
 from sqlalchemy.sql import asc
-from agent_manager_helpers import json_serial
-from dataclasses import dataclass, asdict
+from agent_manager_helpers import dumps
+from agent_manager_helpers_projection import project, project_list, resolve_fields
+from dataclasses import dataclass
+import copy
 import re
 import json
 import traceback
 
 from pydantic import BaseModel
-from superagi.helper.resource_helper import ResourceHelper as sagiResourceHelper
-from superagi.helper.s3_helper import S3Helper
 
 from superagi.models.agent import Agent
 from superagi.models.agent_config import AgentConfiguration
@@ -19,7 +20,6 @@ from superagi.models.agent_execution import AgentExecution
 from superagi.models.agent_execution_config import AgentExecutionConfiguration
 from superagi.models.workflows.agent_workflow import AgentWorkflow
 from superagi.models.workflows.iteration_workflow import IterationWorkflow
-from superagi.worker import execute_agent
 from superagi.models.agent_execution_permission import AgentExecutionPermission
 from superagi.helper.feed_parser import parse_feed
 from superagi.models.agent_execution import AgentExecution
@@ -30,9 +30,23 @@ from superagi.models.project import Project
 from superagi.models.organisation import Organisation
 from superagi.models.tool import Tool
 from agent_manager_helpers_resources import ResourceManager
+from agent_manager_helpers_cache import get_agent_config_cache, get_agent_config_version, get_parsed_feed_cache
+from agent_manager_helpers_usage import get_agent_usage_totals
+from agent_manager_helpers_notify import wait_for_agent_execution, wait_for_agent_executions, get_notifier, \
+    ensure_status_listener, WAITING_STATUSES
+from agent_manager_helpers_metrics import timed_run, stage, count
+from agent_manager_helpers_result_cache import is_result_cache_enabled, get_run_cache_key, find_cached_run, remember_run
+from agent_manager_helpers_scheduler import is_scheduler_enabled, submit_run, wait_slot, get_dispatch_hook
+from agent_manager_helpers_run_tree import record_child_run, cancel_timed_out_run, get_wait_hook
 from superagi.helper.time_helper import get_time_difference
+from superagi.config.config import get_config
 from superagi.lib.logger import logger
-from unstructured.partition.auto import partition
+
+CURRENT_TIME_FEED_PATTERN = re.compile(r"The current time and date is\s(\w{3}\s\w{3}\s\s?\d{1,2}\s\d{2}:\d{2}:\d{2}\s\d{4})")
+FEED_ERROR_PATTERN = re.compile(r"\b(error|exception|traceback|failed)\b", re.IGNORECASE)
+# Rough size of a token, feed digests are budgeted without a tokenizer
+FEED_BYTES_PER_TOKEN = 4
+FEED_DIGEST_BATCH_SIZE = 50
 
 @dataclass
 class ListAgentOutput:
@@ -40,17 +54,124 @@ class ListAgentOutput:
     organisation: Any
     project: Any
     agents: Any
+    next_after_id: Optional[int] = None
 
     def to_json(self):
-        return json.dumps(asdict(self), default=json_serial)
-    
-def get_agents(session, toolkit_id):
-    toolkit = get_toolkit(session, toolkit_id)
-    organisation = get_organisation(session, toolkit.organisation_id)
-    project = get_project_by_organisation_id(session, toolkit.organisation_id)
-    agents = get_agents_by_project_id(session, project.id)
+        return "".join(self.iter_json())
+
+    def to_ndjson(self):
+        return "".join(self.iter_ndjson())
+
+    def iter_json(self):
+        """
+        Serialize the listing as one JSON document, yielding it piece by piece.
+
+        Each agent is encoded on its own instead of first building a dict of the whole listing. The
+        agents themselves are all loaded, so large projects should be listed a page at a time.
+        """
+        yield "{"
+        for name in ("toolkit", "organisation", "project"):
+            yield f"{json.dumps(name)}: {dumps(getattr(self, name))}, "
+        if isinstance(self.agents, dict):
+            # compact table, see projected()
+            yield f'"agents": {dumps(self.agents)}, "next_after_id": {dumps(self.next_after_id)}}}'
+            return
+        yield '"agents": ['
+        for index, agent in enumerate(self.agents or []):
+            yield (", " if index else "") + dumps(agent)
+        yield f'], "next_after_id": {dumps(self.next_after_id)}}}'
+
+    def iter_ndjson(self):
+        """
+        Serialize the listing as newline delimited JSON: a header line with the toolkit, organisation,
+        project and pagination cursor, followed by one line per agent.
+        """
+        header = {
+            "toolkit": self.toolkit,
+            "organisation": self.organisation,
+            "project": self.project,
+            "next_after_id": self.next_after_id
+        }
+        if isinstance(self.agents, dict):
+            header["columns"] = self.agents["columns"]
+            agents = self.agents["rows"]
+        else:
+            agents = self.agents or []
+        yield dumps(header) + "\n"
+        for agent in agents:
+            yield dumps(agent) + "\n"
+
+    def projected(self, fields: Optional[list] = None, profile: Optional[str] = None, compact: bool = False):
+        """
+        Reduce the listing to the requested fields.
+
+        Args:
+            fields (list[str], optional): Agent fields to keep.
+            profile (str, optional): Named profile applied to every object, e.g. "summary".
+            compact (bool): Encode the agents as a table (column names once, then rows).
+
+        Returns:
+            ListAgentOutput: The projected listing.
+        """
+        if not fields and (not profile or profile == "full") and not compact:
+            return self
+        return ListAgentOutput(
+            project(self.toolkit, resolve_fields("toolkit", profile=profile)),
+            project(self.organisation, resolve_fields("organisation", profile=profile)),
+            project(self.project, resolve_fields("project", profile=profile)),
+            project_list(self.agents, resolve_fields("agent", fields, profile), compact),
+            self.next_after_id)
+
+def get_agents(session, toolkit_id, limit: Optional[int] = None, after_id: Optional[int] = None):
+    """
+    List the agents of the toolkit's default project in a single query.
+
+    The toolkit, its organisation, the organisation's first project and the project's agents are
+    joined together. Agents are ordered by id and can be paged through with `limit` and `after_id`.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        toolkit_id (int): The ID of the toolkit.
+        limit (int, optional): Maximum number of agents to return. 0 returns an empty page.
+        after_id (int, optional): Only return agents with an id greater than this one.
 
-    return ListAgentOutput(toolkit, organisation, project, agents)
+    Returns:
+        ListAgentOutput: The listing, or None if the toolkit, organisation or project was not found.
+        `next_after_id` is set when a full, non-empty page was returned.
+    """
+    if limit is not None:
+        limit = max(limit, 0)
+
+    first_project = aliased(Project)
+    first_project_id = session.query(func.min(first_project.id)).filter(
+        first_project.organisation_id == Toolkit.organisation_id).correlate(Toolkit).scalar_subquery()
+
+    agent_filter = Agent.project_id == Project.id
+    if after_id is not None:
+        agent_filter = and_(agent_filter, Agent.id > after_id)
+    if limit == 0:
+        # Still one row, with the toolkit, organisation and project
+        agent_filter = and_(agent_filter, false())
+
+    query = session.query(Toolkit, Organisation, Project, Agent) \
+        .join(Organisation, Organisation.id == Toolkit.organisation_id) \
+        .join(Project, Project.id == first_project_id) \
+        .outerjoin(Agent, agent_filter) \
+        .filter(Toolkit.id == toolkit_id) \
+        .order_by(asc(Agent.id)) \
+        .populate_existing()
+    if limit:
+        query = query.limit(limit)
+
+    rows = query.all()
+    if not rows:
+        return None
+
+    toolkit, organisation, project, _ = rows[0]
+    agents = [agent for _, _, _, agent in rows if agent is not None]
+    next_after_id = agents[-1].id if limit and len(agents) == limit else None
+
+    return ListAgentOutput(toolkit, organisation, project, agents, next_after_id)
 
 
 def get_toolkit(session, toolkit_id):
@@ -127,36 +248,112 @@ def get_agent_execution_configuration(agent_id: Union[int, None, str], session):
     else:
         agent_execution_id = -1
 
-    # Fetching agent execution id from the AgentExecution record
-    if agent_execution_id != -1: 
-        agent_execution_config = AgentExecution.get_agent_execution_from_id(session, agent_execution_id)
-        if agent_execution_config is None:
-            raise ValueError("Agent Execution not found")
-        agent_id_from_execution_id = agent_execution_config.agent_id
-        if agent_id != agent_id_from_execution_id:
-            raise ValueError("Wrong agent id")
-
     # Querying the AgentConfiguration and AgentExecuitonConfiguration tables for all the keys
     results_agent = session.query(AgentConfiguration).filter(AgentConfiguration.agent_id == agent_id).all()
     if agent_execution_id!=-1: 
         results_agent_execution = session.query(AgentExecutionConfiguration).filter(AgentExecutionConfiguration.agent_execution_id == agent_execution_id).all()
     
-    total_calls = session.query(func.sum(AgentExecution.num_of_calls)).filter(
-        AgentExecution.agent_id == agent_id).scalar()
-    total_tokens = session.query(func.sum(AgentExecution.num_of_tokens)).filter(
-        AgentExecution.agent_id == agent_id).scalar()
+    total_calls, total_tokens = get_agent_usage_totals(session, agent_id)
     
     response = {}
     if agent_execution_id!=-1: 
         response = AgentExecutionConfiguration.build_agent_execution_config(session, agent, results_agent, results_agent_execution, total_calls, total_tokens)
     else: 
         response = AgentExecutionConfiguration.build_scheduled_agent_execution_config(session, agent, results_agent, total_calls, total_tokens)
-        
-    # Closing the session
-    session.close()
 
     return response
 
+def parse_agent_config_value(key: str, value):
+    """
+    Convert a stored agent configuration value into the form used for execution configs.
+
+    Args:
+        key (str): The configuration key.
+        value (str): The stored value.
+
+    Returns:
+        The parsed value: a list of toolkit ids for "toolkits", a list for empty "constraints",
+        otherwise the value unchanged.
+    """
+    if key == "toolkits":
+        if value:
+            return [int(item) for item in value.strip('{}').split(',') if item.strip() and item != '[]']
+        return []
+    elif key == "constraints":
+        return value if value else []
+    return value
+
+def get_agent_config_snapshot(session, agent_id: int) -> dict:
+    """
+    Get the parsed configuration of an agent.
+
+    Snapshots are cached per agent for AGENT_MANAGER_CONFIG_TTL seconds. Every read checks the
+    agent's configuration version (see `get_agent_config_version`), so changes committed by any
+    process, e.g. from the SuperAGI UI, are used by the next run.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_id (int): The ID of the agent.
+
+    Returns:
+        dict: Configuration key to parsed value. A deep copy, so callers may modify it and its lists.
+    """
+    def load():
+        agent_configs = session.query(AgentConfiguration).filter(AgentConfiguration.agent_id == agent_id).all()
+        return {agent_config.key: parse_agent_config_value(agent_config.key, agent_config.value) for agent_config in agent_configs}
+
+    version = get_agent_config_version(session, agent_id)
+    return copy.deepcopy(get_agent_config_cache().get_or_load_version(agent_id, version, load))
+
+def get_agent_goal(session, agent_id: int, agent_execution_id: Optional[int] = None) -> str:
+    """
+    Get the goal and instruction an agent works on, as plain text.
+
+    The execution's own goal and instruction are used when it has them, otherwise the agent's.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_id (int): The ID of the agent.
+        agent_execution_id (int, optional): The ID of the running execution.
+
+    Returns:
+        str: The goal and instruction, empty if neither is set.
+    """
+    keys = ["goal", "instruction"]
+    values = {}
+    if agent_execution_id is not None:
+        values = dict(session.query(AgentExecutionConfiguration.key, AgentExecutionConfiguration.value)
+                      .filter(AgentExecutionConfiguration.agent_execution_id == agent_execution_id,
+                              AgentExecutionConfiguration.key.in_(keys)).all())
+    if not values:
+        agent_config = get_agent_config_snapshot(session, agent_id)
+        values = {key: agent_config.get(key) for key in keys}
+    return " ".join(str(values[key]) for key in keys if values.get(key))
+
+def get_run_configuration(session, agent_id: int, agent_config_in) -> dict:
+    """
+    Get the configuration a new execution of an agent is created with: the goal and instruction of
+    `agent_config_in` and everything else from the agent's own configuration.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_id (int): The ID of the agent.
+        agent_config_in (dict): The run configuration, as returned by `get_agent_execution_configuration`.
+
+    Returns:
+        dict: Configuration key to value.
+    """
+    agent_execution_configs = {
+        "goal": agent_config_in['goal'],
+        "instruction": agent_config_in['instruction']
+    }
+
+    keys_to_exclude = ["goal", "instruction"]
+    for key, value in get_agent_config_snapshot(session, agent_id).items():
+        if key not in keys_to_exclude:
+            agent_execution_configs[key] = value
+    return agent_execution_configs
+
 class AgentExecutionIn(BaseModel):
     status: Optional[str]
     name: Optional[str]
@@ -172,12 +369,14 @@ class AgentExecutionIn(BaseModel):
     class config:
         orm_mode = True
 
-def create_agent_execution(agent_id: int, agent_config_in: AgentExecutionIn, session):
+def create_agent_execution(agent_id: int, agent_config_in: AgentExecutionIn, session, start: bool = True):
     """
     Create a new agent execution/run.
 
     Args:
         agent_execution (AgentExecution): The agent execution data.
+        start (bool): Queue the execution right away. Pass False to hand over files first and
+            call `start_agent_execution` afterwards.
     """
 
     # Checking if the agent exists
@@ -195,40 +394,35 @@ def create_agent_execution(agent_id: int, agent_config_in: AgentExecutionIn, ses
                                         current_agent_step_id=start_step.id,
                                         iteration_workflow_step_id=iteration_step_id)
 
-    agent_execution_configs = {
-        "goal": agent_config_in['goal'],
-        "instruction": agent_config_in['instruction']
-    }
-
-    agent_configs = session.query(AgentConfiguration).filter(AgentConfiguration.agent_id == agent_id).all()
-    keys_to_exclude = ["goal", "instruction"]
-    for agent_config in agent_configs:
-        if agent_config.key not in keys_to_exclude:
-            if agent_config.key == "toolkits":
-                if agent_config.value:
-                    toolkits = [
-                        int(item) for item in agent_config.value.strip('{}').split(',') if item.strip() and item != '[]']
-                    agent_execution_configs[agent_config.key] = toolkits
-                else:
-                    agent_execution_configs[agent_config.key] = []
-            elif agent_config.key == "constraints":
-                if agent_config.value:
-                    agent_execution_configs[agent_config.key] = agent_config.value
-                else:
-                    agent_execution_configs[agent_config.key] = []
-            else:
-                agent_execution_configs[agent_config.key] = agent_config.value
+    agent_execution_configs = get_run_configuration(session, agent_id, agent_config_in)
 
+    # Writing the execution and all of its configuration rows in a single transaction
     session.add(db_agent_execution)
-    session.commit()
     session.flush()
-    AgentExecutionConfiguration.add_or_update_agent_execution_config(session=session, execution=db_agent_execution, agent_execution_configs=agent_execution_configs)
+    session.add_all([
+        AgentExecutionConfiguration(agent_execution_id=db_agent_execution.id, key=key, value=str(value))
+        for key, value in agent_execution_configs.items()
+    ])
+    session.commit()
 
-    if db_agent_execution.status == "RUNNING":
-        execute_agent.delay(db_agent_execution.id, datetime.now())
+    if start:
+        start_agent_execution(db_agent_execution)
 
     return db_agent_execution
 
+def start_agent_execution(agent_execution):
+    """
+    Queue a created agent execution on the SuperAGI worker.
+
+    Args:
+        agent_execution (AgentExecution): The execution to start.
+    """
+    # Imported on first use, loading the worker pulls in Celery and the whole agent runtime
+    from superagi.worker import execute_agent
+
+    if agent_execution.status == "RUNNING":
+        execute_agent.delay(agent_execution.id, datetime.now())
+
 def get_agent_execution(agent_execution_id: int, session):
     """
     Get an agent execution by agent_execution_id.
@@ -251,15 +445,21 @@ def get_agent_execution(agent_execution_id: int, session):
     else:
         raise Exception()
     
-def get_agent_execution_feed(agent_execution_id: int, session):
+def get_agent_execution_feed(agent_execution_id: int, session, after_feed_id: Optional[int] = None, after_time: Optional[datetime] = None):
     """
     Get agent execution feed with other execution details.
 
+    Only feed entries created after the given cursor are returned, so a caller that keeps passing
+    back `last_feed_id` only pays for new rows. Empty entries and "current time and date" entries
+    are filtered out by the database.
+
     Args:
         agent_execution_id (int): The ID of the agent execution.
+        after_feed_id (int, optional): Only return feed entries with an id greater than this one.
+        after_time (datetime, optional): Only return feed entries created after this time.
 
     Returns:
-        dict: The agent execution status and feeds.
+        dict: The agent execution status, feeds, permissions and the `last_feed_id` cursor.
 
     Raises:
         HTTPException (Status Code=400): If the agent run is not found.
@@ -268,12 +468,20 @@ def get_agent_execution_feed(agent_execution_id: int, session):
     agent_execution = session.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).first()
     if agent_execution is None:
         raise Exception()
-    feeds = session.query(AgentExecutionFeed).filter_by(agent_execution_id=agent_execution_id).order_by(asc(AgentExecutionFeed.created_at)).all()
-    # # parse json
-    final_feeds = []
-    for feed in feeds:
-        if feed.feed != "" and re.search(r"The current time and date is\s(\w{3}\s\w{3}\s\s?\d{1,2}\s\d{2}:\d{2}:\d{2}\s\d{4})",feed.feed) == None :
-            final_feeds.append(parse_feed(feed))
+
+    query = session.query(AgentExecutionFeed).filter(
+        AgentExecutionFeed.agent_execution_id == agent_execution_id,
+        AgentExecutionFeed.feed != "",
+        ~AgentExecutionFeed.feed.regexp_match(CURRENT_TIME_FEED_PATTERN.pattern))
+    if after_feed_id is not None:
+        query = query.filter(AgentExecutionFeed.id > after_feed_id)
+    if after_time is not None:
+        query = query.filter(AgentExecutionFeed.created_at > after_time)
+    feeds = query.order_by(asc(AgentExecutionFeed.created_at), asc(AgentExecutionFeed.id)).all()
+
+    # parse json
+    final_feeds = [_parse_feed_entry(feed) for feed in feeds]
+    last_feed_id = max((feed.id for feed in feeds), default=after_feed_id)
 
     # get all permissions
     execution_permissions = session.query(AgentExecutionPermission).filter_by(agent_execution_id=agent_execution_id).order_by(asc(AgentExecutionPermission.created_at)).all()
@@ -293,79 +501,642 @@ def get_agent_execution_feed(agent_execution_id: int, session):
     return {
         "status": agent_execution.status,
         "feeds": final_feeds,
-        "permissions": permissions
+        "permissions": permissions,
+        "last_feed_id": last_feed_id
+    }
+
+def _get_parsed_feed_text(feed):
+    def load():
+        parsed = parse_feed(feed)
+        # parse_feed returns the model itself for roles other than assistant and user
+        return parsed["feed"] if isinstance(parsed, dict) else feed.feed
+    # Only the text is memoized, by id since feed rows never change
+    return get_parsed_feed_cache().get_or_load(feed.id, load)
+
+def _parse_feed_entry(feed) -> dict:
+    return {
+        "role": feed.role,
+        "feed": _get_parsed_feed_text(feed),
+        "updated_at": feed.updated_at,
+        "time_difference": get_time_difference(feed.updated_at, str(datetime.now()))
+    }
+
+def _get_feed_text(feed) -> str:
+    parsed = _get_parsed_feed_text(feed)
+    return parsed if isinstance(parsed, str) else dumps(parsed)
+
+def _get_finish_reason(feed) -> Optional[str]:
+    if feed.role != "assistant":
+        return None
+    try:
+        tool = (json.loads(feed.feed, strict=False) or {}).get("tool") or {}
+    except (ValueError, AttributeError):
+        return None
+    if tool.get("name") != "finish":
+        return None
+    reason = (tool.get("args") or {}).get("reason")
+    return str(reason) if reason else None
+
+def get_agent_execution_feed_digest(agent_execution_id: int, session, max_tokens: Optional[int] = None, max_bytes: Optional[int] = None, max_entries: Optional[int] = None):
+    """
+    Get a size-bounded digest of an agent execution feed: its final result, its errors and the
+    latest entries.
+
+    Feed entries are streamed newest first (`ORDER BY id DESC` with a `LIMIT` of `max_entries`) and
+    reading stops once the budget is spent and the final result is known, so long feeds are never
+    loaded in full. The final result is the reason given to the `finish` tool or, without one, the
+    newest entry; errors are entries mentioning an error, exception or failure. The final result is
+    fitted into the budget first (leaving up to half of it to the errors), then the errors, then the
+    remaining entries, newest first.
+
+    Args:
+        agent_execution_id (int): The ID of the agent execution.
+        max_tokens (int, optional): Budget in tokens, counted as FEED_BYTES_PER_TOKEN bytes each.
+        max_bytes (int, optional): Budget in bytes of feed text. The smaller budget wins; without
+            either, AGENT_MANAGER_FEED_DIGEST_TOKENS applies.
+        max_entries (int, optional): Most entries to read, AGENT_MANAGER_FEED_DIGEST_ENTRIES by default.
+
+    Returns:
+        dict: The execution status, `final_result` (an entry or None), `errors` and `tail` (entries,
+        oldest first), whether anything was cut or left out (`truncated`), the number of entries read
+        and the `last_feed_id` cursor.
+
+    Raises:
+        HTTPException (Status Code=400): If the agent run is not found.
+    """
+    status = session.query(AgentExecution.status).filter(AgentExecution.id == agent_execution_id).scalar()
+    if status is None:
+        raise Exception()
+
+    budgets = [budget for budget in (max_bytes, max_tokens * FEED_BYTES_PER_TOKEN if max_tokens else None) if budget]
+    budget = min(budgets) if budgets else int(get_config("AGENT_MANAGER_FEED_DIGEST_TOKENS", 1000)) * FEED_BYTES_PER_TOKEN
+    max_entries = max_entries or int(get_config("AGENT_MANAGER_FEED_DIGEST_ENTRIES", 200))
+
+    query = session.query(AgentExecutionFeed).filter(
+        AgentExecutionFeed.agent_execution_id == agent_execution_id,
+        AgentExecutionFeed.feed != "",
+        ~AgentExecutionFeed.feed.regexp_match(CURRENT_TIME_FEED_PATTERN.pattern)) \
+        .order_by(desc(AgentExecutionFeed.id)).limit(max_entries).yield_per(FEED_DIGEST_BATCH_SIZE)
+
+    final_result = None
+    errors, tail = [], []
+    read, collected, last_feed_id = 0, 0, None
+    for feed in query:
+        read += 1
+        last_feed_id = last_feed_id or feed.id
+        reason = _get_finish_reason(feed) if final_result is None else None
+        entry = {"id": feed.id, "role": feed.role, "feed": reason or _get_feed_text(feed), "updated_at": feed.updated_at}
+        if reason is not None:
+            final_result = entry
+            continue
+        if FEED_ERROR_PATTERN.search(entry["feed"]):
+            errors.append(entry)
+        else:
+            tail.append(entry)
+        collected += len(entry["feed"].encode())
+        if collected >= budget and final_result is not None:
+            break
+    truncated = read == max_entries or collected > budget
+    if final_result is None and tail:
+        final_result = tail.pop(0)
+
+    # Fill the budget in order of importance, cutting the entry that crosses it. Errors keep up to
+    # half of it even when the final result is longer.
+    remaining = budget
+    def fit(entry, limit=None):
+        nonlocal remaining, truncated
+        data = entry["feed"].encode()
+        available = remaining if limit is None else min(remaining, limit)
+        if available <= 0:
+            truncated = True
+            return None
+        if len(data) > available:
+            entry = {**entry, "feed": data[:available].decode(errors="ignore") + " [truncated]"}
+            truncated = True
+        remaining -= min(len(data), available)
+        return entry
+
+    error_bytes = sum(len(entry["feed"].encode()) for entry in errors)
+    final_result = fit(final_result, budget - min(error_bytes, budget // 2)) if final_result is not None else None
+    errors = [entry for entry in map(fit, errors) if entry is not None]
+    tail = [entry for entry in map(fit, tail) if entry is not None]
+    count("feed_entries", read)
+
+    return {
+        "status": status,
+        "final_result": final_result,
+        "errors": errors[::-1],
+        "tail": tail[::-1],
+        "truncated": truncated,
+        "entries_read": read,
+        "last_feed_id": last_feed_id
     }
 
+DEFERRED_WAIT_STATE = "Deferred (no worker is free to wait, check the handle later)"
+
 # like ('CREATED', 'RUNNING', 'PAUSED', 'COMPLETED', 'TERMINATED')
-def execute_save_scheduled_agent_tool(session, source_agent_id, source_agent_execution_id, target_agent_id: int, files_for_agent_run: list[str] = [], wait_for_complete: bool = True, return_feed: bool = False):
+def get_wait_state(agent_execution, max_wait_time):
+    """
+    Describe how waiting on an agent execution ended.
+
+    Args:
+        agent_execution (AgentExecution): The refreshed agent execution.
+        max_wait_time (float): The wait budget in seconds, used in the timeout message.
+
+    Returns:
+        str: "Success", "Timeout (<n> seconds)" or "Unknown".
+    """
+    if agent_execution.status in WAITING_STATUSES:
+        return f"Timeout ({max_wait_time} seconds)"
+    elif agent_execution.status in ("COMPLETE", "COMPLETED"):
+        return "Success"
+    else:
+        return "Unknown"
+
+def launch_agent_run(session, source_agent_id, source_agent_execution_id, target_agent_id: int, files_for_agent_run: list[str] = [], agent_config: Optional[dict] = None, priority: int = 0, upstream_files: Optional[list] = None):
+    """
+    Create and start a new execution of the target agent, handing over the given files.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        source_agent_id (int): The agent that requested the run.
+        source_agent_execution_id (int): The execution that requested the run.
+        target_agent_id (int): The agent to run.
+        files_for_agent_run (list[str]): Names of the source execution's files to attach.
+        agent_config (dict, optional): The target's configuration if the caller already fetched it.
+        priority (int): Queue priority when concurrency limits are configured, higher starts first.
+        upstream_files (list[tuple], optional): More files to attach, as (agent, agent execution,
+            file names) tuples, e.g. the outputs of earlier pipeline stages.
+
+    Returns:
+        AgentExecution: The created agent execution, or None if the target agent was not found.
+    """
+    # Fetching the last configuration of the target agent
+    if agent_config is None:
+        with stage("config"):
+            agent_config = get_agent_execution_configuration(target_agent_id, session)
+
+    # Creating a new execution of the target agent 
+    with stage("create"):
+        agent_execution_created = create_agent_execution(target_agent_id, agent_config, session, start=False)
+        if agent_execution_created is not None:
+            record_child_run(session, agent_execution_created.id, source_agent_execution_id)
+
+    if agent_execution_created is not None and (files_for_agent_run or upstream_files):
+        logger.info(f"launch_agent_run: handing over files: {files_for_agent_run}")
+        try:
+            with stage("transfer"):
+                sources = list(upstream_files or [])
+                if files_for_agent_run:
+                    source_agent = Agent.get_agent_from_id(session=session, agent_id=source_agent_id)
+                    source_agent_execution = AgentExecution.get_agent_execution_from_id(session=session, agent_execution_id=source_agent_execution_id)
+                    sources.insert(0, (source_agent, source_agent_execution, files_for_agent_run))
+                resource_manager = ResourceManager(target_agent_id, session)
+                transferred = []
+                for source_agent, source_agent_execution, file_names in sources:
+                    transferred += resource_manager.transfer_files(file_names, source_agent, source_agent_execution, agent_execution_created)
+            count("files_transferred", len(transferred))
+            count("bytes_transferred", sum(resource.size or 0 for resource in transferred))
+        except:
+            logger.error(f"Error occured.\n\n{traceback.format_exc()}")
+
+    # Starting the run only once its files are in place, through the queue when limits are set
+    if agent_execution_created is not None:
+        with stage("start"):
+            if is_scheduler_enabled():
+                submit_run(session, agent_execution_created, source_agent_execution_id, priority)
+            else:
+                start_agent_execution(agent_execution_created)
+
+    return agent_execution_created
+
+def collect_agent_run_result(session, target_agent_id: int, agent_execution, return_feed: bool = False, feed_token_budget: Optional[int] = None):
+    """
+    Gather the feed and resources of a finished (or timed out) agent execution.
+
+    With a `feed_token_budget` the feed is returned as a digest of that size, see
+    `get_agent_execution_feed_digest`.
+
+    Returns:
+        tuple: The execution feed (or None) and the execution's resources.
+    """
+    agent_execution_feed = None
+    if return_feed and feed_token_budget:
+        with stage("feed"):
+            agent_execution_feed = get_agent_execution_feed_digest(agent_execution.id, session, max_tokens=feed_token_budget)
+    elif return_feed:
+        with stage("feed"):
+            agent_execution_feed = get_agent_execution_feed(agent_execution.id, session)
+        count("feed_entries", len(agent_execution_feed["feeds"]))
+
+    with stage("resources"):
+        resource_manager_obj = ResourceManager(target_agent_id, session)
+        resources = resource_manager_obj.get_all_resources(agent_execution.id)
+    count("resources", len(resources))
+
+    return agent_execution_feed, resources
+
+def execute_save_scheduled_agent_tool(session, source_agent_id, source_agent_execution_id, target_agent_id: int, files_for_agent_run: list[str] = [], wait_for_complete: bool = True, return_feed: bool = False, priority: int = 0, feed_token_budget: Optional[int] = None):
     """
     Execute the Save Scheduled Agent Tool.
+
+    The result carries a `timings` summary of the stages of the call (configuration fetch, execution
+    creation, file hand-off, waiting, feed and resource retrieval) with their query counts.
+
+    With AGENT_MANAGER_RESULT_CACHE enabled, a request for a target agent whose configuration and
+    input file contents match an earlier completed run returns that run (`cached` is True) instead
+    of starting a new one.
+
+    With `wait_for_complete` False the call returns as soon as the run is started. Its `handle` can be
+    passed to `await_agent_runs` to check on or wait for the run later. The same happens, with the
+    "Deferred" wait state, when waiting would leave no worker for the run (see `wait_slot`).
+
+    With a `feed_token_budget` the returned feed is a digest of at most that many tokens with the
+    final result, errors and latest entries (see `get_agent_execution_feed_digest`).
+
     Returns:
         JSON representation of the agent ID
     """
 
     logger.info(f"execute_save_scheduled_agent_tool: fiels: {files_for_agent_run}")
 
+    agent_execution_created = None
     execution_result = None
     agent_execution_feed = None
     resources = None
     waitedResult = "Never Waited"
+    cached = False
 
-    try:
-        # Fetching the last configuration of the target agent
-        agent_config = get_agent_execution_configuration(target_agent_id, session)
-        
-        # Creating a new execution of the target agent 
-        agent_execution_created = create_agent_execution(target_agent_id, agent_config, session)
-
-        if(files_for_agent_run):
-            for file_for_agent_run in files_for_agent_run:
-                logger.info(f"get_file_content: file_name:{file_for_agent_run}")
-                try:
-                    final_path = sagiResourceHelper.get_agent_read_resource_path(file_for_agent_run, agent=Agent.get_agent_from_id(
-                        session=session, agent_id=source_agent_id), agent_execution=AgentExecution
-                                                                            .get_agent_execution_from_id(session=session,
-                                                                                                        agent_execution_id=source_agent_execution_id))
-                    sagiResourceHelper.make_written_file_resource(final_path, target_agent_id, agent_execution_created, session)
-                except:
-                    logger.error(f"Error occured.\n\n{traceback.format_exc()}")
-
-
-        if wait_for_complete:
-            waitedResult = "Attempting Wait"
-            maxWaitTime = 60 * 10 #seconds * minutes
-            currentWaitTime = 0
-
-            execution_result = get_agent_execution(agent_execution_created.id, session)
-
-            while maxWaitTime > currentWaitTime and execution_result.status in ['CREATED', 'RUNNING']:
-                waitedResult = "Waiting"
-                time.sleep(1) 
-                currentWaitTime += 1
-                session.refresh(execution_result)
-
-            if maxWaitTime <= currentWaitTime:
-                waitedResult = "Timeout ({maxWaitTime} seconds)"
-            elif execution_result.status == "COMPLETE":
-                waitedResult = "Success"
+    with timed_run("execute_save_scheduled_agent_tool") as timer:
+        try:
+            agent_config = None
+            cache_key = None
+            if is_result_cache_enabled():
+                with stage("config"):
+                    agent_config = get_agent_execution_configuration(target_agent_id, session)
+                run_config = get_run_configuration(session, target_agent_id, agent_config)
+                if is_result_cache_enabled(run_config):
+                    with stage("cache"):
+                        cache_key = get_run_cache_key(session, source_agent_id, source_agent_execution_id, target_agent_id, run_config, files_for_agent_run)
+                        agent_execution_created = find_cached_run(session, cache_key)
+                    cached = agent_execution_created is not None
+                    count("result_cache_hits" if cached else "result_cache_misses")
+
+            if cached:
+                execution_result = agent_execution_created
+                waitedResult = get_wait_state(execution_result, 0)
+                agent_execution_feed, resources = collect_agent_run_result(session, target_agent_id, execution_result, return_feed, feed_token_budget)
             else:
-                waitedResult = "Unknown"
+                agent_execution_created = launch_agent_run(session, source_agent_id, source_agent_execution_id, target_agent_id, files_for_agent_run, agent_config, priority)
+
+            if wait_for_complete and agent_execution_created is not None and not cached:
+                waitedResult = "Attempting Wait"
+                maxWaitTime = 60 * 10 #seconds * minutes
+
+                execution_result = get_agent_execution(agent_execution_created.id, session)
+
+                with wait_slot(session, source_agent_execution_id) as may_wait:
+                    if may_wait:
+                        waitedResult = "Waiting"
+                        with stage("wait"):
+                            wait_for_agent_execution(session, execution_result, maxWaitTime, on_poll=get_wait_hook(session))
+                        waitedResult = get_wait_state(execution_result, maxWaitTime)
+                        # A run nobody waits for anymore would keep spending tokens, it is stopped with its children
+                        cancel_timed_out_run(session, execution_result)
+                    else:
+                        waitedResult = DEFERRED_WAIT_STATE
+
+                if waitedResult != DEFERRED_WAIT_STATE:
+                    agent_execution_feed, resources = collect_agent_run_result(session, target_agent_id, execution_result, return_feed, feed_token_budget)
+
+                if cache_key is not None and waitedResult == "Success":
+                    with stage("cache"):
+                        remember_run(session, cache_key, target_agent_id, execution_result.id)
+
+        except Exception as e:
+            waitedResult = "Errored"
+            logger.error(f"Error occurred while executing save scheduled agent tool: {e}\n\n{traceback.format_exc()}")
+
+    return {
+        'agent_id': target_agent_id,
+        'agent_execution_id': agent_execution_created.id if agent_execution_created != None else None,
+        'handle': format_run_handle(target_agent_id, agent_execution_created.id) if agent_execution_created != None else None,
+        'wait_state': waitedResult,
+        'execution': execution_result,
+        'feed': agent_execution_feed,
+        'resources': resources,
+        'cached': cached,
+        'timings': timer.summary()
+    }
+
+def execute_fan_out_agent_tool(session, source_agent_id, source_agent_execution_id, jobs: list, max_concurrency: int = 5, job_timeout: float = 60 * 10, return_feed: bool = False, feed_token_budget: Optional[int] = None):
+    """
+    Run several target agents at once and wait for all of them.
+
+    Executions are created through the same path as `execute_save_scheduled_agent_tool`. At most
+    `max_concurrency` of them are in flight at any time; the next job starts as soon as one finishes.
+    Every job gets its own `job_timeout`, counted from the moment it was started. So one call cannot
+    hold a worker indefinitely, the number of jobs is limited to AGENT_MANAGER_MAX_FAN_OUT and the
+    timeout to AGENT_MANAGER_AWAIT_MAX_TIMEOUT seconds.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        source_agent_id (int): The agent that requested the runs.
+        source_agent_execution_id (int): The execution that requested the runs.
+        jobs (list[dict]): Jobs with a `target_agent_id` and optional `files_for_agent_run` and `priority`.
+        max_concurrency (int): Maximum number of executions running at the same time.
+        job_timeout (float): Maximum number of seconds to wait for each job, 0 for the default.
+        return_feed (bool): Include each execution's feed in its result.
+        feed_token_budget (int, optional): Return each feed as a digest of at most this many tokens.
+
+    Returns:
+        dict: The overall wait state, one result per job in the order the jobs were given, and the
+        `timings` of all jobs' stages together.
+
+    Raises:
+        ValueError: If there are more jobs than AGENT_MANAGER_MAX_FAN_OUT.
+    """
+
+    logger.info(f"execute_fan_out_agent_tool: jobs: {jobs}")
 
+    max_jobs = int(get_config("AGENT_MANAGER_MAX_FAN_OUT", 20))
+    if len(jobs) > max_jobs:
+        raise ValueError(f"{len(jobs)} jobs requested, at most {max_jobs} can be run by one call")
+    job_timeout = min(max(float(job_timeout or 60 * 10), 0), float(get_config("AGENT_MANAGER_AWAIT_MAX_TIMEOUT", 600)))
+    max_concurrency = max(1, max_concurrency)
+    results = [None] * len(jobs)
+    pending = list(enumerate(jobs))
+    running = {}
+
+    with timed_run("execute_fan_out_agent_tool") as timer, wait_slot(session, source_agent_execution_id) as may_wait:
+        if not may_wait:
+            # Waiting would deadlock the worker pool: start every job and hand back the handles
+            max_concurrency = max(1, len(jobs))
+        while pending or running:
+            while pending and len(running) < max_concurrency:
+                index, job = pending.pop(0)
+                target_agent_id = job['target_agent_id']
+                results[index] = {
+                    'agent_id': target_agent_id,
+                    'agent_execution_id': None,
+                    'handle': None,
+                    'wait_state': "Errored",
+                    'execution': None,
+                    'feed': None,
+                    'resources': None
+                }
+                try:
+                    agent_execution_created = launch_agent_run(session, source_agent_id, source_agent_execution_id, target_agent_id, job.get('files_for_agent_run') or [], priority=job.get('priority') or 0)
+                except Exception as e:
+                    logger.error(f"Error occurred while starting fan out job {index}: {e}\n\n{traceback.format_exc()}")
+                    continue
+                if agent_execution_created is None:
+                    continue
+                results[index]['agent_execution_id'] = agent_execution_created.id
+                results[index]['handle'] = format_run_handle(target_agent_id, agent_execution_created.id)
+                results[index]['wait_state'] = "Waiting"
+                running[agent_execution_created.id] = (index, get_agent_execution(agent_execution_created.id, session), time.monotonic())
+
+            if not running:
+                continue
+            if not may_wait:
+                for index, _, _ in running.values():
+                    results[index]['wait_state'] = DEFERRED_WAIT_STATE
+                running.clear()
+                continue
+
+            now = time.monotonic()
+            remaining = min(job_timeout - (now - started) for _, _, started in running.values())
+            with stage("wait"):
+                wait_for_agent_executions(session, [execution for _, execution, _ in running.values()], max(remaining, 0), return_when_any=True, on_poll=get_wait_hook(session))
+
+            now = time.monotonic()
+            for agent_execution_id, (index, execution, started) in list(running.items()):
+                if execution.status in WAITING_STATUSES and now - started < job_timeout:
+                    continue
+                del running[agent_execution_id]
+                try:
+                    results[index]['wait_state'] = get_wait_state(execution, job_timeout)
+                    cancel_timed_out_run(session, execution)
+                    results[index]['execution'] = execution
+                    results[index]['feed'], results[index]['resources'] = collect_agent_run_result(session, results[index]['agent_id'], execution, return_feed, feed_token_budget)
+                except Exception as e:
+                    results[index]['wait_state'] = "Errored"
+                    logger.error(f"Error occurred while collecting fan out job {index}: {e}\n\n{traceback.format_exc()}")
+
+    succeeded = sum(1 for result in results if result['wait_state'] == "Success")
+    return {
+        'wait_state': "Success" if succeeded == len(results) else f"Partial ({succeeded}/{len(results)} succeeded)",
+        'jobs': results,
+        'timings': timer.summary()
+    }
+
+def format_run_handle(agent_id: int, agent_execution_id: int, last_feed_id: Optional[int] = None) -> str:
+    """
+    Encode a run handle: "<agent id>:<execution id>:<id of the last feed entry seen>".
+    """
+    return f"{agent_id}:{agent_execution_id}:{last_feed_id or 0}"
+
+def parse_run_handle(handle: str):
+    """
+    Decode a run handle made by `format_run_handle`. A bare execution id is accepted as well.
+
+    Returns:
+        tuple: The agent id (None for a bare execution id), the execution id and the feed cursor.
+
+    Raises:
+        ValueError: If the handle is malformed.
+    """
+    parts = str(handle).strip().split(":")
+    try:
+        if len(parts) == 1:
+            return None, int(parts[0]), None
+        if len(parts) in (2, 3):
+            last_feed_id = int(parts[2]) if len(parts) == 3 and int(parts[2]) > 0 else None
+            return int(parts[0]), int(parts[1]), last_feed_id
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid run handle '{handle}', expected '<agent id>:<execution id>:<last feed id>'")
+
+def await_agent_runs(session, handles: list, timeout: float = 0, return_when_any: bool = False, return_feed: bool = True, source_agent_execution_id: Optional[int] = None):
+    """
+    Check on, or wait for, runs started earlier.
+
+    With a `timeout` of 0 the runs are only checked. Otherwise the call blocks until all of them (or,
+    with `return_when_any`, the first of them) have finished, or the timeout passes; the timeout is
+    capped at AGENT_MANAGER_AWAIT_MAX_TIMEOUT seconds. Each run reports the feed entries written since
+    its handle was issued, its resources once it has finished, and a new handle to pass next time.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        handles (list[str]): Handles returned by earlier calls.
+        timeout (float): Maximum number of seconds to wait.
+        return_when_any (bool): Return as soon as one run has finished.
+        return_feed (bool): Include the new feed entries of each run.
+        source_agent_execution_id (int, optional): The calling execution, which holds a worker while
+            it waits. The runs are only checked when waiting would leave no worker for them.
+
+    Returns:
+        dict: The overall wait state and one result per handle, in the order the handles were given.
+    """
+    parsed = [parse_run_handle(handle) for handle in handles]
+    agent_execution_ids = [agent_execution_id for _, agent_execution_id, _ in parsed]
+    executions = {execution.id: execution for execution in
+                  session.query(AgentExecution).filter(AgentExecution.id.in_(agent_execution_ids)).populate_existing().all()}
+
+    timeout = min(max(float(timeout or 0), 0), float(get_config("AGENT_MANAGER_AWAIT_MAX_TIMEOUT", 600)))
+    with timed_run("await_agent_runs") as timer:
+        waiting = [execution for execution in executions.values() if execution.status in WAITING_STATUSES]
+        if waiting and timeout > 0:
+            with wait_slot(session, source_agent_execution_id) as may_wait, stage("wait"):
+                wait_for_agent_executions(session, waiting, timeout if may_wait else 0, return_when_any=return_when_any, on_poll=get_wait_hook(session))
+        elif waiting and is_scheduler_enabled():
+            get_dispatch_hook(session)()
+            session.expire_all()
+
+        results = []
+        for handle, (agent_id, agent_execution_id, last_feed_id) in zip(handles, parsed):
+            execution = executions.get(agent_execution_id)
+            if execution is None or (agent_id is not None and execution.agent_id != agent_id):
+                results.append({'handle': handle, 'agent_id': agent_id, 'agent_execution_id': agent_execution_id,
+                                'status': None, 'done': True, 'wait_state': "Not Found", 'execution': None,
+                                'feed': None, 'resources': None})
+                continue
+
+            done = execution.status not in WAITING_STATUSES
+            feed = None
             if return_feed:
-                agent_execution_feed = get_agent_execution_feed(agent_execution_created.id, session)
-
-            resource_manager_obj = ResourceManager(target_agent_id, session)
-            resources = resource_manager_obj.get_all_resources(execution_result.id)
-
-    except Exception as e:
-        waitedResult = "Errored"
-        logger.error(f"Error occurred while executing save scheduled agent tool: {e}" + traceback.print_exc()) 
-    finally:
-        return {
-            'agent_id': target_agent_id,
-            'agent_execution_id': agent_execution_created.id if agent_execution_created != None else None,
-            'wait_state': waitedResult,
-            'execution': execution_result,
-            'feed': agent_execution_feed,
-            'resources': resources
-        }
\ No newline at end of file
+                with stage("feed"):
+                    feed = get_agent_execution_feed(execution.id, session, after_feed_id=last_feed_id)
+                last_feed_id = feed['last_feed_id']
+                count("feed_entries", len(feed['feeds']))
+            resources = None
+            if done:
+                with stage("resources"):
+                    resources = ResourceManager(execution.agent_id, session).get_all_resources(execution.id)
+            results.append({
+                'handle': format_run_handle(execution.agent_id, execution.id, last_feed_id),
+                'agent_id': execution.agent_id,
+                'agent_execution_id': execution.id,
+                'status': execution.status,
+                'done': done,
+                'wait_state': get_wait_state(execution, timeout) if done else "Running",
+                'execution': execution,
+                'feed': feed,
+                'resources': resources
+            })
+
+    finished = sum(1 for result in results if result['done'])
+    return {
+        'wait_state': "Done" if finished == len(results) else f"Running ({finished}/{len(results)} done)",
+        'runs': results,
+        'timings': timer.summary()
+    }
+
+def get_agent_run_statuses(session, agent_execution_ids: list) -> list:
+    """
+    Get the status of several agent executions in one query.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_execution_ids (list[int]): The executions to look up.
+
+    Returns:
+        list[dict]: One entry per id, in the order given, with the status, last update and execution
+        times, call and token counters and the number of feed entries. Unknown ids have a None status.
+    """
+    agent_execution_ids = list(dict.fromkeys(agent_execution_ids))
+    if not agent_execution_ids:
+        return []
+
+    feeds = session.query(AgentExecutionFeed.agent_execution_id,
+                          func.count(AgentExecutionFeed.id).label("feed_length"),
+                          func.max(AgentExecutionFeed.id).label("last_feed_id")) \
+        .filter(AgentExecutionFeed.agent_execution_id.in_(agent_execution_ids)) \
+        .group_by(AgentExecutionFeed.agent_execution_id).subquery()
+    rows = session.query(AgentExecution.id, AgentExecution.agent_id, AgentExecution.status, AgentExecution.updated_at,
+                         AgentExecution.last_execution_time, AgentExecution.num_of_calls, AgentExecution.num_of_tokens,
+                         feeds.c.feed_length, feeds.c.last_feed_id) \
+        .outerjoin(feeds, feeds.c.agent_execution_id == AgentExecution.id) \
+        .filter(AgentExecution.id.in_(agent_execution_ids)).all()
+    count("status_rows", len(rows))
+
+    by_id = {row.id: row for row in rows}
+    statuses = []
+    for agent_execution_id in agent_execution_ids:
+        row = by_id.get(agent_execution_id)
+        if row is None:
+            statuses.append({'agent_execution_id': agent_execution_id, 'agent_id': None, 'status': None, 'done': True,
+                             'updated_at': None, 'last_execution_time': None, 'num_of_calls': None,
+                             'num_of_tokens': None, 'feed_length': 0, 'last_feed_id': None})
+            continue
+        statuses.append({
+            'agent_execution_id': row.id,
+            'agent_id': row.agent_id,
+            'status': row.status,
+            'done': row.status not in WAITING_STATUSES,
+            'updated_at': row.updated_at,
+            'last_execution_time': row.last_execution_time,
+            'num_of_calls': row.num_of_calls or 0,
+            'num_of_tokens': row.num_of_tokens or 0,
+            'feed_length': row.feed_length or 0,
+            'last_feed_id': row.last_feed_id
+        })
+    return statuses
+
+def poll_agent_run_statuses(session, agent_execution_ids: list, timeout: float = 0, source_agent_execution_id: Optional[int] = None, poll_interval: Optional[float] = None):
+    """
+    Get the status of several agent executions, optionally waiting until one of them changes.
+
+    With a `timeout` the call blocks until the status, counters or feed length of any execution
+    differ from the first read, or the timeout passes; the timeout is capped at
+    AGENT_MANAGER_AWAIT_MAX_TIMEOUT seconds. Status changes wake the call immediately, other changes
+    are noticed on the next fallback read every AGENT_MANAGER_WAIT_POLL_INTERVAL seconds.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_execution_ids (list[int]): The executions to look up.
+        timeout (float): Maximum number of seconds to wait for a change. 0 only reads them.
+        source_agent_execution_id (int, optional): The calling execution, which holds a worker while
+            it waits. The executions are only read when waiting would leave no worker for them.
+        poll_interval (float, optional): Seconds between fallback reads.
+
+    Returns:
+        dict: The ids of the executions that changed while waiting and one status per id.
+    """
+    if poll_interval is None:
+        poll_interval = float(get_config("AGENT_MANAGER_WAIT_POLL_INTERVAL", 15))
+    timeout = min(max(float(timeout or 0), 0), float(get_config("AGENT_MANAGER_AWAIT_MAX_TIMEOUT", 600)))
+
+    notifier = get_notifier()
+    with timed_run("poll_agent_run_statuses") as timer:
+        # Notifications are captured before every read, so a change right after it still wakes the wait
+        snapshot = notifier.snapshot(agent_execution_ids)
+        with stage("status"):
+            statuses = get_agent_run_statuses(session, agent_execution_ids)
+        changed = []
+        if timeout > 0 and any(not status['done'] for status in statuses):
+            ensure_status_listener(session.get_bind())
+            on_poll = get_wait_hook(session)
+            started = time.monotonic()
+            with wait_slot(session, source_agent_execution_id) as may_wait, stage("wait"):
+                while may_wait:
+                    remaining = timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        break
+                    notifier.wait_any(snapshot, min(poll_interval, remaining))
+                    count("wait_wakeups")
+                    if on_poll is not None:
+                        on_poll()
+                    snapshot = notifier.snapshot(agent_execution_ids)
+                    current = get_agent_run_statuses(session, agent_execution_ids)
+                    changed = [status['agent_execution_id'] for status, previous in zip(current, statuses) if status != previous]
+                    if changed:
+                        statuses = current
+                        break
+
+    return {
+        'changed': changed,
+        'runs': statuses,
+        'timings': timer.summary()
+    }
@@ -0,0 +1,138 @@
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+from superagi.models.db import connect_db
+from superagi.lib.logger import logger
+
+_engine = None
+_session_registry = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Returns the pooled engine the toolkit uses, the one SuperAGI's `connect_db()` returns.
+
+    No engine of its own is created, so the toolkit shares SuperAGI's connection pool and its size
+    settings. `connect_db()` is only called once per process, for SuperAGI versions that build a new
+    engine on every call.
+
+    Returns:
+        Engine: The shared engine.
+    """
+    global _engine, _session_registry
+    if _engine is not None:
+        return _engine
+
+    with _engine_lock:
+        if _engine is None:
+            engine = connect_db()
+            _session_registry = scoped_session(sessionmaker(bind=engine))
+            _engine = engine
+            logger.info("get_engine: using SuperAGI's engine for the agent manager")
+    return _engine
+
+
+def get_session_registry():
+    """
+    Returns the thread-scoped session registry bound to the shared engine.
+    """
+    get_engine()
+    return _session_registry
+
+
+@contextmanager
+def session_scope():
+    """
+    Provides a session from the shared pool for the duration of a block.
+
+    Commits when the block succeeds, rolls back when it raises, and always returns the connection to
+    the pool. Blocks nested in the same thread share the outer block's session, which is only
+    committed and released when the outermost block ends.
+    """
+    registry = get_session_registry()
+    if registry.registry.has():
+        yield registry()
+        return
+
+    session = registry()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        registry.remove()
+
+
+@contextmanager
+def separate_session(session):
+    """
+    Provides a new session on the engine another session is bound to, closed when the block ends.
+
+    For changes that are committed or rolled back on their own, without touching the transaction of
+    `session`.
+
+    Args:
+        session (Session): The caller's session.
+    """
+    bind = session.get_bind()
+    own_session = Session(bind=getattr(bind, "engine", bind))
+    try:
+        yield own_session
+    finally:
+        own_session.close()
+
+
+@contextmanager
+def tool_session(toolkit_config):
+    """
+    Provides the session a tool should use for one execution.
+
+    Uses the session SuperAGI handed to the toolkit when there is one, and otherwise a scoped session
+    from the shared pool that is released when the block ends.
+
+    Args:
+        toolkit_config (BaseToolkitConfiguration): The tool's toolkit configuration, may be None.
+    """
+    session = getattr(toolkit_config, "session", None) if toolkit_config else None
+    if session is not None:
+        yield session
+    else:
+        with session_scope() as session:
+            yield session
+
+
+def get_pool_stats() -> dict:
+    """
+    Returns the usage of the shared connection pool.
+
+    Returns:
+        dict: Pool size, checked in/out connections and current overflow, or an empty dict before the
+        engine has been created.
+    """
+    if _engine is None:
+        return {}
+    pool = _engine.pool
+    stats = {"status": pool.status()}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
+
+
+def dispose_engine():
+    """
+    Closes every pooled connection of the shared engine and forgets it, e.g. after a worker fork.
+    """
+    global _engine, _session_registry
+    with _engine_lock:
+        if _session_registry is not None:
+            _session_registry.remove()
+        if _engine is not None:
+            _engine.dispose()
+        _engine = None
+        _session_registry = None
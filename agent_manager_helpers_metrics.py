@@ -0,0 +1,318 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from superagi.config.config import get_config
+from superagi.lib.logger import logger
+
+# Upper bounds in seconds of the stage duration histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_active = threading.local()
+
+
+class RunTimer:
+    """
+    Collects the stage timings, query counts and counters of one tool call.
+
+    Stages may be nested; their times are inclusive and every SQL statement is counted against the
+    innermost open stage. Repeated stages (e.g. one "transfer" per fan-out job) are aggregated.
+
+    Args:
+        tool (str): Name of the tool or helper being timed, used as a metric label.
+    """
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.started = time.perf_counter()
+        self.finished = None
+        self.stages = {}
+        self.counters = {}
+        self._stack = []
+
+    @contextmanager
+    def stage(self, name: str):
+        entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "queries": 0})
+        self._stack.append(entry)
+        started = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry["seconds"] += time.perf_counter() - started
+            entry["calls"] += 1
+            self._stack.pop()
+
+    def count(self, name: str, value: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def count_query(self):
+        if self._stack:
+            self._stack[-1]["queries"] += 1
+        else:
+            self.count("queries_outside_stages")
+
+    @property
+    def total_seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> dict:
+        """
+        Returns the timings as plain values, with durations in milliseconds.
+        """
+        return {
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "stages": {
+                name: {"ms": round(entry["seconds"] * 1000, 3), "calls": entry["calls"], "queries": entry["queries"]}
+                for name, entry in self.stages.items()
+            },
+            "counters": {name: round(value, 3) if isinstance(value, float) else value
+                         for name, value in self.counters.items()}
+        }
+
+
+class Histogram:
+    """
+    Cumulative bucket histogram in the Prometheus style.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """
+    Process-wide aggregate of finished runs: stage duration histograms, run duration histograms and
+    counters, all labelled by tool (and stage).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = {}
+        self.run_seconds = {}
+        self.stage_queries = {}
+        self.counters = {}
+
+    def record(self, timer: RunTimer):
+        with self._lock:
+            self.run_seconds.setdefault(timer.tool, Histogram()).observe(timer.total_seconds)
+            for name, entry in timer.stages.items():
+                key = (timer.tool, name)
+                self.stage_seconds.setdefault(key, Histogram()).observe(entry["seconds"])
+                self.stage_queries[key] = self.stage_queries.get(key, 0) + entry["queries"]
+            for name, value in timer.counters.items():
+                key = (timer.tool, name)
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def render_prometheus(self) -> str:
+        """
+        Returns every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            lines.append("# HELP agent_manager_run_seconds Duration of agent manager tool calls.")
+            lines.append("# TYPE agent_manager_run_seconds histogram")
+            for tool, histogram in sorted(self.run_seconds.items()):
+                _render_histogram(lines, "agent_manager_run_seconds", {"tool": tool}, histogram)
+
+            lines.append("# HELP agent_manager_stage_seconds Duration of the stages of agent manager tool calls.")
+            lines.append("# TYPE agent_manager_stage_seconds histogram")
+            for (tool, stage), histogram in sorted(self.stage_seconds.items()):
+                _render_histogram(lines, "agent_manager_stage_seconds", {"tool": tool, "stage": stage}, histogram)
+
+            lines.append("# HELP agent_manager_stage_queries_total SQL statements executed per stage.")
+            lines.append("# TYPE agent_manager_stage_queries_total counter")
+            for (tool, stage), value in sorted(self.stage_queries.items()):
+                lines.append(f"agent_manager_stage_queries_total{_labels({'tool': tool, 'stage': stage})} {value}")
+
+            lines.append("# HELP agent_manager_counter_total Counters reported by agent manager tool calls.")
+            lines.append("# TYPE agent_manager_counter_total counter")
+            for (tool, name), value in sorted(self.counters.items()):
+                lines.append(f"agent_manager_counter_total{_labels({'tool': tool, 'name': name})} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.stage_seconds.clear()
+            self.run_seconds.clear()
+            self.stage_queries.clear()
+            self.counters.clear()
+
+
+def _labels(labels: dict) -> str:
+    escaped = (key + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def _render_histogram(lines, name, labels, histogram):
+    for bound, count in histogram.cumulative():
+        lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf' if bound == float('inf') else bound})} {count}")
+    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+
+class MetricsExporter(ABC):
+    """
+    Receives every finished run. Subclass and pass to `add_exporter` to ship timings elsewhere.
+    """
+
+    @abstractmethod
+    def export(self, timer: RunTimer, registry: MetricsRegistry):
+        pass
+
+
+class JsonLogExporter(MetricsExporter):
+    """
+    Logs one JSON line with the summary of every finished run.
+    """
+
+    def export(self, timer: RunTimer, registry: MetricsRegistry):
+        logger.info(json.dumps({"agent_manager_metrics": timer.tool, **timer.summary()}))
+
+
+class PrometheusFileExporter(MetricsExporter):
+    """
+    Rewrites a Prometheus text file after every finished run, for node_exporter's textfile collector.
+
+    Args:
+        path (str): The .prom file to write.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, timer: RunTimer, registry: MetricsRegistry):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = os.path.join(directory, f".{uuid.uuid4().hex}.prom.part")
+        with open(temp_path, "w") as fp:
+            fp.write(registry.render_prometheus())
+        os.replace(temp_path, self.path)
+
+
+_registry = MetricsRegistry()
+_exporters = None
+_exporters_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
+
+
+def get_exporters() -> list:
+    """
+    Returns the configured exporters, built from AGENT_MANAGER_METRICS_EXPORTER on first use.
+
+    The setting is a comma separated list of "json" and "prometheus"; "none" (the default) exports
+    nothing, though the registry still aggregates and runs still carry their timing summary.
+    """
+    global _exporters
+    if _exporters is None:
+        with _exporters_lock:
+            if _exporters is None:
+                exporters = []
+                names = str(get_config("AGENT_MANAGER_METRICS_EXPORTER", "none")).lower().split(",")
+                for name in (name.strip() for name in names):
+                    if name == "json":
+                        exporters.append(JsonLogExporter())
+                    elif name == "prometheus":
+                        exporters.append(PrometheusFileExporter(
+                            get_config("AGENT_MANAGER_METRICS_FILE", "workspace/agent_manager_metrics.prom")))
+                    elif name and name != "none":
+                        logger.warning(f"get_exporters: unknown metrics exporter '{name}'")
+                _exporters = exporters
+    return _exporters
+
+
+def add_exporter(exporter: MetricsExporter):
+    """
+    Registers an additional exporter for every finished run.
+    """
+    get_exporters().append(exporter)
+
+
+@contextmanager
+def timed_run(tool: str):
+    """
+    Times one tool call. Inside the block `stage` and `count` report to the returned timer, and SQL
+    statements run on this thread are counted. When the block ends the run is recorded in the
+    registry and handed to the exporters.
+
+    Nested calls (e.g. a fan-out launching runs) report into the outermost run.
+
+    Args:
+        tool (str): Name used as the metric label.
+
+    Yields:
+        RunTimer: The timer, whose `summary()` can be returned to the caller.
+    """
+    outer = getattr(_active, "timer", None)
+    if outer is not None:
+        yield outer
+        return
+
+    timer = RunTimer(tool)
+    _active.timer = timer
+    try:
+        yield timer
+    finally:
+        _active.timer = None
+        timer.finished = time.perf_counter()
+        _registry.record(timer)
+        for exporter in get_exporters():
+            try:
+                exporter.export(timer, _registry)
+            except Exception:
+                logger.error(f"Error occured while exporting metrics.\n\n{traceback.format_exc()}")
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Times a stage of the active run. Does nothing outside of `timed_run`.
+    """
+    timer = getattr(_active, "timer", None)
+    if timer is None:
+        yield None
+        return
+    with timer.stage(name) as entry:
+        yield entry
+
+
+def count(name: str, value: float = 1):
+    """
+    Adds `value` to a counter of the active run. Does nothing outside of `timed_run`.
+    """
+    timer = getattr(_active, "timer", None)
+    if timer is not None:
+        timer.count(name, value)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    timer = getattr(_active, "timer", None)
+    if timer is not None:
+        timer.count_query()
@@ -0,0 +1,422 @@
+import select
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from superagi.config.config import get_config
+from superagi.models.agent_execution import AgentExecution
+from superagi.lib.logger import logger
+from agent_manager_helpers_metrics import count
+
+AGENT_EXECUTION_STATUS_CHANNEL = "agent_execution_status"
+AGENT_EXECUTION_STATUS_TRIGGER = "agent_manager_execution_status_notify"
+AGENT_EXECUTION_STATUS_FUNCTION = "agent_manager_notify_execution_status"
+
+# like ('CREATED', 'RUNNING', 'PAUSED', 'COMPLETED', 'TERMINATED')
+WAITING_STATUSES = ('CREATED', 'RUNNING')
+# Statuses of executions that can still take up a worker or spend tokens
+ACTIVE_STATUSES = WAITING_STATUSES + ('PAUSED', 'WAITING_FOR_PERMISSION')
+
+
+class ExecutionNotifier:
+    """
+    In-process hub that wakes up waiters when the status of an agent execution changes.
+
+    Publishers call `publish` whenever a status change is observed, either from an ORM flush in this
+    process or from a Postgres NOTIFY relayed by `PostgresStatusListener`. Waiters take a `snapshot`
+    of the executions they care about *before* reading the database, then block in `wait_any`.
+    Wake-ups only mean "re-read the database", so a spurious one is harmless.
+
+    Args:
+        max_tracked (int): Number of execution ids to remember before the oldest are dropped.
+    """
+
+    def __init__(self, max_tracked: int = 10000):
+        self.max_tracked = max_tracked
+        self._condition = threading.Condition()
+        self._versions = OrderedDict()
+        self._generation = 0
+
+    def publish(self, agent_execution_id: int, status: str = None):
+        """
+        Records a status change for an agent execution and wakes up all waiters.
+
+        Args:
+            agent_execution_id (int): The ID of the agent execution that changed.
+            status (str, optional): The new status, if known.
+        """
+        with self._condition:
+            version, _ = self._versions.pop(agent_execution_id, (0, None))
+            self._versions[agent_execution_id] = (version + 1, status)
+            while len(self._versions) > self.max_tracked:
+                self._versions.popitem(last=False)
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wake(self):
+        """
+        Wakes up `wait_change` callers without recording a change for any execution.
+        """
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def generation(self) -> int:
+        """
+        Returns a counter increased by every change, to pass to `wait_change`.
+        """
+        with self._condition:
+            return self._generation
+
+    def snapshot(self, agent_execution_ids) -> dict:
+        """
+        Captures the current version of each execution so later changes can be detected.
+
+        Args:
+            agent_execution_ids (Iterable[int]): The executions to watch.
+
+        Returns:
+            dict: Mapping of execution id to its current version.
+        """
+        with self._condition:
+            return {agent_execution_id: self._versions.get(agent_execution_id, (0, None))[0]
+                    for agent_execution_id in agent_execution_ids}
+
+    def wait_any(self, snapshot: dict, timeout: float) -> list:
+        """
+        Blocks until any execution in `snapshot` has changed or the timeout expires.
+
+        Args:
+            snapshot (dict): The value returned by `snapshot`.
+            timeout (float): Maximum number of seconds to block.
+
+        Returns:
+            list[int]: The execution ids that changed, empty on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                changed = [agent_execution_id for agent_execution_id, version in snapshot.items()
+                           if self._versions.get(agent_execution_id, (0, None))[0] != version]
+                remaining = deadline - time.monotonic()
+                if changed or remaining <= 0:
+                    return changed
+                self._condition.wait(remaining)
+
+    def wait_change(self, generation: int, timeout: float) -> int:
+        """
+        Blocks until any execution has changed since `generation` was read or the timeout expires.
+
+        Args:
+            generation (int): The value returned by `generation` or by the previous call.
+            timeout (float): Maximum number of seconds to block.
+
+        Returns:
+            int: The current generation.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._generation == generation:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self._generation
+
+
+class PostgresStatusListener(threading.Thread):
+    """
+    Background thread that LISTENs on the status channel and relays notifications to a notifier.
+
+    Runs on a dedicated DBAPI connection taken out of the engine's pool, so every listening process
+    holds one connection more than its sessions use. The connection is invalidated on exit so it is
+    never handed back to the pool in autocommit mode.
+
+    Args:
+        engine (Engine): The engine to take the listening connection from.
+        notifier (ExecutionNotifier): The notifier to publish received changes to.
+        channel (str): The Postgres channel to LISTEN on.
+    """
+
+    def __init__(self, engine, notifier: ExecutionNotifier, channel: str = AGENT_EXECUTION_STATUS_CHANNEL):
+        super().__init__(name="agent-manager-status-listener", daemon=True)
+        self.engine = engine
+        self.notifier = notifier
+        self.channel = channel
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        backoff = 1
+        while not self._stopped.is_set():
+            raw_connection = None
+            try:
+                raw_connection = self.engine.raw_connection()
+                connection = getattr(raw_connection, "driver_connection", None) or raw_connection.connection
+                connection.set_isolation_level(0)  # ISOLATION_LEVEL_AUTOCOMMIT
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel};")
+                backoff = 1
+                logger.info(f"PostgresStatusListener: listening on {self.channel}")
+
+                while not self._stopped.is_set():
+                    if select.select([connection], [], [], 5) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notification = connection.notifies.pop(0)
+                        agent_execution_id, _, status = notification.payload.partition(":")
+                        self.notifier.publish(int(agent_execution_id), status or None)
+            except Exception:
+                logger.error(f"PostgresStatusListener: listener failed, reconnecting in {backoff}s.\n\n{traceback.format_exc()}")
+                self._stopped.wait(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                if raw_connection is not None:
+                    try:
+                        raw_connection.invalidate()
+                    except Exception:
+                        pass
+
+
+class StatusWatcher(threading.Thread):
+    """
+    Background thread running tasks whenever an agent execution changes status.
+
+    Lets work that follows from a status change, such as starting queued runs once a slot frees up,
+    happen even when no tool call is waiting. Every round runs each task with its own session. Rounds
+    are triggered by the notifier, and at least every `interval` seconds for changes made by processes
+    that notify nobody. Rounds start at least `min_interval` seconds apart, so a burst of changes is
+    handled by one round instead of one round each.
+
+    Args:
+        notifier (ExecutionNotifier): The notifier to follow.
+        interval (float): Most seconds between rounds.
+        tasks (dict, optional): Tasks to start with, by name.
+        min_interval (float): Fewest seconds between the starts of two rounds.
+    """
+
+    def __init__(self, notifier: ExecutionNotifier, interval: float, tasks: dict = None, min_interval: float = 0):
+        super().__init__(name="agent-manager-status-watcher", daemon=True)
+        self.notifier = notifier
+        self.interval = interval
+        self.min_interval = min_interval
+        self.tasks = dict(tasks or {})
+        self._stopped = threading.Event()
+
+    def add_task(self, task):
+        """
+        Adds `task(session)` to every round. Adding the same function again does nothing.
+        """
+        self.tasks[f"{task.__module__}.{task.__qualname__}"] = task
+
+    def stop(self):
+        self._stopped.set()
+        self.notifier.wake()
+
+    def run(self):
+        from agent_manager_helpers_db import session_scope
+
+        generation = self.notifier.generation()
+        while not self._stopped.is_set():
+            round_started = time.monotonic()
+            for name, task in list(self.tasks.items()):
+                try:
+                    with session_scope() as session:
+                        task(session)
+                except Exception:
+                    logger.error(f"StatusWatcher: {name} failed.\n\n{traceback.format_exc()}")
+            self.notifier.wait_change(generation, self.interval)
+            # Changes arriving until then are all handled by the next round
+            self._stopped.wait(max(self.min_interval - (time.monotonic() - round_started), 0))
+            generation = self.notifier.generation()
+
+
+_notifier = ExecutionNotifier()
+_listeners = {}
+_listeners_lock = threading.Lock()
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_notifier() -> ExecutionNotifier:
+    return _notifier
+
+
+def install_status_notify_trigger(engine):
+    """
+    Installs a trigger that NOTIFYs the status channel whenever an agent execution changes status.
+
+    The trigger covers status changes written by any process, including SuperAGI workers that never
+    import this toolkit. It is only created if missing, so calling this repeatedly is cheap.
+
+    Args:
+        engine (Engine): A Postgres engine.
+    """
+    table_name = AgentExecution.__tablename__
+    with engine.begin() as connection:
+        exists = connection.execute(text("SELECT 1 FROM pg_trigger WHERE tgname = :name"),
+                                    {"name": AGENT_EXECUTION_STATUS_TRIGGER}).first()
+        if exists:
+            return
+        connection.execute(text(f"""
+            CREATE OR REPLACE FUNCTION {AGENT_EXECUTION_STATUS_FUNCTION}() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('{AGENT_EXECUTION_STATUS_CHANNEL}', NEW.id || ':' || COALESCE(NEW.status, ''));
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql;
+        """))
+        connection.execute(text(f"""
+            CREATE TRIGGER {AGENT_EXECUTION_STATUS_TRIGGER}
+            AFTER UPDATE OF status ON {table_name}
+            FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+            EXECUTE PROCEDURE {AGENT_EXECUTION_STATUS_FUNCTION}();
+        """))
+    logger.info(f"install_status_notify_trigger: installed {AGENT_EXECUTION_STATUS_TRIGGER} on {table_name}")
+
+
+def ensure_status_listener(engine):
+    """
+    Starts the Postgres status listener for an engine, once per process.
+
+    Does nothing for non-Postgres engines or when AGENT_MANAGER_STATUS_LISTENER is disabled; waiters
+    then fall back to in-process notifications and polling.
+
+    Args:
+        engine (Engine): The engine the waiting session is bound to.
+    """
+    if engine is None or engine.dialect.name != "postgresql":
+        return
+    if str(get_config("AGENT_MANAGER_STATUS_LISTENER", "true")).lower() != "true":
+        return
+
+    key = str(engine.url)
+    with _listeners_lock:
+        if key in _listeners and _listeners[key].is_alive():
+            return
+        try:
+            install_status_notify_trigger(engine)
+        except Exception:
+            logger.error(f"ensure_status_listener: could not install notify trigger.\n\n{traceback.format_exc()}")
+        listener = PostgresStatusListener(engine, _notifier)
+        listener.start()
+        _listeners[key] = listener
+
+
+def watch_status_changes(engine, task):
+    """
+    Runs `task(session)` in the background after every status change this process hears of, and at
+    least every AGENT_MANAGER_BACKGROUND_INTERVAL seconds.
+
+    Rounds start at most every AGENT_MANAGER_BACKGROUND_MIN_INTERVAL seconds. The watcher thread,
+    and the Postgres status listener relaying changes made by other processes, are started on first
+    use. A process forked afterwards starts its own on its next call.
+
+    Args:
+        engine (Engine): The engine the calling session is bound to.
+        task (Callable[[Session], Any]): The task. Registering it again does nothing.
+    """
+    global _watcher
+    ensure_status_listener(engine)
+    with _watcher_lock:
+        if _watcher is not None and _watcher.is_alive():
+            _watcher.add_task(task)
+            return
+        _watcher = StatusWatcher(_notifier, float(get_config("AGENT_MANAGER_BACKGROUND_INTERVAL", 10)),
+                                 _watcher.tasks if _watcher is not None else None,
+                                 float(get_config("AGENT_MANAGER_BACKGROUND_MIN_INTERVAL", 1)))
+        _watcher.add_task(task)
+        _watcher.start()
+
+
+def stop_status_watcher():
+    """
+    Stops the watcher thread started by `watch_status_changes`, waiting for its current round.
+    """
+    global _watcher
+    with _watcher_lock:
+        watcher, _watcher = _watcher, None
+    if watcher is not None:
+        watcher.stop()
+        watcher.join()
+
+
+def wait_for_agent_executions(session, agent_executions: list, max_wait_time: float, return_when_any: bool = False,
+                              poll_interval: float = None, on_poll=None) -> float:
+    """
+    Blocks until the agent executions leave the CREATED/RUNNING states or the wait times out.
+
+    Status change notifications wake the waiter immediately; the database is only re-read on a
+    notification or every `poll_interval` seconds as a fallback for missed notifications.
+
+    Args:
+        session (Session): The session the executions are attached to.
+        agent_executions (list[AgentExecution]): The executions to wait for. Refreshed in place.
+        max_wait_time (float): Maximum number of seconds to wait.
+        return_when_any (bool): Return as soon as one execution has finished instead of all of them.
+        poll_interval (float, optional): Seconds between fallback refreshes.
+        on_poll (Callable[[], Any], optional): Called before every re-read, e.g. to start queued runs.
+
+    Returns:
+        float: The number of seconds spent waiting.
+    """
+    if poll_interval is None:
+        poll_interval = float(get_config("AGENT_MANAGER_WAIT_POLL_INTERVAL", 15))
+
+    ensure_status_listener(session.get_bind())
+
+    started = time.monotonic()
+    while True:
+        if on_poll is not None:
+            try:
+                on_poll()
+            except Exception:
+                logger.error(f"Error occured while polling.\n\n{traceback.format_exc()}")
+        snapshot = _notifier.snapshot([agent_execution.id for agent_execution in agent_executions])
+        for agent_execution in agent_executions:
+            session.refresh(agent_execution)
+        finished = [agent_execution for agent_execution in agent_executions if agent_execution.status not in WAITING_STATUSES]
+        remaining = max_wait_time - (time.monotonic() - started)
+        if (finished and return_when_any) or len(finished) == len(agent_executions) or remaining <= 0:
+            return time.monotonic() - started
+        sleep_started = time.monotonic()
+        _notifier.wait_any(snapshot, min(poll_interval, remaining))
+        count("wait_sleep_seconds", time.monotonic() - sleep_started)
+        count("wait_wakeups")
+
+
+def wait_for_agent_execution(session, agent_execution, max_wait_time: float, poll_interval: float = None,
+                             on_poll=None) -> float:
+    """
+    Blocks until a single agent execution leaves the CREATED/RUNNING states or the wait times out.
+
+    See `wait_for_agent_executions`.
+    """
+    return wait_for_agent_executions(session, [agent_execution], max_wait_time, poll_interval=poll_interval,
+                                     on_poll=on_poll)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_status_changes(session, flush_context):
+    changes = session.info.setdefault("agent_manager_status_changes", {})
+    for instance in list(session.new) + list(session.dirty):
+        if isinstance(instance, AgentExecution) and inspect(instance).attrs.status.history.has_changes():
+            changes[instance.id] = instance.status
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_status_changes(session):
+    for agent_execution_id, status in session.info.pop("agent_manager_status_changes", {}).items():
+        _notifier.publish(agent_execution_id, status)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_status_changes(session):
+    session.info.pop("agent_manager_status_changes", None)
@@ -0,0 +1,264 @@
+import json
+import time
+import traceback
+from typing import Optional
+
+from superagi.config.config import get_config
+from superagi.models.agent import Agent
+from superagi.models.agent_execution import AgentExecution
+from superagi.models.resource import Resource
+from superagi.lib.logger import logger
+from agent_manager_models import AgentPipeline, ensure_agent_manager_tables
+from agent_manager_helpers_data import launch_agent_run, collect_agent_run_result, get_agent_execution, \
+    get_wait_state, format_run_handle, DEFERRED_WAIT_STATE
+from agent_manager_helpers_notify import wait_for_agent_executions, WAITING_STATUSES
+from agent_manager_helpers_scheduler import wait_slot
+from agent_manager_helpers_run_tree import cancel_timed_out_run, get_wait_hook
+from agent_manager_helpers_metrics import timed_run, stage, count
+
+# Wait state of a stage whose execution has been started but not finished yet
+RUNNING_STAGE = "Waiting"
+
+
+def validate_pipeline(stages: list) -> list:
+    """
+    Check and normalize the stages of a pipeline.
+
+    Args:
+        stages (list[dict]): Stages with a `target_agent_id` and optional `name`, `depends_on`,
+            `files_for_agent_run` and `priority`.
+
+    Returns:
+        list[dict]: The stages with every key filled in, in the order given.
+
+    Raises:
+        ValueError: If the pipeline is empty or has more than AGENT_MANAGER_MAX_PIPELINE_STAGES stages,
+            a name is used twice, a dependency does not exist or the stages form a cycle.
+    """
+    if not stages:
+        raise ValueError("A pipeline needs at least one stage")
+    max_stages = int(get_config("AGENT_MANAGER_MAX_PIPELINE_STAGES", 20))
+    if len(stages) > max_stages:
+        raise ValueError(f"{len(stages)} stages requested, at most {max_stages} can be run by one pipeline")
+
+    normalized = []
+    for index, stage_definition in enumerate(stages):
+        normalized.append({
+            'name': str(stage_definition.get('name') or f"stage_{index + 1}"),
+            'target_agent_id': int(stage_definition['target_agent_id']),
+            'depends_on': [str(name) for name in stage_definition.get('depends_on') or []],
+            'files_for_agent_run': list(stage_definition.get('files_for_agent_run') or []),
+            'priority': int(stage_definition.get('priority') or 0),
+        })
+
+    names = [stage_definition['name'] for stage_definition in normalized]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Pipeline stage names must be unique, repeated: {', '.join(sorted(duplicates))}")
+    for stage_definition in normalized:
+        missing = [name for name in stage_definition['depends_on'] if name not in names]
+        if missing:
+            raise ValueError(f"Stage '{stage_definition['name']}' depends on unknown stages: {', '.join(missing)}")
+
+    # Kahn's algorithm: every stage must become ready eventually
+    remaining = {stage_definition['name']: set(stage_definition['depends_on']) for stage_definition in normalized}
+    while remaining:
+        ready = [name for name, depends_on in remaining.items() if not depends_on]
+        if not ready:
+            raise ValueError(f"Pipeline stages form a cycle: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for depends_on in remaining.values():
+            depends_on.difference_update(ready)
+
+    return normalized
+
+
+def _save_state(session, pipeline, state: dict):
+    pipeline.state = json.dumps(state)
+    session.commit()
+
+
+def _get_stage_outputs(session, stage_definition: dict, stage_state: dict):
+    agent = Agent.get_agent_from_id(session=session, agent_id=stage_definition['target_agent_id'])
+    agent_execution = AgentExecution.get_agent_execution_from_id(session=session, agent_execution_id=stage_state['agent_execution_id'])
+    file_names = [name for (name,) in session.query(Resource.name).filter(
+        Resource.agent_execution_id == stage_state['agent_execution_id'], Resource.channel == "OUTPUT").all()]
+    return agent, agent_execution, file_names
+
+
+def run_agent_pipeline(session, source_agent_id, source_agent_execution_id, stages: Optional[list] = None,
+                       pipeline_id: Optional[int] = None, max_concurrency: int = 5, stage_timeout: float = 60 * 10,
+                       return_feed: bool = False, feed_token_budget: Optional[int] = None):
+    """
+    Run a DAG of agent stages, or resume one started earlier.
+
+    A stage starts once every stage it depends on succeeded, with the output resources of those
+    stages handed over as its input files (next to its own `files_for_agent_run` from the calling
+    execution). Independent stages run in parallel, at most `max_concurrency` at once. Stages whose
+    dependencies failed are skipped. Every stage gets its own `stage_timeout`, counted from when it
+    was started or picked up again by a resuming call, and limited to AGENT_MANAGER_AWAIT_MAX_TIMEOUT
+    seconds. The execution and wait state of every stage is stored in `agent_manager_pipelines` as
+    soon as it changes, so passing the returned `pipeline_id` back continues where an interrupted
+    call stopped without starting any stage twice.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        source_agent_id (int): The agent running the pipeline.
+        source_agent_execution_id (int): The execution running the pipeline.
+        stages (list[dict], optional): The stages, see `validate_pipeline`. Required for new pipelines.
+        pipeline_id (int, optional): A pipeline of the same agent to resume.
+        max_concurrency (int): Maximum number of stages running at the same time.
+        stage_timeout (float): Maximum number of seconds to wait for each stage, 0 for the default.
+        return_feed (bool): Include each finished stage's feed in its result.
+        feed_token_budget (int, optional): Return each feed as a digest of at most this many tokens.
+
+    Returns:
+        dict: The pipeline id, status and wait state, and one result per stage in definition order.
+
+    Raises:
+        ValueError: If the stages are invalid or the pipeline to resume does not exist.
+    """
+    ensure_agent_manager_tables(session.get_bind())
+
+    if pipeline_id is not None:
+        pipeline = session.query(AgentPipeline).filter(AgentPipeline.id == pipeline_id,
+                                                       AgentPipeline.source_agent_id == source_agent_id).first()
+        if pipeline is None:
+            raise ValueError(f"Pipeline {pipeline_id} not found")
+        definition = json.loads(pipeline.definition)
+    else:
+        definition = validate_pipeline(stages)
+        pipeline = AgentPipeline(source_agent_id=source_agent_id, source_agent_execution_id=source_agent_execution_id,
+                                 status="RUNNING", definition=json.dumps(definition), state="{}")
+        session.add(pipeline)
+        session.commit()
+    pipeline_id = pipeline.id
+    state = json.loads(pipeline.state)
+    by_name = {stage_definition['name']: stage_definition for stage_definition in definition}
+
+    stage_timeout = min(max(float(stage_timeout or 60 * 10), 0), float(get_config("AGENT_MANAGER_AWAIT_MAX_TIMEOUT", 600)))
+    max_concurrency = max(1, max_concurrency)
+    running = {}
+    deferred = False
+
+    with timed_run("run_agent_pipeline") as timer, wait_slot(session, source_agent_execution_id) as may_wait:
+        # Stages started before an interruption are picked up again
+        for name, stage_state in state.items():
+            if stage_state.get('wait_state') != RUNNING_STAGE:
+                continue
+            agent_execution = AgentExecution.get_agent_execution_from_id(session=session, agent_execution_id=stage_state['agent_execution_id'])
+            if agent_execution is None:
+                stage_state['wait_state'] = "Errored"
+            else:
+                running[name] = (agent_execution, time.monotonic())
+        _save_state(session, pipeline, state)
+
+        while True:
+            # Repeat until no stage changes, skips can cascade to stages defined earlier
+            changed = True
+            while changed:
+                changed = False
+                for stage_definition in definition:
+                    name = stage_definition['name']
+                    if name in state:
+                        continue
+                    depends_on = [state.get(dependency, {}).get('wait_state') for dependency in stage_definition['depends_on']]
+                    if any(wait_state not in (None, RUNNING_STAGE, "Success") for wait_state in depends_on):
+                        state[name] = {'agent_execution_id': None, 'wait_state': "Skipped"}
+                        _save_state(session, pipeline, state)
+                        changed = True
+                        continue
+                    if any(wait_state != "Success" for wait_state in depends_on) or len(running) >= max_concurrency:
+                        continue
+
+                    try:
+                        with stage("handoff"):
+                            upstream_files = [_get_stage_outputs(session, by_name[dependency], state[dependency])
+                                              for dependency in stage_definition['depends_on']]
+                        agent_execution = launch_agent_run(session, source_agent_id, source_agent_execution_id,
+                                                           stage_definition['target_agent_id'],
+                                                           stage_definition['files_for_agent_run'],
+                                                           priority=stage_definition['priority'],
+                                                           upstream_files=[source for source in upstream_files if source[2]])
+                    except Exception as e:
+                        logger.error(f"Error occurred while starting pipeline stage {name}: {e}\n\n{traceback.format_exc()}")
+                        agent_execution = None
+                    if agent_execution is None:
+                        state[name] = {'agent_execution_id': None, 'wait_state': "Errored"}
+                    else:
+                        state[name] = {'agent_execution_id': agent_execution.id, 'wait_state': RUNNING_STAGE}
+                        running[name] = (get_agent_execution(agent_execution.id, session), time.monotonic())
+                        count("stages_started")
+                    changed = True
+                    _save_state(session, pipeline, state)
+
+            if not running:
+                break
+
+            # Without a worker to wait in, the stages are only checked once
+            now = time.monotonic()
+            remaining = min(stage_timeout - (now - started) for _, started in running.values()) if may_wait else 0
+            with stage("wait"):
+                wait_for_agent_executions(session, [agent_execution for agent_execution, _ in running.values()],
+                                          max(remaining, 0), return_when_any=True, on_poll=get_wait_hook(session))
+
+            now = time.monotonic()
+            finished_any = False
+            for name, (agent_execution, started) in list(running.items()):
+                if agent_execution.status in WAITING_STATUSES and (now - started < stage_timeout or not may_wait):
+                    continue
+                del running[name]
+                state[name]['wait_state'] = get_wait_state(agent_execution, stage_timeout)
+                cancel_timed_out_run(session, agent_execution)
+                _save_state(session, pipeline, state)
+                finished_any = True
+
+            if not may_wait and not finished_any:
+                deferred = True
+                break
+
+        finished = [state.get(stage_definition['name'], {}).get('wait_state') for stage_definition in definition]
+        succeeded = sum(1 for wait_state in finished if wait_state == "Success")
+        if succeeded == len(definition):
+            pipeline.status = "COMPLETED"
+        elif all(wait_state not in (None, RUNNING_STAGE) for wait_state in finished):
+            pipeline.status = "FAILED"
+        _save_state(session, pipeline, state)
+
+        results = []
+        for stage_definition in definition:
+            name = stage_definition['name']
+            stage_state = state.get(name, {})
+            agent_execution_id = stage_state.get('agent_execution_id')
+            result = {
+                'name': name,
+                'agent_id': stage_definition['target_agent_id'],
+                'agent_execution_id': agent_execution_id,
+                'handle': format_run_handle(stage_definition['target_agent_id'], agent_execution_id) if agent_execution_id else None,
+                'wait_state': stage_state.get('wait_state', "Pending"),
+                'execution': None,
+                'feed': None,
+                'resources': None
+            }
+            if agent_execution_id and result['wait_state'] != RUNNING_STAGE:
+                try:
+                    result['execution'] = AgentExecution.get_agent_execution_from_id(session=session, agent_execution_id=agent_execution_id)
+                    result['feed'], result['resources'] = collect_agent_run_result(session, stage_definition['target_agent_id'], result['execution'], return_feed, feed_token_budget)
+                except Exception as e:
+                    logger.error(f"Error occurred while collecting pipeline stage {name}: {e}\n\n{traceback.format_exc()}")
+            results.append(result)
+
+    if pipeline.status == "COMPLETED":
+        wait_state = "Success"
+    elif pipeline.status == "FAILED":
+        wait_state = f"Failed ({succeeded}/{len(definition)} stages succeeded)"
+    else:
+        wait_state = DEFERRED_WAIT_STATE if deferred else "Running"
+    return {
+        'pipeline_id': pipeline_id,
+        'status': pipeline.status,
+        'wait_state': wait_state,
+        'stages': results,
+        'timings': timer.summary()
+    }
@@ -0,0 +1,137 @@
+from typing import Optional
+
+from agent_manager_helpers import get_column_keys, serialize
+
+# Named field lists per kind of payload. "full" (or no profile) keeps every column.
+PROFILES = {
+    "agent": {
+        "summary": ("id", "name", "description"),
+    },
+    "toolkit": {
+        "summary": ("id", "name", "description"),
+    },
+    "organisation": {
+        "summary": ("id", "name"),
+    },
+    "project": {
+        "summary": ("id", "name", "organisation_id"),
+    },
+    "execution": {
+        "summary": ("id", "agent_id", "name", "status", "num_of_calls", "num_of_tokens", "last_execution_time"),
+    },
+    "resource": {
+        "summary": ("id", "name", "type", "size", "channel"),
+    },
+}
+
+
+def resolve_fields(kind: str, fields: Optional[list] = None, profile: Optional[str] = None):
+    """
+    Work out which fields to keep for a kind of payload.
+
+    Args:
+        kind (str): One of the PROFILES keys.
+        fields (list[str], optional): Explicit field list, takes precedence over `profile`.
+        profile (str, optional): A named profile such as "summary". "full" keeps everything.
+
+    Returns:
+        tuple | None: The fields to keep, or None to keep every field.
+
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    if fields:
+        return tuple(fields)
+    if not profile or profile == "full":
+        return None
+    if profile not in PROFILES.get(kind, {}):
+        raise ValueError(f"Unknown profile '{profile}' for {kind}, expected one of: full, {', '.join(PROFILES.get(kind, {}))}")
+    return PROFILES[kind][profile]
+
+
+def _all_fields(obj):
+    if isinstance(obj, dict):
+        return tuple(obj.keys())
+    return get_column_keys(type(obj))
+
+
+def _get(obj, field):
+    if isinstance(obj, dict):
+        return obj.get(field)
+    return getattr(obj, field, None)
+
+
+def project(obj, fields=None):
+    """
+    Pick the given fields of an ORM object or dict.
+
+    Args:
+        obj (Any): The object to project. None is returned as is.
+        fields (tuple, optional): The fields to keep, every column when None.
+
+    Returns:
+        dict: JSON-safe field values.
+    """
+    if obj is None:
+        return None
+    return {field: serialize(_get(obj, field)) for field in (fields or _all_fields(obj))}
+
+
+def to_table(objs, fields=None):
+    """
+    Encode a list of objects compactly: the column names once, then one row of values per object.
+
+    Args:
+        objs (list): ORM objects or dicts of the same kind.
+        fields (tuple, optional): The columns to keep, every column of the first object when None.
+
+    Returns:
+        dict: {"columns": [...], "rows": [[...], ...]}
+    """
+    objs = list(objs or [])
+    columns = list(fields or (_all_fields(objs[0]) if objs else ()))
+    return {
+        "columns": columns,
+        "rows": [[serialize(_get(obj, column)) for column in columns] for obj in objs]
+    }
+
+
+def project_list(objs, fields=None, compact: bool = False):
+    """
+    Project every object of a list, or encode the list as a table when `compact` is set.
+    """
+    if objs is None:
+        return None
+    if compact:
+        return to_table(objs, fields)
+    return [project(obj, fields) for obj in objs]
+
+
+def project_run_result(result: dict, profile: Optional[str] = None, compact: bool = False):
+    """
+    Shrink the result of a child agent run for the calling agent's context.
+
+    The execution and its resources are reduced to the fields of `profile`, and with `compact` the
+    resources are encoded as a table. Results of fan-outs, awaits and pipelines are projected run
+    by run.
+
+    Args:
+        result (dict): The value returned by `execute_save_scheduled_agent_tool` or a fan-out.
+        profile (str, optional): A named profile such as "summary". "full" keeps everything.
+        compact (bool): Encode the resource list as a table.
+
+    Returns:
+        dict: The projected result. The input is returned unchanged when there is nothing to do.
+    """
+    if result is None or ((not profile or profile == "full") and not compact):
+        return result
+    for key in ('jobs', 'runs', 'stages'):
+        if key in result:
+            return {**result, key: [project_run_result(job, profile, compact) for job in result[key]]}
+
+    projected = dict(result)
+    if 'execution' in result:
+        projected['execution'] = project(result['execution'], resolve_fields("execution", profile=profile))
+    if 'resources' in result:
+        projected['resources'] = project_list(result['resources'], resolve_fields("resource", profile=profile), compact)
+    return projected
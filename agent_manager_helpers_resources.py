@@ -1,14 +1,59 @@
 import os
-import boto3
-from botocore.exceptions import NoCredentialsError
+import mmap
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
 
 from superagi.config.config import get_config
 from superagi.models.agent import Agent
 from superagi.models.resource import Resource
-from superagi.worker import summarize_resource
 from superagi.types.storage_types import StorageType
 from superagi.helper.resource_helper import ResourceHelper
 from superagi.lib.logger import logger
+from agent_manager_helpers_blobs import BlobStore, HashingReader, write_chunks, clone_file
+
+class LazyClient:
+    """
+    Class attribute that creates its client on first access and shares it afterwards.
+
+    Keeps heavy SDKs such as boto3 out of the import of this module, so loading the toolkit and
+    building its tools stays cheap for processes that never touch S3.
+
+    Args:
+        factory (Callable[[], Any]): Creates the client.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def __get__(self, instance, owner):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+
+def create_s3_client():
+    import boto3
+
+    return boto3.client(
+        's3',
+        aws_access_key_id=get_config("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=get_config("AWS_SECRET_ACCESS_KEY"),
+    )
+
+
+def _no_credentials_error():
+    # Only evaluated once an upload failed, see ResourceManager.upload
+    from botocore.exceptions import NoCredentialsError
+
+    return NoCredentialsError
+
 
 class ResourceManager:
     """
@@ -20,11 +65,7 @@ class ResourceManager:
         db_session (Session): The session to make changes to the database.
     """
 
-    s3 = boto3.client(
-        's3',
-        aws_access_key_id=get_config("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=get_config("AWS_SECRET_ACCESS_KEY"),
-    )
+    s3 = LazyClient(create_s3_client)
 
     def __init__(self, agent_id, db_session):
         self.agent_id = agent_id
@@ -56,7 +97,8 @@ class ResourceManager:
         Args:
             file (File): The file to be uploaded.
             name (str): The name of the file.
-            size (int): The size of the file.
+            size (int): The size of the file. Only informative, the stored size is measured while
+                the file is streamed.
             type (str): The type of the file.
             agent_execution_id (int, optional): The ID of the agent execution.
 
@@ -81,27 +123,204 @@ class ResourceManager:
                                                                        path=save_directory,
                                                                        agent_execution_id=agent_execution_id)
         file_path = os.path.join(save_directory, file.filename)
-        if storage_type == StorageType.FILE:
-            with open(file_path, "wb") as f:
-                contents = file.read()
-                f.write(contents)
-        elif storage_type == StorageType.S3:
-            bucket_name = get_config("BUCKET_NAME")
-            file_path = 'resources' + file_path
-            try:
-                s3.upload_fileobj(file, bucket_name, file_path)
+        blob = None
+        try:
+            if BlobStore.is_enabled():
+                # Store the content once by hash; the per-agent path SuperAGI reads is a clone (FILE) or
+                # server-side copy (S3) of the blob
+                blob_store = BlobStore(self.db_session, self.s3)
+                blob = blob_store.put(file, self.get_chunk_size(), self._transfer_config())
+                if storage_type == StorageType.FILE:
+                    clone_file(blob.path, file_path)
+                else:
+                    file_path = 'resources' + file_path
+                    self._copy_object(blob.path, file_path)
+                size, digest = blob.size, blob.digest
+            elif storage_type == StorageType.FILE:
+                reader = HashingReader(file)
+                write_chunks(reader, file_path, self.get_chunk_size())
+                size, digest = reader.size, reader.hexdigest()
+            elif storage_type == StorageType.S3:
+                reader = HashingReader(file)
+                bucket_name = get_config("BUCKET_NAME")
+                file_path = 'resources' + file_path
+                self.s3.upload_fileobj(reader, bucket_name, file_path, Config=self._transfer_config())
+                size, digest = reader.size, reader.hexdigest()
                 logger.info("File uploaded successfully!")
-            except NoCredentialsError:
-                raise ValueError("AWS credentials not found. Check your configuration.")
+        except _no_credentials_error():
+            raise ValueError("AWS credentials not found. Check your configuration.")
 
         resource = Resource(name=name, path=file_path, storage_type=storage_type.value, size=size, type=type, channel="INPUT",
                             agent_id=self.agent.id, agent_execution_id=agent_execution_id)
         self.db_session.add(resource)
-        self.db_session.commit()
         self.db_session.flush()
+        if blob is not None:
+            blob_store.add_reference(resource.id, blob.digest)
+        self.db_session.commit()
+
+        from superagi.worker import summarize_resource
 
         summarize_resource.delay(self.agent_id, resource.id)
-        logger.info(resource)
+        logger.info(f"{resource} sha256={digest}")
+        return resource
+
+    @staticmethod
+    def get_chunk_size():
+        """
+        Returns the size of the chunks files are streamed in, from AGENT_MANAGER_UPLOAD_CHUNK_SIZE.
+
+        S3 does not accept multipart chunks below 5 MB, so smaller values are raised to that.
+        """
+        return max(int(get_config("AGENT_MANAGER_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)), 5 * 1024 * 1024)
+
+    def _transfer_config(self):
+        from boto3.s3.transfer import TransferConfig
+
+        chunk_size = self.get_chunk_size()
+        return TransferConfig(multipart_threshold=chunk_size, multipart_chunksize=chunk_size)
+
+    def transfer_files(self, file_names, source_agent, source_agent_execution, agent_execution, max_workers=None):
+        """
+        Hands files of a source execution over to an execution of this agent.
+
+        All source paths are resolved in one pass. Files are then copied without passing through Python:
+        reflinks (or a kernel-side copy as fallback) for FILE storage and server-side copies for S3,
+        with at most `max_workers` transfers in flight. The resources are registered in a single
+        transaction. Files that cannot be transferred are logged and skipped.
+
+        Args:
+            file_names (list[str]): Names of the source execution's files.
+            source_agent (Agent): The agent owning the files.
+            source_agent_execution (AgentExecution): The execution owning the files.
+            agent_execution (AgentExecution): The execution of this agent to hand the files to.
+            max_workers (int, optional): Maximum number of parallel transfers.
+
+        Returns:
+            List[Resource]: The registered resources.
+
+        Raises:
+            ValueError: If the agent does not exist.
+        """
+
+        if self.agent is None:
+            raise ValueError("Agent does not exist.")
+        if not file_names:
+            return []
+
+        storage_type = StorageType.get_storage_type(get_config("STORAGE_TYPE", StorageType.FILE.value))
+        save_directory = self.get_formatted_agent_level_path(agent=self.agent,
+                                                             path=ResourceHelper.get_root_input_dir(),
+                                                             agent_execution_id=agent_execution.id)
+
+        # Files already in the blob store are handed over from their blob
+        blob_store = BlobStore(self.db_session, self.s3) if BlobStore.is_enabled() else None
+        blobs = blob_store.get_blobs_by_file_name(source_agent_execution.id, file_names) if blob_store else {}
+
+        transfers = []
+        for file_name in dict.fromkeys(file_names):
+            blob = blobs.get(file_name)
+            target_path = os.path.join(save_directory, file_name)
+            if blob is not None:
+                source_path = blob.path
+            else:
+                source_path = ResourceHelper.get_agent_read_resource_path(file_name, agent=source_agent,
+                                                                          agent_execution=source_agent_execution)
+            if storage_type == StorageType.S3:
+                if blob is None:
+                    source_path = 'resources' + source_path
+                target_path = 'resources' + target_path
+            transfers.append((file_name, source_path, target_path, blob))
+
+        transfer = self._copy_object if storage_type == StorageType.S3 else clone_file
+        max_workers = max_workers or int(get_config("AGENT_MANAGER_TRANSFER_WORKERS", 4))
+
+        def run(item):
+            file_name, source_path, target_path, blob = item
+            try:
+                size = transfer(source_path, target_path)
+                return file_name, target_path, size, blob
+            except Exception:
+                logger.error(f"Error occured while transferring {file_name}.\n\n{traceback.format_exc()}")
+                return file_name, target_path, None, blob
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(transfers)))) as executor:
+            results = [result for result in executor.map(run, transfers) if result[2] is not None]
+
+        resources = [Resource(name=file_name, path=target_path, storage_type=storage_type.value, size=size,
+                              type=self.get_resource_type(file_name), channel="INPUT", agent_id=self.agent.id,
+                              agent_execution_id=agent_execution.id)
+                     for file_name, target_path, size, _ in results]
+        self.db_session.add_all(resources)
+        self.db_session.flush()
+        for resource, (_, _, _, blob) in zip(resources, results):
+            if blob is not None:
+                blob_store.add_reference(resource.id, blob.digest)
+        self.db_session.commit()
+
+        logger.info(f"transfer_files: transferred {len(resources)} of {len(transfers)} files to execution {agent_execution.id}")
+        return resources
+
+    def get_file_digests(self, file_names, source_agent, source_agent_execution):
+        """
+        Identifies the content of files of a source execution, as `transfer_files` would find them.
+
+        Files in the blob store are identified by their SHA-256, taken from the store without reading
+        the content. Other local files are hashed. Other S3 objects are identified by their ETag and
+        size from a HEAD request instead, so they are never downloaded for this.
+
+        Args:
+            file_names (list[str]): Names of the source execution's files.
+            source_agent (Agent): The agent owning the files.
+            source_agent_execution (AgentExecution): The execution owning the files.
+
+        Returns:
+            dict: File name to hex digest (or "etag:<ETag>:<size>"), None for files that could not be read.
+        """
+        if not file_names:
+            return {}
+
+        blobs = BlobStore(self.db_session, self.s3).get_blobs_by_file_name(source_agent_execution.id, file_names) \
+            if BlobStore.is_enabled() else {}
+        storage_type = StorageType.get_storage_type(get_config("STORAGE_TYPE", StorageType.FILE.value))
+
+        digests = {}
+        for file_name in dict.fromkeys(file_names):
+            if file_name in blobs:
+                digests[file_name] = blobs[file_name].digest
+                continue
+            source_path = ResourceHelper.get_agent_read_resource_path(file_name, agent=source_agent,
+                                                                      agent_execution=source_agent_execution)
+            try:
+                if storage_type == StorageType.S3:
+                    head = self.s3.head_object(Bucket=get_config("BUCKET_NAME"), Key='resources' + source_path)
+                    digests[file_name] = f"etag:{head['ETag']}:{head['ContentLength']}"
+                    continue
+                with open(source_path, "rb") as stream:
+                    digests[file_name], _ = BlobStore._hash_stream(stream)
+            except Exception:
+                logger.error(f"Error occured while hashing {file_name}.\n\n{traceback.format_exc()}")
+                digests[file_name] = None
+        return digests
+
+    @staticmethod
+    def get_resource_type(file_name):
+        """
+        Returns the resource type SuperAGI records for a file written by an agent.
+        """
+        file_extension = os.path.splitext(file_name)[1][1:]
+        if file_extension in ["png", "jpg", "jpeg"]:
+            return "image/" + file_extension
+        elif file_extension == "txt":
+            return "application/txt"
+        return "application/misc"
+
+    def _copy_object(self, source_key, target_key):
+        """
+        Copies an object inside the bucket without downloading it and returns its size.
+        """
+        bucket_name = get_config("BUCKET_NAME")
+        self.s3.copy({"Bucket": bucket_name, "Key": source_key}, bucket_name, target_key)
+        return self.s3.head_object(Bucket=bucket_name, Key=target_key)["ContentLength"]
 
     def download(self, resource_id):
         """
@@ -117,22 +336,123 @@ class ResourceManager:
             ValueError: If the resource does not exist or if the file does not exist.
         """
 
-        resource = self.db_session.query(Resource).filter(Resource.id == resource_id).first()
-        download_file_path = resource.path
-        file_name = resource.name
-
-        if not resource:
-            raise ValueError("Resource Not found!")
+        resource = self._get_resource(resource_id)
 
         if resource.storage_type == StorageType.S3.value:
             bucket_name = get_config("BUCKET_NAME")
             file_key = resource.path
             return self.s3.get_object(Bucket=bucket_name, Key=file_key)["Body"]
         else:
-            abs_file_path = Path(download_file_path).resolve()
-            if not abs_file_path.is_file():
-                raise ValueError("File not found")
-            return open(str(abs_file_path), "rb")
+            return open(self._get_local_path(resource), "rb")
+
+    def download_range(self, resource_id, offset=0, length=None):
+        """
+        Downloads a byte range of a resource.
+
+        Args:
+            resource_id (int): The ID of the resource.
+            offset (int): The first byte to read.
+            length (int, optional): The number of bytes to read. Reads to the end when omitted.
+
+        Returns:
+            bytes: The requested bytes, shorter than `length` if the resource ends first.
+
+        Raises:
+            ValueError: If the resource does not exist or if the file does not exist.
+        """
+        return b"".join(self.iter_chunks(resource_id, offset=offset, length=length))
+
+    def iter_chunks(self, resource_id, chunk_size=None, offset=0, length=None):
+        """
+        Iterates over a resource, or a byte range of it, in chunks.
+
+        S3 resources are fetched with a single ranged GET that is streamed; local files are read
+        from `offset` onwards. Only one chunk is held in memory at a time.
+
+        Args:
+            resource_id (int): The ID of the resource.
+            chunk_size (int, optional): Bytes per chunk, AGENT_MANAGER_DOWNLOAD_CHUNK_SIZE by default.
+            offset (int): The first byte to read.
+            length (int, optional): The number of bytes to read. Reads to the end when omitted.
+
+        Yields:
+            bytes: The chunks, in order.
+
+        Raises:
+            ValueError: If the resource does not exist, the file does not exist or the range is invalid.
+        """
+        if offset < 0 or (length is not None and length < 0):
+            raise ValueError("Invalid byte range")
+        if length == 0:
+            return
+        chunk_size = chunk_size or int(get_config("AGENT_MANAGER_DOWNLOAD_CHUNK_SIZE", 1024 * 1024))
+        resource = self._get_resource(resource_id)
+
+        if resource.storage_type == StorageType.S3.value:
+            byte_range = f"bytes={offset}-" if length is None else f"bytes={offset}-{offset + length - 1}"
+            try:
+                body = self.s3.get_object(Bucket=get_config("BUCKET_NAME"), Key=resource.path, Range=byte_range)["Body"]
+            except self.s3.exceptions.ClientError as e:
+                if e.response.get("Error", {}).get("Code") == "InvalidRange":
+                    return
+                raise
+            try:
+                yield from body.iter_chunks(chunk_size)
+            finally:
+                body.close()
+        else:
+            remaining = length
+            with open(self._get_local_path(resource), "rb") as f:
+                f.seek(offset)
+                while remaining is None or remaining > 0:
+                    chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                    if not chunk:
+                        break
+                    if remaining is not None:
+                        remaining -= len(chunk)
+                    yield chunk
+
+    @contextmanager
+    def open_mmap(self, resource_id):
+        """
+        Maps a local resource into memory read-only, so slices are paged in only when touched.
+
+        Args:
+            resource_id (int): The ID of the resource.
+
+        Yields:
+            mmap.mmap | memoryview: The read-only mapping (an empty view for empty files).
+
+        Raises:
+            ValueError: If the resource does not exist, the file does not exist or the resource is
+                not stored on the local file system.
+        """
+        resource = self._get_resource(resource_id)
+        if resource.storage_type == StorageType.S3.value:
+            raise ValueError("Memory mapping is only supported for FILE storage, use iter_chunks instead.")
+
+        with open(self._get_local_path(resource), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mapping
+            finally:
+                mapping.close()
+
+    def _get_resource(self, resource_id):
+        resource = self.db_session.query(Resource).filter(Resource.id == resource_id).first()
+        if not resource:
+            raise ValueError("Resource Not found!")
+        return resource
+
+    @staticmethod
+    def _get_local_path(resource):
+        abs_file_path = Path(resource.path).resolve()
+        if not abs_file_path.is_file():
+            raise ValueError("File not found")
+        return str(abs_file_path)
 
     def get_all_resources(self, agent_execution_id=None):
         """
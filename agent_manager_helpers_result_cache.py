@@ -0,0 +1,157 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from superagi.config.config import get_config
+from superagi.models.agent import Agent
+from superagi.models.agent_execution import AgentExecution
+from superagi.lib.logger import logger
+from agent_manager_models import RunResultCacheEntry, ensure_agent_manager_tables
+from agent_manager_helpers_resources import ResourceManager
+
+# Agent configuration key that opts a single agent out of result reuse when set to "false"
+RESULT_CACHE_AGENT_CONFIG_KEY = "agent_manager_result_cache"
+
+COMPLETED_STATUSES = ("COMPLETE", "COMPLETED")
+
+
+def is_result_cache_enabled(agent_config: Optional[dict] = None) -> bool:
+    """
+    Returns whether completed child runs may be reused, globally or for an agent with `agent_config`.
+
+    Reuse is off unless AGENT_MANAGER_RESULT_CACHE is "true". An agent opts out by setting its
+    `agent_manager_result_cache` configuration to "false".
+    """
+    if str(get_config("AGENT_MANAGER_RESULT_CACHE", "false")).lower() != "true":
+        return False
+    if agent_config is not None:
+        return str(agent_config.get(RESULT_CACHE_AGENT_CONFIG_KEY, "true")).lower() not in ("false", "0", "no", "off")
+    return True
+
+
+def get_result_cache_ttl() -> float:
+    return float(get_config("AGENT_MANAGER_RESULT_CACHE_TTL", 3600))
+
+
+def compute_run_cache_key(source_agent_id: int, target_agent_id: int, agent_config: dict,
+                          input_digests: dict) -> Optional[str]:
+    """
+    Hashes everything that determines the outcome of a child run.
+
+    Runs are only reused for the agent that requested them, another parent gets its own.
+
+    Args:
+        source_agent_id (int): The agent requesting the run.
+        target_agent_id (int): The agent to run.
+        agent_config (dict): The configuration the execution is created with, see `get_run_configuration`.
+        input_digests (dict): File name to content digest (or other version tag, see
+            `ResourceManager.get_file_digests`) of the files handed to the run.
+
+    Returns:
+        str | None: Hex SHA-256 key, or None when an input file could not be hashed.
+    """
+    if any(digest is None for digest in input_digests.values()):
+        return None
+    payload = {
+        "source_agent_id": source_agent_id,
+        "agent_id": target_agent_id,
+        "config": agent_config,
+        "inputs": sorted(input_digests.items()),
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def get_run_cache_key(session, source_agent_id, source_agent_execution_id, target_agent_id: int, agent_config: dict,
+                      files_for_agent_run: list) -> Optional[str]:
+    """
+    Computes the cache key of a child run request from its parent, target, configuration and input files.
+
+    Returns:
+        str | None: The key, or None when the run must not be reused.
+    """
+    input_digests = {}
+    if files_for_agent_run:
+        source_agent = Agent.get_agent_from_id(session=session, agent_id=source_agent_id)
+        source_agent_execution = AgentExecution.get_agent_execution_from_id(session=session, agent_execution_id=source_agent_execution_id)
+        if source_agent is None or source_agent_execution is None:
+            return None
+        input_digests = ResourceManager(target_agent_id, session).get_file_digests(
+            files_for_agent_run, source_agent, source_agent_execution)
+    return compute_run_cache_key(source_agent_id, target_agent_id, agent_config, input_digests)
+
+
+def find_cached_run(session, cache_key: Optional[str], ttl: Optional[float] = None):
+    """
+    Looks up the completed execution remembered for `cache_key`.
+
+    Entries older than `ttl` seconds, or whose execution no longer exists or did not complete, are
+    dropped.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        cache_key (str): The key from `get_run_cache_key`. None never hits.
+        ttl (float, optional): Maximum age in seconds, AGENT_MANAGER_RESULT_CACHE_TTL by default.
+
+    Returns:
+        AgentExecution | None: The execution to reuse.
+    """
+    if cache_key is None:
+        return None
+    ensure_agent_manager_tables(session.get_bind())
+
+    row = session.query(RunResultCacheEntry, AgentExecution) \
+        .outerjoin(AgentExecution, AgentExecution.id == RunResultCacheEntry.agent_execution_id) \
+        .filter(RunResultCacheEntry.cache_key == cache_key) \
+        .first()
+    if row is None:
+        return None
+
+    entry, agent_execution = row
+    ttl = get_result_cache_ttl() if ttl is None else ttl
+    if agent_execution is not None and agent_execution.status in COMPLETED_STATUSES \
+            and entry.created_at >= datetime.now() - timedelta(seconds=ttl):
+        logger.info(f"find_cached_run: reusing execution {agent_execution.id} of agent {entry.target_agent_id}")
+        return agent_execution
+
+    session.delete(entry)
+    session.commit()
+    return None
+
+
+def remember_run(session, cache_key: Optional[str], target_agent_id: int, agent_execution_id: int):
+    """
+    Records a completed execution as the answer to `cache_key`, replacing an older entry.
+    """
+    if cache_key is None:
+        return
+    ensure_agent_manager_tables(session.get_bind())
+
+    session.query(RunResultCacheEntry).filter(RunResultCacheEntry.cache_key == cache_key).delete()
+    session.add(RunResultCacheEntry(cache_key=cache_key, target_agent_id=target_agent_id,
+                                    agent_execution_id=agent_execution_id))
+    try:
+        session.commit()
+    except IntegrityError:
+        # Remembered concurrently by another session, which is just as good.
+        session.rollback()
+
+
+def invalidate_cached_runs(session, target_agent_id: Optional[int] = None) -> int:
+    """
+    Forgets the remembered runs of one agent, or of every agent.
+
+    Returns:
+        int: The number of entries removed.
+    """
+    ensure_agent_manager_tables(session.get_bind())
+
+    query = session.query(RunResultCacheEntry)
+    if target_agent_id is not None:
+        query = query.filter(RunResultCacheEntry.target_agent_id == target_agent_id)
+    removed = query.delete(synchronize_session=False)
+    session.commit()
+    return removed
@@ -0,0 +1,229 @@
+import argparse
+import json
+from datetime import datetime
+
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import aliased
+
+from superagi.config.config import get_config
+from superagi.models.agent_execution import AgentExecution
+from superagi.lib.logger import logger
+from agent_manager_models import RunTreeNode, ensure_agent_manager_tables
+from agent_manager_helpers_notify import ACTIVE_STATUSES, WAITING_STATUSES, watch_status_changes
+from agent_manager_helpers_metrics import count
+from agent_manager_helpers_scheduler import get_dispatch_hook
+
+
+def is_cascade_enabled() -> bool:
+    """
+    Returns whether child runs are cancelled with their parent, from AGENT_MANAGER_CANCEL_CHILD_RUNS.
+    """
+    return str(get_config("AGENT_MANAGER_CANCEL_CHILD_RUNS", "true")).lower() == "true"
+
+
+def record_child_run(session, agent_execution_id: int, parent_agent_execution_id: int):
+    """
+    Records that an execution was started by another one.
+
+    From then on, the process cancels the child runs of terminated parents in the background, after
+    every status change it hears of (see `watch_status_changes`).
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_execution_id (int): The new child execution.
+        parent_agent_execution_id (int): The execution that started it. Nothing is recorded without one.
+
+    Returns:
+        RunTreeNode: The new node, or None.
+    """
+    if parent_agent_execution_id is None:
+        return None
+    ensure_agent_manager_tables(session.get_bind())
+
+    parent = session.query(RunTreeNode.root_agent_execution_id, RunTreeNode.depth) \
+        .filter(RunTreeNode.agent_execution_id == parent_agent_execution_id).first()
+    node = RunTreeNode(agent_execution_id=agent_execution_id, parent_agent_execution_id=parent_agent_execution_id,
+                       root_agent_execution_id=parent.root_agent_execution_id if parent else parent_agent_execution_id,
+                       depth=parent.depth + 1 if parent else 1)
+    session.add(node)
+    session.commit()
+    if is_cascade_enabled():
+        watch_status_changes(session.get_bind(), cancel_orphaned_runs)
+    return node
+
+
+def _descendants(session, agent_execution_id: int):
+    # Recursive CTE walking down from the direct children of the execution
+    tree = session.query(RunTreeNode.agent_execution_id, RunTreeNode.depth) \
+        .filter(RunTreeNode.parent_agent_execution_id == agent_execution_id) \
+        .cte(name="run_tree", recursive=True)
+    child = aliased(RunTreeNode)
+    return tree.union_all(session.query(child.agent_execution_id, child.depth)
+                          .filter(child.parent_agent_execution_id == tree.c.agent_execution_id))
+
+
+def get_descendant_ids(session, agent_execution_id: int) -> list:
+    """
+    Returns the ids of every execution started, directly or not, by an execution.
+    """
+    ensure_agent_manager_tables(session.get_bind())
+    tree = _descendants(session, agent_execution_id)
+    return [descendant_id for (descendant_id,) in session.query(tree.c.agent_execution_id).all()]
+
+
+def get_run_tree_totals(session, agent_execution_id: int) -> dict:
+    """
+    Sums up an execution and everything it started, in one query.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_execution_id (int): The execution at the top of the tree.
+
+    Returns:
+        dict: The number of runs (the execution included), how many are still active, the deepest
+        level, total calls and tokens, and the wall time from the first start to the last update
+        (or to now while runs are active).
+    """
+    ensure_agent_manager_tables(session.get_bind())
+    tree = _descendants(session, agent_execution_id)
+    depth = session.query(func.max(tree.c.depth)).scalar_subquery()
+    row = session.query(func.count(AgentExecution.id),
+                        func.sum(case((AgentExecution.status.in_(ACTIVE_STATUSES), 1), else_=0)),
+                        func.sum(AgentExecution.num_of_calls), func.sum(AgentExecution.num_of_tokens),
+                        func.min(AgentExecution.created_at), func.max(AgentExecution.updated_at), depth) \
+        .filter(or_(AgentExecution.id == agent_execution_id,
+                    AgentExecution.id.in_(session.query(tree.c.agent_execution_id)))) \
+        .one()
+    runs, active, calls, tokens, started_at, last_update, max_depth = row
+    count("run_tree_queries")
+
+    ended_at = datetime.now() if active else last_update
+    return {
+        "agent_execution_id": agent_execution_id,
+        "runs": runs or 0,
+        "active_runs": active or 0,
+        "depth": max_depth or 0,
+        "num_of_calls": calls or 0,
+        "num_of_tokens": tokens or 0,
+        "started_at": started_at,
+        "last_update": last_update,
+        "wall_time_seconds": (ended_at - started_at).total_seconds() if started_at and ended_at else 0,
+    }
+
+
+def terminate_run_tree(session, agent_execution_id: int, include_root: bool = False) -> list:
+    """
+    Terminates every active execution below an execution, and optionally the execution itself.
+
+    The executions are set to TERMINATED through the ORM, so waiters are notified; SuperAGI workers
+    stop them before their next step and the scheduler drops them from its queue.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_execution_id (int): The execution at the top of the tree.
+        include_root (bool): Terminate `agent_execution_id` as well.
+
+    Returns:
+        list[int]: The ids of the executions terminated.
+    """
+    agent_execution_ids = get_descendant_ids(session, agent_execution_id)
+    if include_root:
+        agent_execution_ids.append(agent_execution_id)
+    if not agent_execution_ids:
+        return []
+
+    agent_executions = session.query(AgentExecution).filter(AgentExecution.id.in_(agent_execution_ids),
+                                                            AgentExecution.status.in_(ACTIVE_STATUSES)).all()
+    for agent_execution in agent_executions:
+        agent_execution.status = "TERMINATED"
+    session.commit()
+
+    terminated = [agent_execution.id for agent_execution in agent_executions]
+    if terminated:
+        count("runs_cancelled", len(terminated))
+        logger.info(f"terminate_run_tree: terminated {terminated} below execution {agent_execution_id}")
+    return terminated
+
+
+def cancel_timed_out_run(session, agent_execution) -> list:
+    """
+    Terminates a child run the caller stopped waiting for, with everything it started.
+
+    Waits end early when the run leaves CREATED/RUNNING, so a run still in one of them has passed
+    its deadline and is terminated. A run that was paused or asks for permission is left alone,
+    unless its parent was terminated meanwhile. Does nothing when the run already finished or
+    AGENT_MANAGER_CANCEL_CHILD_RUNS is disabled.
+
+    Returns:
+        list[int]: The ids of the executions terminated.
+    """
+    if agent_execution is None or agent_execution.status not in ACTIVE_STATUSES or not is_cascade_enabled():
+        return []
+    if agent_execution.status not in WAITING_STATUSES and not _is_parent_terminated(session, agent_execution.id):
+        return []
+    terminated = terminate_run_tree(session, agent_execution.id, include_root=True)
+    session.refresh(agent_execution)
+    return terminated
+
+
+def _is_parent_terminated(session, agent_execution_id: int) -> bool:
+    ensure_agent_manager_tables(session.get_bind())
+    status = session.query(AgentExecution.status) \
+        .join(RunTreeNode, RunTreeNode.parent_agent_execution_id == AgentExecution.id) \
+        .filter(RunTreeNode.agent_execution_id == agent_execution_id).scalar()
+    return status == "TERMINATED"
+
+
+def cancel_orphaned_runs(session) -> list:
+    """
+    Terminates the trees of active child runs whose parent was terminated.
+
+    Returns:
+        list[int]: The ids of the executions terminated.
+    """
+    ensure_agent_manager_tables(session.get_bind())
+    child = aliased(AgentExecution)
+    parent = aliased(AgentExecution)
+    orphans = session.query(RunTreeNode.agent_execution_id) \
+        .join(child, child.id == RunTreeNode.agent_execution_id) \
+        .join(parent, parent.id == RunTreeNode.parent_agent_execution_id) \
+        .filter(child.status.in_(ACTIVE_STATUSES), parent.status == "TERMINATED") \
+        .all()
+
+    terminated = []
+    for (orphan_id,) in orphans:
+        terminated += terminate_run_tree(session, orphan_id, include_root=True)
+    return terminated
+
+
+def get_wait_hook(session):
+    """
+    Returns the `on_poll` callback for waits on child runs: it starts queued runs when limits are set.
+
+    Child runs of terminated parents are cancelled in the background, see `record_child_run`.
+
+    Returns:
+        Callable[[], None]: The callback, or None when there is nothing to do.
+    """
+    return get_dispatch_hook(session)
+
+
+if __name__ == "__main__":
+    from agent_manager_helpers_db import session_scope
+
+    parser = argparse.ArgumentParser(description="Inspect or cancel trees of agent runs started through the toolkit.")
+    parser.add_argument("command", choices=["totals", "terminate", "sweep"],
+                        help="totals: print the totals of a run tree. terminate: terminate a run and everything it "
+                             "started. sweep: terminate the child runs of terminated runs.")
+    parser.add_argument("agent_execution_id", type=int, nargs="?")
+    args = parser.parse_args()
+    if args.command != "sweep" and args.agent_execution_id is None:
+        parser.error(f"{args.command} needs an agent_execution_id")
+
+    with session_scope() as session:
+        if args.command == "totals":
+            print(json.dumps(get_run_tree_totals(session, args.agent_execution_id), indent=2, default=str))
+        elif args.command == "terminate":
+            print(f"Terminated {terminate_run_tree(session, args.agent_execution_id, include_root=True)}.")
+        else:
+            print(f"Terminated {cancel_orphaned_runs(session)}.")
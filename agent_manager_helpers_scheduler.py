@@ -0,0 +1,304 @@
+import argparse
+import json
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from superagi.config.config import get_config
+from superagi.models.agent_config import AgentConfiguration
+from superagi.models.agent_execution import AgentExecution
+from superagi.lib.logger import logger
+from agent_manager_models import QueuedRun, RunWaiter, ensure_agent_manager_tables
+from agent_manager_helpers_notify import ACTIVE_STATUSES, watch_status_changes
+from agent_manager_helpers_db import separate_session
+from agent_manager_helpers_metrics import count
+
+# Agent configuration key overriding AGENT_MANAGER_MAX_RUNS_PER_AGENT for one agent
+MAX_RUNS_AGENT_CONFIG_KEY = "agent_manager_max_concurrent_runs"
+
+DISPATCH_BATCH_SIZE = 100
+
+
+def get_limits() -> dict:
+    """
+    Returns the configured limits. 0 means unlimited (or, for worker slots, unknown).
+
+    Returns:
+        dict: `max_runs` (child runs started through the toolkit at once), `max_runs_per_agent`
+        (the same per target agent) and `worker_slots` (Celery worker processes of the instance).
+    """
+    return {
+        "max_runs": int(get_config("AGENT_MANAGER_MAX_RUNS", 0)),
+        "max_runs_per_agent": int(get_config("AGENT_MANAGER_MAX_RUNS_PER_AGENT", 0)),
+        "worker_slots": int(get_config("AGENT_MANAGER_WORKER_SLOTS", 0)),
+    }
+
+
+def is_scheduler_enabled() -> bool:
+    """
+    Returns whether any limit is configured. Without one, runs are started directly as before.
+    """
+    return any(get_limits().values())
+
+
+def submit_run(session, agent_execution, parent_agent_execution_id=None, priority: int = 0) -> bool:
+    """
+    Queues a created execution and starts it right away if the limits allow.
+
+    Queued executions are kept in the CREATED status, so they count as unfinished for waiters, and
+    are moved to RUNNING and handed to the worker by `dispatch_queued_runs`. It runs right away, in
+    the background whenever an execution changes status (see `watch_status_changes`), and whenever
+    a tool call polls the runs it waits on.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_execution (AgentExecution): The execution, created with `start=False`.
+        parent_agent_execution_id (int, optional): The execution that requested the run.
+        priority (int): Higher priorities start first.
+
+    Returns:
+        bool: Whether the execution was started.
+    """
+    ensure_agent_manager_tables(session.get_bind())
+
+    agent_execution.status = "CREATED"
+    session.add(QueuedRun(agent_execution_id=agent_execution.id, target_agent_id=agent_execution.agent_id,
+                          parent_agent_execution_id=parent_agent_execution_id, priority=priority or 0,
+                          status="QUEUED"))
+    session.commit()
+    count("runs_queued")
+
+    watch_status_changes(session.get_bind(), dispatch_queued_runs)
+    dispatch_queued_runs(session)
+    session.refresh(agent_execution)
+    return agent_execution.status == "RUNNING"
+
+
+def dispatch_queued_runs(session) -> int:
+    """
+    Starts queued executions, highest priority and oldest first, as far as the limits allow.
+
+    Queue entries of executions that finished (or were deleted) are dropped first, which frees their
+    slots; paused executions and those waiting for permission keep theirs. Entries of agents at their own limit are skipped without holding up the others, however
+    many there are. Several processes may dispatch at once; each entry is claimed atomically, but the
+    limits themselves are best effort and can briefly be exceeded under such races.
+
+    The changes are made and committed on a separate session, the transaction of `session` is left
+    alone.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+
+    Returns:
+        int: The number of executions started.
+    """
+    ensure_agent_manager_tables(session.get_bind())
+    with separate_session(session) as dispatch_session:
+        return _dispatch_queued_runs(dispatch_session)
+
+
+def _dispatch_queued_runs(session) -> int:
+    from agent_manager_helpers_data import start_agent_execution
+
+    limits = get_limits()
+
+    finished = session.query(QueuedRun.id) \
+        .outerjoin(AgentExecution, AgentExecution.id == QueuedRun.agent_execution_id) \
+        .filter(or_(AgentExecution.id == None, AgentExecution.status.notin_(ACTIVE_STATUSES))) \
+        .all()
+    if finished:
+        session.query(QueuedRun).filter(QueuedRun.id.in_([row.id for row in finished])) \
+            .delete(synchronize_session=False)
+        session.commit()
+
+    running = dict(session.query(QueuedRun.target_agent_id, func.count(QueuedRun.id))
+                   .filter(QueuedRun.status == "STARTED").group_by(QueuedRun.target_agent_id).all())
+    total_running = sum(running.values())
+    agent_limits = {}
+    saturated = set()
+
+    started = 0
+    while not (limits["max_runs"] and total_running >= limits["max_runs"]):
+        # Agents at their limit are left out of the query, so their entries never fill up a batch
+        query = session.query(QueuedRun.id, QueuedRun.agent_execution_id, QueuedRun.target_agent_id, QueuedRun.created_at) \
+            .filter(QueuedRun.status == "QUEUED")
+        if saturated:
+            query = query.filter(QueuedRun.target_agent_id.notin_(saturated))
+        queued = query.order_by(QueuedRun.priority.desc(), QueuedRun.id).limit(DISPATCH_BATCH_SIZE).all()
+        if not queued:
+            break
+        new_agents = {run.target_agent_id for run in queued} - agent_limits.keys()
+        if new_agents:
+            agent_limits.update(_get_agent_limits(session, new_agents, limits["max_runs_per_agent"]))
+
+        for run in queued:
+            if limits["max_runs"] and total_running >= limits["max_runs"]:
+                break
+            agent_limit = agent_limits.get(run.target_agent_id)
+            if agent_limit and running.get(run.target_agent_id, 0) >= agent_limit:
+                saturated.add(run.target_agent_id)
+                continue
+
+            claimed = session.execute(update(QueuedRun.__table__)
+                                      .where(QueuedRun.__table__.c.id == run.id, QueuedRun.__table__.c.status == "QUEUED")
+                                      .values(status="STARTED", started_at=datetime.now())).rowcount
+            if claimed != 1:
+                session.rollback()
+                continue
+            agent_execution = session.query(AgentExecution).filter(AgentExecution.id == run.agent_execution_id).first()
+            if agent_execution is None:
+                # Deleted since it was queued
+                session.query(QueuedRun).filter(QueuedRun.id == run.id).delete(synchronize_session=False)
+                session.commit()
+                continue
+            agent_execution.status = "RUNNING"
+            session.commit()
+            start_agent_execution(agent_execution)
+
+            running[run.target_agent_id] = running.get(run.target_agent_id, 0) + 1
+            total_running += 1
+            started += 1
+            count("runs_dispatched")
+            count("queue_wait_seconds", (datetime.now() - run.created_at).total_seconds())
+
+    return started
+
+
+def get_dispatch_hook(session):
+    """
+    Returns the `on_poll` callback that lets waiters start queued runs, or None without limits.
+    """
+    if not is_scheduler_enabled():
+        return None
+    return lambda: dispatch_queued_runs(session)
+
+
+def _get_agent_limits(session, agent_ids, default_limit: int) -> dict:
+    limits = {agent_id: default_limit for agent_id in agent_ids}
+    overrides = session.query(AgentConfiguration.agent_id, AgentConfiguration.value) \
+        .filter(AgentConfiguration.agent_id.in_(list(agent_ids)), AgentConfiguration.key == MAX_RUNS_AGENT_CONFIG_KEY) \
+        .all()
+    for agent_id, value in overrides:
+        try:
+            limits[agent_id] = int(value)
+        except (TypeError, ValueError):
+            logger.warning(f"_get_agent_limits: ignoring invalid {MAX_RUNS_AGENT_CONFIG_KEY} '{value}' of agent {agent_id}")
+    return limits
+
+
+def _purge_stale_waiters(session):
+    stale_before = datetime.now() - timedelta(seconds=float(get_config("AGENT_MANAGER_WAITER_STALE_AFTER", 900)))
+    stale = session.query(RunWaiter.agent_execution_id) \
+        .outerjoin(AgentExecution, AgentExecution.id == RunWaiter.agent_execution_id) \
+        .filter(or_(RunWaiter.created_at < stale_before, AgentExecution.id == None,
+                    AgentExecution.status.notin_(ACTIVE_STATUSES))) \
+        .all()
+    if stale:
+        session.query(RunWaiter).filter(RunWaiter.agent_execution_id.in_([row.agent_execution_id for row in stale])) \
+            .delete(synchronize_session=False)
+        session.commit()
+
+
+@contextmanager
+def wait_slot(session, agent_execution_id):
+    """
+    Registers an execution as blocking a worker while it waits for child runs.
+
+    Every waiting parent holds one Celery worker, and its children need a free one to run on. When
+    AGENT_MANAGER_WORKER_SLOTS is set and one more waiter would leave no worker for the children, the
+    wait would deadlock the pool: the block is then entered with False and the caller should return
+    a handle instead of waiting. An execution that already holds a slot keeps it.
+
+    The registration is made and released on a separate session, the transaction of `session` is
+    left alone.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_execution_id (int): The execution about to wait.
+
+    Yields:
+        bool: Whether the caller may block.
+    """
+    worker_slots = get_limits()["worker_slots"]
+    if not worker_slots or agent_execution_id is None:
+        yield True
+        return
+
+    ensure_agent_manager_tables(session.get_bind())
+    with separate_session(session) as slot_session:
+        _purge_stale_waiters(slot_session)
+
+        if slot_session.query(RunWaiter).filter(RunWaiter.agent_execution_id == agent_execution_id).first() is not None:
+            slot_session.close()
+            yield True
+            return
+
+        waiters = slot_session.query(func.count(RunWaiter.agent_execution_id)).scalar()
+        if waiters + 1 >= worker_slots:
+            logger.warning(f"wait_slot: {waiters} executions already wait on {worker_slots} workers, "
+                           f"not blocking execution {agent_execution_id}")
+            count("waits_refused")
+            slot_session.close()
+            yield False
+            return
+
+        try:
+            slot_session.add(RunWaiter(agent_execution_id=agent_execution_id))
+            slot_session.commit()
+        except IntegrityError:
+            # Registered concurrently by another call of the same execution
+            slot_session.rollback()
+            yield True
+            return
+
+        try:
+            yield True
+        finally:
+            try:
+                slot_session.query(RunWaiter).filter(RunWaiter.agent_execution_id == agent_execution_id) \
+                    .delete(synchronize_session=False)
+                slot_session.commit()
+            except Exception:
+                slot_session.rollback()
+                logger.error(f"Error occured while releasing wait slot.\n\n{traceback.format_exc()}")
+
+
+def get_scheduler_stats(session) -> dict:
+    """
+    Returns the queue depth, running and waiting executions and the configured limits.
+    """
+    ensure_agent_manager_tables(session.get_bind())
+
+    by_status = session.query(QueuedRun.status, QueuedRun.target_agent_id, func.count(QueuedRun.id),
+                              func.min(QueuedRun.created_at)) \
+        .group_by(QueuedRun.status, QueuedRun.target_agent_id).all()
+    queued_by_agent = {agent_id: total for status, agent_id, total, _ in by_status if status == "QUEUED"}
+    running_by_agent = {agent_id: total for status, agent_id, total, _ in by_status if status == "STARTED"}
+    oldest_queued = min((oldest for status, _, _, oldest in by_status if status == "QUEUED"), default=None)
+
+    return {
+        "queued": sum(queued_by_agent.values()),
+        "queued_by_agent": queued_by_agent,
+        "oldest_queued_seconds": (datetime.now() - oldest_queued).total_seconds() if oldest_queued else 0,
+        "running": sum(running_by_agent.values()),
+        "running_by_agent": running_by_agent,
+        "waiters": session.query(func.count(RunWaiter.agent_execution_id)).scalar(),
+        "limits": get_limits(),
+    }
+
+
+if __name__ == "__main__":
+    from agent_manager_helpers_db import session_scope
+
+    parser = argparse.ArgumentParser(description="Inspect or drain the agent manager run queue.")
+    parser.add_argument("command", choices=["stats", "dispatch"],
+                        help="stats: print queue statistics. dispatch: start queued runs the limits allow.")
+    args = parser.parse_args()
+
+    with session_scope() as session:
+        if args.command == "dispatch":
+            print(f"Started {dispatch_queued_runs(session)} runs.")
+        print(json.dumps(get_scheduler_stats(session), indent=2, default=str))
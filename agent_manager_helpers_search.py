@@ -0,0 +1,151 @@
+import math
+import re
+import threading
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do for from has have in into is it its of on or that the their this to
+was were will with you your
+""".split())
+
+# Name tokens count this many times, a name match says more than a word deep in the description
+NAME_WEIGHT = 2
+
+
+def tokenize(text) -> list:
+    """
+    Splits text into lowercase alphanumeric terms without stopwords, reducing plain plurals.
+    """
+    terms = []
+    for term in TOKEN_PATTERN.findall(str(text or "").lower()):
+        if term in STOPWORDS:
+            continue
+        if len(term) > 4 and term.endswith("ies"):
+            term = term[:-3] + "y"
+        elif len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+class AgentSearchIndex:
+    """
+    Thread-safe BM25 index over agent names and descriptions.
+
+    Documents are added, replaced and removed one at a time, and `sync` applies only the differences
+    to a new agent list, so keeping the index current costs time proportional to the agents that
+    changed rather than to the size of the catalog.
+
+    Args:
+        k1 (float): Term frequency saturation.
+        b (float): Document length normalization.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._agents = {}
+        self._term_counts = {}
+        self._lengths = {}
+        self._postings = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._agents)
+
+    def add(self, agent_id: int, name, description):
+        """
+        Indexes an agent, replacing what was indexed for it before.
+        """
+        with self._lock:
+            if agent_id in self._agents:
+                self.remove(agent_id)
+            term_counts = Counter(tokenize(name) * NAME_WEIGHT + tokenize(description))
+            self._agents[agent_id] = (name, description)
+            self._term_counts[agent_id] = term_counts
+            self._lengths[agent_id] = sum(term_counts.values())
+            self._total_length += self._lengths[agent_id]
+            for term in term_counts:
+                self._postings.setdefault(term, set()).add(agent_id)
+
+    def remove(self, agent_id: int):
+        """
+        Drops an agent from the index, if it is indexed.
+        """
+        with self._lock:
+            if self._agents.pop(agent_id, None) is None:
+                return
+            for term in self._term_counts.pop(agent_id):
+                postings = self._postings[term]
+                postings.discard(agent_id)
+                if not postings:
+                    del self._postings[term]
+            self._total_length -= self._lengths.pop(agent_id)
+
+    def sync(self, agents) -> int:
+        """
+        Brings the index in line with `(id, name, description)` tuples.
+
+        Returns:
+            int: The number of agents added, changed or removed.
+        """
+        with self._lock:
+            current = {agent_id: (name, description) for agent_id, name, description in agents}
+            removed = [agent_id for agent_id in self._agents if agent_id not in current]
+            for agent_id in removed:
+                self.remove(agent_id)
+            changed = [agent_id for agent_id, document in current.items() if self._agents.get(agent_id) != document]
+            for agent_id in changed:
+                self.add(agent_id, *current[agent_id])
+            return len(removed) + len(changed)
+
+    def search(self, query, limit: int = 10) -> list:
+        """
+        Ranks the indexed agents by their BM25 score for `query`.
+
+        Only agents sharing at least one term with the query are returned, best first and by id on
+        equal scores.
+
+        Returns:
+            list[tuple]: `(id, name, description, score)` tuples, at most `limit` of them.
+        """
+        with self._lock:
+            if not self._agents:
+                return []
+            count = len(self._agents)
+            average_length = self._total_length / count or 1
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for agent_id in postings:
+                    frequency = self._term_counts[agent_id][term]
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[agent_id] / average_length)
+                    scores[agent_id] = scores.get(agent_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:max(limit, 0)]
+            return [(agent_id, *self._agents[agent_id], round(score, 4)) for agent_id, score in ranked]
+
+    def shortlist(self, query, limit: int) -> list:
+        """
+        Returns `limit` agents for a tool description: the best matches for `query` first, filled up
+        with the remaining agents in id order.
+
+        Returns:
+            list[tuple]: `(id, name, description)` tuples.
+        """
+        with self._lock:
+            agents = [(agent_id, name, description) for agent_id, name, description, _ in self.search(query, limit)]
+            if len(agents) < limit:
+                listed = {agent_id for agent_id, _, _ in agents}
+                for agent_id in sorted(self._agents):
+                    if len(agents) >= limit:
+                        break
+                    if agent_id not in listed:
+                        agents.append((agent_id, *self._agents[agent_id]))
+            return agents
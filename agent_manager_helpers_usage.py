@@ -0,0 +1,275 @@
+import argparse
+import threading
+import traceback
+
+from sqlalchemy import event, func, inspect, select, text, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from superagi.models.agent_execution import AgentExecution
+from superagi.lib.logger import logger
+from agent_manager_models import AgentUsageRollup, ensure_agent_manager_tables
+
+AGENT_USAGE_TRIGGER = "agent_manager_agent_usage_rollup_v2"
+AGENT_USAGE_FUNCTION = "agent_manager_rollup_agent_usage_v2"
+AGENT_USAGE_ADD_FUNCTION = "agent_manager_add_agent_usage"
+# Triggers and functions of earlier versions, dropped when the current ones are installed
+OLD_AGENT_USAGE_TRIGGERS = ("agent_manager_agent_usage_rollup",)
+OLD_AGENT_USAGE_FUNCTIONS = ("agent_manager_rollup_agent_usage",)
+
+_ready_engines = set()
+_ready_lock = threading.Lock()
+_listening = False
+
+
+def install_usage_rollup_trigger(engine):
+    """
+    Installs a trigger that keeps `agent_manager_agent_usage` in step with every write to the
+    agent executions table, whichever process makes it, and seeds the rollups. Only done once.
+
+    Every change adds its difference to the agent's row, creating the row if needed (`INSERT ... ON
+    CONFLICT DO UPDATE`), so no change is lost whatever the order of the writers. The rollups are
+    seeded in the same transaction that creates the trigger, while writes to the executions table
+    are locked out, so every execution is counted exactly once: either by the seed or by the trigger.
+
+    Args:
+        engine (Engine): A Postgres engine.
+    """
+    executions = AgentExecution.__tablename__
+    rollups = AgentUsageRollup.__tablename__
+    with engine.begin() as connection:
+        exists = connection.execute(text("SELECT 1 FROM pg_trigger WHERE tgname = :name"),
+                                    {"name": AGENT_USAGE_TRIGGER}).first()
+        if exists:
+            return
+        connection.execute(text(f"LOCK TABLE {executions} IN SHARE MODE"))
+        # Checked again under the lock, another process may have installed it meanwhile
+        exists = connection.execute(text("SELECT 1 FROM pg_trigger WHERE tgname = :name"),
+                                    {"name": AGENT_USAGE_TRIGGER}).first()
+        if exists:
+            return
+        connection.execute(text(f"""
+            CREATE OR REPLACE FUNCTION {AGENT_USAGE_ADD_FUNCTION}(agent INTEGER, calls BIGINT, tokens BIGINT)
+            RETURNS void AS $$
+            BEGIN
+                IF agent IS NULL OR (calls = 0 AND tokens = 0) THEN
+                    RETURN;
+                END IF;
+                INSERT INTO {rollups} AS rollup (agent_id, total_calls, total_tokens, created_at, updated_at)
+                VALUES (agent, calls, tokens, now(), now())
+                ON CONFLICT (agent_id) DO UPDATE
+                SET total_calls = rollup.total_calls + EXCLUDED.total_calls,
+                    total_tokens = rollup.total_tokens + EXCLUDED.total_tokens,
+                    updated_at = now();
+            END;
+            $$ LANGUAGE plpgsql;
+        """))
+        connection.execute(text(f"""
+            CREATE OR REPLACE FUNCTION {AGENT_USAGE_FUNCTION}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    PERFORM {AGENT_USAGE_ADD_FUNCTION}(OLD.agent_id, -COALESCE(OLD.num_of_calls, 0),
+                                                       -COALESCE(OLD.num_of_tokens, 0));
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    PERFORM {AGENT_USAGE_ADD_FUNCTION}(NEW.agent_id, COALESCE(NEW.num_of_calls, 0),
+                                                       COALESCE(NEW.num_of_tokens, 0));
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """))
+        for old_trigger in OLD_AGENT_USAGE_TRIGGERS:
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {old_trigger} ON {executions}"))
+        for old_function in OLD_AGENT_USAGE_FUNCTIONS:
+            connection.execute(text(f"DROP FUNCTION IF EXISTS {old_function}()"))
+        connection.execute(text(f"""
+            CREATE TRIGGER {AGENT_USAGE_TRIGGER}
+            AFTER INSERT OR DELETE OR UPDATE OF num_of_calls, num_of_tokens, agent_id ON {executions}
+            FOR EACH ROW EXECUTE PROCEDURE {AGENT_USAGE_FUNCTION}();
+        """))
+        _seed_rollups(connection)
+    logger.info(f"install_usage_rollup_trigger: installed {AGENT_USAGE_TRIGGER} on {executions}")
+
+
+def _seed_rollups(connection):
+    rollups = AgentUsageRollup.__table__
+    connection.execute(rollups.delete())
+    connection.execute(rollups.insert().from_select(
+        ["agent_id", "total_calls", "total_tokens"],
+        select(AgentExecution.agent_id,
+               func.coalesce(func.sum(AgentExecution.num_of_calls), 0),
+               func.coalesce(func.sum(AgentExecution.num_of_tokens), 0))
+        .where(AgentExecution.agent_id != None)
+        .group_by(AgentExecution.agent_id)))
+
+
+def ensure_usage_rollups(bind):
+    """
+    Makes sure the rollup table exists and is maintained, once per engine and process.
+
+    On Postgres this installs the maintenance trigger, which also seeds the rollups. On other
+    databases the rollups are maintained by ORM events in this module, which only see writes made
+    from processes that imported the toolkit after this was called. The rollups are seeded when the
+    table is empty, which includes after the toolkit's tables were upgraded (see
+    `agent_manager_models`); otherwise use `rebuild_agent_usage_rollups` to repair them.
+
+    Args:
+        bind (Engine | Connection): The engine the session is bound to.
+    """
+    engine = getattr(bind, "engine", bind)
+    key = str(engine.url)
+    if key in _ready_engines:
+        return
+    with _ready_lock:
+        if key not in _ready_engines:
+            ensure_agent_manager_tables(engine)
+            if engine.dialect.name == "postgresql":
+                install_usage_rollup_trigger(engine)
+            else:
+                _listen_for_usage_changes()
+                with engine.begin() as connection:
+                    if connection.execute(select(AgentUsageRollup.agent_id).limit(1)).first() is None:
+                        _seed_rollups(connection)
+            _ready_engines.add(key)
+
+
+def get_agent_usage_totals(session, agent_id: int):
+    """
+    Get the total calls and tokens used by all executions of an agent.
+
+    Reads the agent's rollup row, which is seeded once with the rest of the table and then updated
+    as executions change. An agent without a row has no calls or tokens yet.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_id (int): The ID of the agent.
+
+    Returns:
+        tuple: The total number of calls and the total number of tokens.
+    """
+    ensure_usage_rollups(session.get_bind())
+
+    rollup = session.query(AgentUsageRollup.total_calls, AgentUsageRollup.total_tokens) \
+        .filter(AgentUsageRollup.agent_id == agent_id).first()
+    if rollup is None:
+        return 0, 0
+    return rollup.total_calls, rollup.total_tokens
+
+
+def rebuild_agent_usage_rollups(session, agent_ids: list = None) -> int:
+    """
+    Recompute rollups from the agent executions table, for some agents or for all of them.
+
+    The rollups are seeded and maintained automatically; use this to repair them, e.g. after
+    executions were changed with the trigger disabled.
+
+    Args:
+        session (Session): SQLAlchemy database session.
+        agent_ids (list[int], optional): Only rebuild these agents.
+
+    Returns:
+        int: The number of rollup rows written.
+    """
+    ensure_usage_rollups(session.get_bind())
+
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text(f"LOCK TABLE {AgentUsageRollup.__tablename__} IN EXCLUSIVE MODE"))
+
+    delete_query = session.query(AgentUsageRollup)
+    totals_query = session.query(AgentExecution.agent_id,
+                                 func.coalesce(func.sum(AgentExecution.num_of_calls), 0),
+                                 func.coalesce(func.sum(AgentExecution.num_of_tokens), 0))
+    if agent_ids is not None:
+        delete_query = delete_query.filter(AgentUsageRollup.agent_id.in_(agent_ids))
+        totals_query = totals_query.filter(AgentExecution.agent_id.in_(agent_ids))
+    delete_query.delete(synchronize_session=False)
+
+    rollups = [AgentUsageRollup(agent_id=agent_id, total_calls=total_calls, total_tokens=total_tokens)
+               for agent_id, total_calls, total_tokens in totals_query.group_by(AgentExecution.agent_id).all()]
+    session.add_all(rollups)
+    session.commit()
+
+    logger.info(f"rebuild_agent_usage_rollups: rebuilt {len(rollups)} rollups")
+    return len(rollups)
+
+
+def _apply_usage_delta(connection, agent_id, calls_delta, tokens_delta):
+    if agent_id is None or (not calls_delta and not tokens_delta):
+        return
+    # Before the rollups are seeded in this process the seed will count the change
+    if connection.dialect.name == "postgresql" or str(connection.engine.url) not in _ready_engines:
+        return
+    rollups = AgentUsageRollup.__table__
+    if connection.dialect.name == "sqlite":
+        statement = sqlite_insert(rollups).values(agent_id=agent_id, total_calls=calls_delta, total_tokens=tokens_delta)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[rollups.c.agent_id],
+            set_=dict(total_calls=rollups.c.total_calls + statement.excluded.total_calls,
+                      total_tokens=rollups.c.total_tokens + statement.excluded.total_tokens)))
+        return
+    updated = connection.execute(update(rollups).where(rollups.c.agent_id == agent_id)
+                                 .values(total_calls=rollups.c.total_calls + calls_delta,
+                                         total_tokens=rollups.c.total_tokens + tokens_delta)).rowcount
+    if not updated:
+        connection.execute(rollups.insert().values(agent_id=agent_id, total_calls=calls_delta, total_tokens=tokens_delta))
+
+
+def _history_delta(state, key):
+    history = state.attrs[key].history
+    if not history.has_changes():
+        return 0
+    old = history.deleted[0] if history.deleted else 0
+    new = history.added[0] if history.added else 0
+    return (new or 0) - (old or 0)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+def _rollup_after_insert(mapper, connection, target):
+    _apply_usage_delta(connection, target.agent_id, target.num_of_calls or 0, target.num_of_tokens or 0)
+
+
+def _rollup_after_update(mapper, connection, target):
+    state = inspect(target)
+    _apply_usage_delta(connection, target.agent_id, _history_delta(state, "num_of_calls"),
+                       _history_delta(state, "num_of_tokens"))
+
+
+def _rollup_after_delete(mapper, connection, target):
+    _apply_usage_delta(connection, target.agent_id, -(target.num_of_calls or 0), -(target.num_of_tokens or 0))
+
+
+def _listen_for_usage_changes():
+    """
+    Registers the ORM events maintaining the rollups off Postgres, once per process. Called with
+    `_ready_lock` held.
+    """
+    global _listening
+    if _listening:
+        return
+    # Loads the previous value when an expired counter is assigned, so its history holds the difference
+    event.listen(AgentExecution.num_of_calls, "set", _load_old_value, active_history=True, retval=True)
+    event.listen(AgentExecution.num_of_tokens, "set", _load_old_value, active_history=True, retval=True)
+    event.listen(AgentExecution, "after_insert", _rollup_after_insert)
+    event.listen(AgentExecution, "after_update", _rollup_after_update)
+    event.listen(AgentExecution, "after_delete", _rollup_after_delete)
+    _listening = True
+
+
+if __name__ == "__main__":
+    from agent_manager_helpers_db import session_scope
+
+    parser = argparse.ArgumentParser(description="Rebuild the agent manager usage rollups.")
+    parser.add_argument("--agent-id", type=int, action="append", dest="agent_ids",
+                        help="Only rebuild this agent. Can be given several times.")
+    args = parser.parse_args()
+
+    try:
+        with session_scope() as session:
+            count = rebuild_agent_usage_rollups(session, args.agent_ids)
+        print(f"Rebuilt {count} agent usage rollups.")
+    except Exception:
+        logger.error(traceback.format_exc())
+        raise SystemExit(1)
@@ -1,13 +1,37 @@
 import traceback
 
-from typing import Type
-from pydantic import BaseModel
+from typing import Type, Optional
+from pydantic import BaseModel, Field
 from superagi.tools.base_tool import BaseTool
 from agent_manager_helpers_data import get_agents
+from agent_manager_helpers_db import tool_session
 
 
 class ListAgentInput(BaseModel):
-    pass
+    limit: Optional[int] = Field(
+        default=None,
+        description="The maximum number of agents to return. Leave empty for all agents.",
+    )
+    after_id: Optional[int] = Field(
+        default=None,
+        description="Only return agents with an id greater than this one (the next_after_id of the previous page).",
+    )
+    fields: Optional[list[str]] = Field(
+        default=None,
+        description="The agent fields to return. Leave empty for the profile's fields.",
+    )
+    profile: Optional[str] = Field(
+        default="full",
+        description="\"full\" returns every field, \"summary\" only the key fields of each object.",
+    )
+    compact: Optional[bool] = Field(
+        default=False,
+        description="Return the agents as a table (column names once, then rows).",
+    )
+    output_format: Optional[str] = Field(
+        default="json",
+        description="\"json\" for a single JSON document or \"ndjson\" for one JSON object per line.",
+    )
 
 class ListAgentTool(BaseTool):
     """
@@ -25,20 +49,29 @@ class ListAgentTool(BaseTool):
     agent_id: int = None
     agent_execution_id: int = None
             
-    def _execute(self):   
+    def _execute(self, limit: Optional[int] = None, after_id: Optional[int] = None, fields: Optional[list[str]] = None,
+                 profile: str = "full", compact: bool = False, output_format: str = "json"):   
     
         """
         Execute the List Agent tool.
         Returns:
-            JSON representation of all the agents from default project
+            JSON representation of the agents from default project, one page at a time if a limit is given
         """
 
         try:
-            agents = get_agents(self.toolkit_config.session, self.toolkit_config.toolkit_id)
+            with tool_session(self.toolkit_config) as session:
+                agents = get_agents(session, self.toolkit_config.toolkit_id, limit, after_id)
+                if agents == None:
+                    return None
+                agents = agents.projected(fields, profile, compact)
+                return agents.to_ndjson() if output_format == "ndjson" else agents.to_json()
+        except ValueError:
+            # Invalid arguments, e.g. an unknown profile: the message lists the valid ones
+            raise
         except:
             traceback.print_exc()
 
-        return agents.to_json() if agents != None else None
+        return None
 
         
 
@@ -0,0 +1,275 @@
+import threading
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, MetaData, select, text
+from sqlalchemy.orm import declarative_base
+
+# The toolkit's tables live in their own metadata, so SuperAGI's migrations never see them
+AgentManagerBase = declarative_base(metadata=MetaData())
+
+# Version of the toolkit's tables, raised whenever they change
+AGENT_MANAGER_SCHEMA_VERSION = 1
+# Statements bringing existing tables from the previous version to each version. They also run
+# after the tables were just created, so they must be idempotent (e.g. ADD COLUMN IF NOT EXISTS).
+AGENT_MANAGER_SCHEMA_UPGRADES = {}
+
+
+class AgentManagerModel(AgentManagerBase):
+    """
+    Base of the toolkit's models, with the timestamps of SuperAGI's models.
+    """
+
+    __abstract__ = True
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class AgentUsageRollup(AgentManagerModel):
+    """
+    Running totals of the calls and tokens used by all executions of an agent.
+
+    Attributes:
+        agent_id (int): The agent the totals belong to.
+        total_calls (int): Sum of `num_of_calls` over the agent's executions.
+        total_tokens (int): Sum of `num_of_tokens` over the agent's executions.
+    """
+
+    __tablename__ = 'agent_manager_agent_usage'
+
+    agent_id = Column(Integer, primary_key=True)
+    total_calls = Column(BigInteger, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"AgentUsageRollup(agent_id={self.agent_id}, total_calls={self.total_calls}, " \
+               f"total_tokens={self.total_tokens})"
+
+
+class ResourceBlob(AgentManagerModel):
+    """
+    A unique piece of resource content, stored once under its SHA-256 digest.
+
+    Attributes:
+        digest (str): Hex SHA-256 of the content.
+        storage_type (str): Where the blob lives (FILE or S3).
+        path (str): The blob's file path or object key.
+        size (int): Size of the content in bytes.
+        ref_count (int): Number of resources pointing at the blob.
+    """
+
+    __tablename__ = 'agent_manager_resource_blobs'
+
+    digest = Column(String(64), primary_key=True)
+    storage_type = Column(String)
+    path = Column(String)
+    size = Column(BigInteger)
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"ResourceBlob(digest={self.digest}, storage_type={self.storage_type}, path={self.path}, " \
+               f"size={self.size}, ref_count={self.ref_count})"
+
+
+class ResourceBlobRef(AgentManagerModel):
+    """
+    Links a SuperAGI resource to the blob holding its content.
+
+    Attributes:
+        resource_id (int): The resource.
+        digest (str): The blob's digest.
+    """
+
+    __tablename__ = 'agent_manager_resource_blob_refs'
+
+    resource_id = Column(Integer, primary_key=True)
+    digest = Column(String(64), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"ResourceBlobRef(resource_id={self.resource_id}, digest={self.digest})"
+
+
+class RunResultCacheEntry(AgentManagerModel):
+    """
+    Remembers the completed execution that answered a child-agent run request.
+
+    Attributes:
+        cache_key (str): Hex SHA-256 of the target agent, its configuration and the input file hashes.
+        target_agent_id (int): The agent that was run.
+        agent_execution_id (int): The completed execution whose results are reused.
+    """
+
+    __tablename__ = 'agent_manager_run_result_cache'
+
+    cache_key = Column(String(64), primary_key=True)
+    target_agent_id = Column(Integer, nullable=False, index=True)
+    agent_execution_id = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"RunResultCacheEntry(cache_key={self.cache_key}, target_agent_id={self.target_agent_id}, " \
+               f"agent_execution_id={self.agent_execution_id})"
+
+
+class QueuedRun(AgentManagerModel):
+    """
+    A child execution admitted through the toolkit's scheduler.
+
+    Attributes:
+        id (int): Queue position, earlier rows of the same priority start first.
+        agent_execution_id (int): The execution waiting to be (or already) handed to the worker.
+        target_agent_id (int): The agent of the execution, for per-agent limits.
+        parent_agent_execution_id (int): The execution that requested the run.
+        priority (int): Higher priorities start first.
+        status (str): QUEUED until dispatched, then STARTED until the execution finishes.
+        started_at (datetime): When the execution was handed to the worker.
+    """
+
+    __tablename__ = 'agent_manager_run_queue'
+
+    id = Column(Integer, primary_key=True)
+    agent_execution_id = Column(Integer, nullable=False, unique=True)
+    target_agent_id = Column(Integer, nullable=False, index=True)
+    parent_agent_execution_id = Column(Integer)
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String, nullable=False, default="QUEUED", index=True)
+    started_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"QueuedRun(id={self.id}, agent_execution_id={self.agent_execution_id}, " \
+               f"target_agent_id={self.target_agent_id}, priority={self.priority}, status={self.status})"
+
+
+class RunWaiter(AgentManagerModel):
+    """
+    An execution blocking a worker while it waits for child runs.
+
+    Attributes:
+        agent_execution_id (int): The waiting execution.
+    """
+
+    __tablename__ = 'agent_manager_run_waiters'
+
+    agent_execution_id = Column(Integer, primary_key=True)
+
+    def __repr__(self):
+        return f"RunWaiter(agent_execution_id={self.agent_execution_id})"
+
+
+class AgentPipeline(AgentManagerModel):
+    """
+    A DAG of agent runs started by one tool call, persisted so it can be resumed.
+
+    Attributes:
+        id (int): The pipeline id.
+        source_agent_id (int): The agent that started the pipeline.
+        source_agent_execution_id (int): The execution that started the pipeline.
+        status (str): RUNNING, COMPLETED or FAILED.
+        definition (str): The stages as JSON.
+        state (str): JSON of the execution and wait state of every stage.
+    """
+
+    __tablename__ = 'agent_manager_pipelines'
+
+    id = Column(Integer, primary_key=True)
+    source_agent_id = Column(Integer)
+    source_agent_execution_id = Column(Integer, index=True)
+    status = Column(String, nullable=False, default="RUNNING")
+    definition = Column(Text, nullable=False)
+    state = Column(Text, nullable=False, default="{}")
+
+    def __repr__(self):
+        return f"AgentPipeline(id={self.id}, source_agent_execution_id={self.source_agent_execution_id}, " \
+               f"status={self.status})"
+
+
+class RunTreeNode(AgentManagerModel):
+    """
+    Links an execution started through the toolkit to the execution that started it.
+
+    Attributes:
+        agent_execution_id (int): The child execution.
+        parent_agent_execution_id (int): The execution that started it.
+        root_agent_execution_id (int): The top of the tree, an execution not started by the toolkit.
+        depth (int): 1 for children of the root, 2 for their children, and so on.
+    """
+
+    __tablename__ = 'agent_manager_run_tree'
+
+    agent_execution_id = Column(Integer, primary_key=True)
+    parent_agent_execution_id = Column(Integer, nullable=False, index=True)
+    root_agent_execution_id = Column(Integer, nullable=False, index=True)
+    depth = Column(Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"RunTreeNode(agent_execution_id={self.agent_execution_id}, " \
+               f"parent_agent_execution_id={self.parent_agent_execution_id}, depth={self.depth})"
+
+
+class AgentManagerSchema(AgentManagerModel):
+    """
+    The version of the toolkit's tables in this database, in a single row.
+
+    Attributes:
+        id (int): Always 1.
+        version (int): The AGENT_MANAGER_SCHEMA_VERSION the tables were last created or upgraded to.
+    """
+
+    __tablename__ = 'agent_manager_schema'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"AgentManagerSchema(version={self.version})"
+
+
+AGENT_MANAGER_MODELS = [AgentManagerSchema, AgentUsageRollup, ResourceBlob, ResourceBlobRef, RunResultCacheEntry,
+                        QueuedRun, RunWaiter, AgentPipeline, RunTreeNode]
+
+_ready_engines = set()
+_ready_lock = threading.Lock()
+
+
+def ensure_agent_manager_tables(bind):
+    """
+    Creates or upgrades the toolkit's own tables, once per engine and process.
+
+    These tables are not part of SuperAGI's migrations. Their version is kept in
+    `agent_manager_schema`: when it is behind AGENT_MANAGER_SCHEMA_VERSION, missing tables are
+    created and the upgrades of every later version run, in one transaction. On Postgres an advisory
+    lock keeps other processes from doing the same at the same time.
+
+    Args:
+        bind (Engine | Connection): The engine (or a connection of the engine) to create them with.
+    """
+    engine = getattr(bind, "engine", bind)
+    key = str(engine.url)
+    if key in _ready_engines:
+        return
+    with _ready_lock:
+        if key not in _ready_engines:
+            with engine.begin() as connection:
+                _upgrade_schema(connection)
+            _ready_engines.add(key)
+
+
+def _upgrade_schema(connection):
+    schema = AgentManagerSchema.__table__
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": schema.name})
+    schema.create(bind=connection, checkfirst=True)
+    version = connection.execute(select(schema.c.version).where(schema.c.id == 1)).scalar()
+    if version == AGENT_MANAGER_SCHEMA_VERSION:
+        return
+
+    AgentManagerBase.metadata.create_all(bind=connection, checkfirst=True)
+    # Tables created before they were versioned are at version 1
+    for upgrade_version in range((version or 1) + 1, AGENT_MANAGER_SCHEMA_VERSION + 1):
+        for statement in AGENT_MANAGER_SCHEMA_UPGRADES.get(upgrade_version, ()):
+            connection.execute(text(statement))
+    if version is None:
+        connection.execute(schema.insert().values(id=1, version=AGENT_MANAGER_SCHEMA_VERSION))
+    else:
+        connection.execute(schema.update().where(schema.c.id == 1).values(version=AGENT_MANAGER_SCHEMA_VERSION))
+        if connection.dialect.name != "postgresql":
+            # Emptied so they are seeded again, off Postgres only an empty table is (see ensure_usage_rollups)
+            connection.execute(AgentUsageRollup.__table__.delete())
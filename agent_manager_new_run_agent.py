@@ -1,9 +1,10 @@
-import traceback
-from typing import Any, List, Type, Optional
+from typing import Type, Optional
 
 from pydantic import BaseModel, Field
 from superagi.tools.base_tool import BaseTool
 from agent_manager_helpers_data import execute_save_scheduled_agent_tool
+from agent_manager_helpers_db import tool_session
+from agent_manager_helpers_projection import project_run_result
 
 
 
@@ -18,12 +19,28 @@ class NewRunAgentInput(BaseModel):
     )
     wait_for_complete: bool = Field(
         ...,
-        description="(Recommended) Wait for the agent to finish",
+        description="(Recommended) Wait for the agent to finish. Otherwise the returned handle can be checked with the Await Agent Run Tool.",
     )
     return_feed: Optional[bool] = Field(
         ...,
         description="Return the result feed (requires wait for finish to be true).",
     )
+    output_profile: Optional[str] = Field(
+        default="full",
+        description="\"full\" returns every field, \"summary\" only the key fields of the execution and resources.",
+    )
+    compact: Optional[bool] = Field(
+        default=False,
+        description="Return the resources as a table (column names once, then rows).",
+    )
+    priority: Optional[int] = Field(
+        default=0,
+        description="Start priority when runs are queued by concurrency limits, higher starts first.",
+    )
+    feed_token_budget: Optional[int] = Field(
+        default=None,
+        description="Return a digest of the feed (final result, errors and latest entries) of at most this many tokens instead of the full feed.",
+    )
 
 class NewRunAgentTool(BaseTool):
     """
@@ -45,11 +62,15 @@ class NewRunAgentTool(BaseTool):
     target_agent_id: int = None
     wait_for_result: bool = True
             
-    def _execute(self, target_agent_id: int, files_for_agent_run: list[str] = [], wait_for_complete: bool = True, return_feed: bool = True):
+    def _execute(self, target_agent_id: int, files_for_agent_run: list[str] = [], wait_for_complete: bool = True, return_feed: bool = True,
+                 output_profile: str = "full", compact: bool = False, priority: int = 0,
+                 feed_token_budget: int = None):
         """
         Execute the Save Scheduled Agent Tool.
         Returns:
             JSON representation of the agent ID
         """
-        return execute_save_scheduled_agent_tool(self.toolkit_config.session, self.agent_id, self.agent_execution_id, target_agent_id, files_for_agent_run, wait_for_complete, return_feed)
+        with tool_session(self.toolkit_config) as session:
+            result = execute_save_scheduled_agent_tool(session, self.agent_id, self.agent_execution_id, target_agent_id, files_for_agent_run, wait_for_complete, return_feed, priority, feed_token_budget)
+            return project_run_result(result, output_profile, compact)
     
\ No newline at end of file
@@ -0,0 +1,94 @@
+from typing import Type, Optional
+
+from pydantic import BaseModel, Field
+from superagi.tools.base_tool import BaseTool
+from agent_manager_helpers_pipeline import run_agent_pipeline
+from agent_manager_helpers_db import tool_session
+from agent_manager_helpers_projection import project_run_result
+
+
+class PipelineAgentStage(BaseModel):
+    name: str = Field(
+        ...,
+        description="A unique name for the stage, used in depends_on.",
+    )
+    target_agent_id: int = Field(
+        ...,
+        description="The agent id to create a run for.",
+    )
+    depends_on: list[str] = Field(
+        default=[],
+        description="Names of the stages that must succeed first. Their output files are attached to this stage.",
+    )
+    files_for_agent_run: list[str] = Field(
+        default=[],
+        description="A list of the current run's files to attach to the execution.",
+    )
+    priority: Optional[int] = Field(
+        default=0,
+        description="Start priority when runs are queued by concurrency limits, higher starts first.",
+    )
+
+class PipelineAgentInput(BaseModel):
+    stages: list[PipelineAgentStage] = Field(
+        default=[],
+        description="The stages of the pipeline. Not needed when resuming a pipeline.",
+    )
+    pipeline_id: Optional[int] = Field(
+        default=None,
+        description="The id of an unfinished pipeline to resume instead of starting a new one.",
+    )
+    max_concurrency: Optional[int] = Field(
+        default=5,
+        description="The maximum number of stages running at the same time.",
+    )
+    stage_timeout: Optional[int] = Field(
+        default=600,
+        description="The maximum number of seconds to wait for each stage.",
+    )
+    return_feed: Optional[bool] = Field(
+        default=False,
+        description="Return the result feed of each stage.",
+    )
+    feed_token_budget: Optional[int] = Field(
+        default=None,
+        description="Return a digest of the feed (final result, errors and latest entries) of at most this many tokens instead of the full feed.",
+    )
+    output_profile: Optional[str] = Field(
+        default="full",
+        description="\"full\" returns every field, \"summary\" only the key fields of the execution and resources.",
+    )
+    compact: Optional[bool] = Field(
+        default=False,
+        description="Return the resources as a table (column names once, then rows).",
+    )
+
+class PipelineAgentTool(BaseTool):
+    """
+    Pipeline Agent tool
+    Attributes:
+        name : The name.
+        args_schema : The args schema.
+        description : The description.
+        agent_id : Current agent id
+        agent_execution : Current agent execution
+    """
+    name: str = "Pipeline Agent Tool"
+    args_schema: Type[PipelineAgentInput] = PipelineAgentInput
+    description: str = "Runs a pipeline of agents in one call. Each stage starts once the stages it depends on succeeded and receives their output files; independent stages run in parallel."
+    agent_id: int = None
+    agent_execution_id: int = None
+
+    def _execute(self, stages: list = [], pipeline_id: int = None, max_concurrency: int = 5, stage_timeout: int = 600,
+                 return_feed: bool = False, feed_token_budget: int = None, output_profile: str = "full",
+                 compact: bool = False):
+        """
+        Execute the Pipeline Agent Tool.
+        Returns:
+            The pipeline id and status, and the results of every stage
+        """
+        stages = [stage.dict() if isinstance(stage, BaseModel) else stage for stage in stages or []]
+        with tool_session(self.toolkit_config) as session:
+            result = run_agent_pipeline(session, self.agent_id, self.agent_execution_id, stages or None, pipeline_id,
+                                        max_concurrency, stage_timeout, return_feed, feed_token_budget)
+            return project_run_result(result, output_profile, compact)
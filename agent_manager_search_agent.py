@@ -0,0 +1,57 @@
+import traceback
+
+from typing import Type, Optional
+from pydantic import BaseModel, Field
+from superagi.tools.base_tool import BaseTool
+from agent_manager_helpers import dumps
+from agent_manager_helpers_cache import get_agent_catalog
+from agent_manager_helpers_db import tool_session
+
+
+class SearchAgentInput(BaseModel):
+    query: str = Field(
+        ...,
+        description="What the agent should be able to do, matched against agent names and descriptions.",
+    )
+    limit: Optional[int] = Field(
+        default=10,
+        description="The maximum number of agents to return.",
+    )
+
+class SearchAgentTool(BaseTool):
+    """
+    Search Agent tool
+    Attributes:
+        name : The name.
+        args_schema : The args schema.
+        description : The description.
+        agent_id : Current agent id
+        agent_execution : Current agent execution
+    """
+    name: str = "Search Agent Tool"
+    args_schema: Type[SearchAgentInput] = SearchAgentInput
+    description: str = "Finds the agents of the default project best matching a query, for agents not listed in the Dynamic Agent Tool."
+    agent_id: int = None
+    agent_execution_id: int = None
+
+    def _execute(self, query: str, limit: int = 10):
+        """
+        Execute the Search Agent tool.
+        Returns:
+            JSON list of the matching agents with their relevance score, best match first
+        """
+        try:
+            with tool_session(self.toolkit_config) as session:
+                entry = get_agent_catalog().get(lambda: session, self.toolkit_config.toolkit_id)
+                if entry is None:
+                    return None
+                matches = entry.index.search(query, limit or 10)
+                return dumps({
+                    "total_agents": len(entry.agents),
+                    "agents": [{"id": agent_id, "name": name, "description": description, "score": score}
+                               for agent_id, name, description, score in matches]
+                })
+        except:
+            traceback.print_exc()
+
+        return None
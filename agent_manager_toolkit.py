@@ -1,12 +1,19 @@
 from abc import ABC
 from typing import List
-import traceback
 from superagi.tools.base_tool import BaseTool, BaseToolkit
 from agent_manager_list_agent import ListAgentTool
 from agent_manager_current_agent import CurrentAgentTool
 from agent_manager_new_run_agent import NewRunAgentTool
 from agent_manager_dynamic_agent import DynamicAgentTool
-from superagi.lib.logger import logger
+from agent_manager_fan_out_agent import FanOutAgentTool
+from agent_manager_await_agent_run import AwaitAgentRunTool
+from agent_manager_pipeline_agent import PipelineAgentTool
+from agent_manager_search_agent import SearchAgentTool
+from agent_manager_agent_run_status import AgentRunStatusTool
+from agent_manager_helpers_db import get_pool_stats, session_scope
+from agent_manager_helpers_metrics import get_metrics_registry
+from agent_manager_helpers_scheduler import get_scheduler_stats
+from agent_manager_helpers_run_tree import get_run_tree_totals, terminate_run_tree
 
 class AgentManagerToolkit(BaseToolkit, ABC):
     name: str = "Agent Manager Toolkit"
@@ -15,8 +22,28 @@ class AgentManagerToolkit(BaseToolkit, ABC):
         
     def get_tools(self) -> List[BaseTool]:
         return [
-            ListAgentTool(), CurrentAgentTool(), NewRunAgentTool(), DynamicAgentTool()
+            ListAgentTool(), CurrentAgentTool(), NewRunAgentTool(), DynamicAgentTool(), FanOutAgentTool(),
+            AwaitAgentRunTool(), AgentRunStatusTool(), PipelineAgentTool(), SearchAgentTool()
         ]
 
     def get_env_keys(self) -> List[str]:
         return []
+
+    def get_pool_stats(self) -> dict:
+        return get_pool_stats()
+
+    def get_metrics(self) -> str:
+        return get_metrics_registry().render_prometheus()
+
+    def get_scheduler_stats(self) -> dict:
+        with session_scope() as session:
+            return get_scheduler_stats(session)
+
+    def get_run_tree_totals(self, agent_execution_id: int) -> dict:
+        with session_scope() as session:
+            return get_run_tree_totals(session, agent_execution_id)
+
+    def terminate_run_tree(self, agent_execution_id: int) -> list:
+        with session_scope() as session:
+            return terminate_run_tree(session, agent_execution_id, include_root=True)
+
@@ -0,0 +1,341 @@
+"""
+Offline microbenchmarks for the agent manager toolkit's hot paths.
+
+Runs against SQLite with the stub SuperAGI modules of `superagi_stub`, so no SuperAGI deployment is
+needed. Results are written as JSON and can be compared with an earlier run:
+
+    python benchmarks/bench_agent_manager.py --agents 200 --executions 50 --feeds 500 --output results/head.json
+    python benchmarks/bench_agent_manager.py --compare results/base.json --threshold 0.2
+
+Toolkit startup (import and tool construction) is measured in fresh interpreters and can be held to
+a budget, which also fails when building the tools queries the database or loads a heavy SDK:
+
+    python benchmarks/bench_agent_manager.py --import-budget 150
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+import superagi_stub  # noqa: E402
+
+
+def timeit(func, repeat: int, setup=None):
+    """
+    Calls `func` `repeat` times and returns timing statistics in milliseconds.
+
+    Args:
+        func (Callable[[], Any]): The code to time.
+        repeat (int): Number of timed calls.
+        setup (Callable[[], None], optional): Called untimed before every call, e.g. to drop caches.
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+    }
+
+
+def seed(session, agents: int, executions: int, feeds: int, configs_per_agent: int = 12):
+    """
+    Fills the stub database: one organisation, project and toolkit, `agents` agents with
+    configuration rows, `executions` executions of the first agent and `feeds` feed rows on its
+    latest execution.
+
+    Returns:
+        dict: Ids the benchmarks run against.
+    """
+    from superagi_stub import (Organisation, Project, Toolkit, Tool, Agent, AgentConfiguration, AgentExecution,
+                               AgentExecutionConfiguration, AgentExecutionFeed, AgentExecutionPermission)
+
+    organisation = Organisation(name="Benchmark", description="Benchmark organisation")
+    session.add(organisation)
+    session.flush()
+    project = Project(name="Default Project", organisation_id=organisation.id, description="")
+    session.add(project)
+    session.flush()
+    toolkit = Toolkit(name="Agent Manager Toolkit", description="", organisation_id=organisation.id,
+                      show_toolkit=True)
+    session.add(toolkit)
+    session.flush()
+    session.add(Tool(name="Dynamic Agent Tool", description="", folder_name="agent_manager",
+                     class_name="DynamicAgentTool", file_name="agent_manager_dynamic_agent.py",
+                     toolkit_id=toolkit.id))
+
+    agent_rows = [Agent(name=f"Agent {index}", project_id=project.id, agent_workflow_id=1,
+                        description=f"Benchmark agent number {index} that does something useful " * 2)
+                  for index in range(agents)]
+    session.add_all(agent_rows)
+    session.flush()
+
+    config_values = {
+        "goal": '["Write a report"]', "instruction": '["Be concise"]', "constraints": "",
+        "toolkits": "{1,2,3}", "model": "gpt-4", "max_iterations": "25", "agent_workflow": "Goal Based Workflow",
+        "permission_type": "God Mode", "LTM_DB": "Pinecone", "memory_window": "10", "exit": "No exit criterion",
+        "iteration_interval": "500",
+    }
+    session.add_all([AgentConfiguration(agent_id=agent.id, key=key, value=value)
+                     for agent in agent_rows
+                     for key, value in list(config_values.items())[:configs_per_agent]])
+
+    first_agent = agent_rows[0]
+    now = datetime.now()
+    execution_rows = [AgentExecution(agent_id=first_agent.id, name=f"Run {index}", status="COMPLETED",
+                                     num_of_calls=index, num_of_tokens=index * 100,
+                                     created_at=now - timedelta(seconds=executions - index),
+                                     last_execution_time=now)
+                      for index in range(executions)]
+    session.add_all(execution_rows)
+    session.flush()
+    latest = execution_rows[-1]
+    session.add_all([AgentExecutionConfiguration(agent_execution_id=execution.id, key=key, value=value)
+                     for execution in execution_rows for key, value in config_values.items()])
+
+    feed_rows = []
+    for index in range(feeds):
+        if index % 10 == 0:
+            feed_rows.append(AgentExecutionFeed(agent_execution_id=latest.id, agent_id=first_agent.id, role="system",
+                                                feed="The current time and date is Mon Jan  1 10:00:00 2024"))
+        elif index % 3 == 0:
+            feed_rows.append(AgentExecutionFeed(agent_execution_id=latest.id, agent_id=first_agent.id,
+                                                role="assistant", feed=json.dumps({
+                                                    "thoughts": {"text": f"Step {index}", "reasoning": "because"},
+                                                    "tool": {"name": "Write File", "args": {"file_name": "a.txt"}}})))
+        else:
+            feed_rows.append(AgentExecutionFeed(agent_execution_id=latest.id, agent_id=first_agent.id, role="user",
+                                                feed=f"Tool Write File returned: wrote {index} bytes"))
+    session.add_all(feed_rows)
+    session.add_all([AgentExecutionPermission(agent_execution_id=latest.id, agent_id=first_agent.id,
+                                              status="APPROVED", tool_name="Write File", question="ok?")
+                     for _ in range(5)])
+    session.commit()
+
+    return {"toolkit_id": toolkit.id, "agent_id": first_agent.id, "execution_id": latest.id,
+            "middle_feed_id": feed_rows[len(feed_rows) // 2].id if feed_rows else None}
+
+
+def run(args):
+    db_path = os.path.join(tempfile.mkdtemp(prefix="agent_manager_bench_"), "bench.db")
+    engine = superagi_stub.install(f"sqlite:///{db_path}")
+
+    from sqlalchemy.orm import sessionmaker
+    from agent_manager_helpers import serialize, dumps
+    from agent_manager_helpers_cache import get_agent_catalog, get_agent_config_cache, get_parsed_feed_cache
+    from agent_manager_helpers_data import (get_agents, get_agent_execution_configuration, create_agent_execution,
+                                            get_agent_execution_feed, get_agent_execution_feed_digest,
+                                            get_agent_run_statuses)
+    from agent_manager_models import ensure_agent_manager_tables
+    from agent_manager_dynamic_agent import DynamicAgentTool
+    from superagi_stub import AgentExecution
+
+    ensure_agent_manager_tables(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    ids = seed(session, args.agents, args.executions, args.feeds)
+    toolkit_config = superagi_stub.BaseToolkitConfiguration(session=session, toolkit_id=ids["toolkit_id"])
+    repeat = args.repeat
+
+    def drop_caches():
+        get_agent_catalog().invalidate()
+        get_agent_config_cache().invalidate()
+        get_parsed_feed_cache().invalidate()
+        session.expire_all()
+
+    tool = DynamicAgentTool()
+    tool.toolkit_config = toolkit_config
+
+    listing = get_agents(session, ids["toolkit_id"])
+    execution_config_in = {"name": "Benchmark run", "goal": ["Write a report"], "instruction": ["Be concise"]}
+
+    results = {}
+    results["get_agents"] = timeit(lambda: get_agents(session, ids["toolkit_id"]), repeat, session.expire_all)
+    results["list_agents_to_json"] = timeit(lambda: get_agents(session, ids["toolkit_id"]).to_json(), repeat,
+                                            session.expire_all)
+    results["dynamic_agent_set_attributes_cold"] = timeit(tool.set_attributes, repeat, drop_caches)
+    results["dynamic_agent_set_attributes_warm"] = timeit(tool.set_attributes, repeat)
+    entry = get_agent_catalog().get(lambda: session, ids["toolkit_id"])
+    results["agent_search"] = timeit(lambda: entry.index.search("report useful agent", 10), repeat)
+    results["get_agent_execution_configuration"] = timeit(
+        lambda: get_agent_execution_configuration(ids["agent_id"], session), repeat, session.expire_all)
+    results["create_agent_execution"] = timeit(
+        lambda: create_agent_execution(ids["agent_id"], execution_config_in, session), repeat)
+    results["get_agent_execution_feed_cold"] = timeit(
+        lambda: get_agent_execution_feed(ids["execution_id"], session), repeat, drop_caches)
+    results["get_agent_execution_feed_warm"] = timeit(
+        lambda: get_agent_execution_feed(ids["execution_id"], session), repeat, session.expire_all)
+    results["get_agent_execution_feed_incremental"] = timeit(
+        lambda: get_agent_execution_feed(ids["execution_id"], session, after_feed_id=ids["middle_feed_id"]), repeat,
+        session.expire_all)
+    results["get_agent_execution_feed_digest"] = timeit(
+        lambda: get_agent_execution_feed_digest(ids["execution_id"], session, max_tokens=1000), repeat, drop_caches)
+    execution_ids = [agent_execution_id for (agent_execution_id,) in session.query(AgentExecution.id).limit(50).all()]
+    results["get_agent_run_statuses"] = timeit(lambda: get_agent_run_statuses(session, execution_ids), repeat)
+    listing = get_agents(session, ids["toolkit_id"])
+    results["serialize_agents"] = timeit(lambda: serialize(listing.agents), repeat)
+    results["dumps_agents"] = timeit(lambda: dumps(listing.agents), repeat)
+
+    session.close()
+    return results
+
+
+# Loaded on first use only, importing the toolkit must not pull them in
+HEAVY_MODULES = ("boto3", "botocore", "unstructured")
+
+STARTUP_SCRIPT = """
+import json, sys, time
+sys.path[:0] = [{here!r}, {root!r}]
+import superagi_stub
+superagi_stub.install({db_url!r})
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+queries = []
+event.listen(Engine, "before_cursor_execute", lambda *args: queries.append(1))
+start = time.perf_counter()
+import agent_manager_toolkit
+imported = time.perf_counter()
+agent_manager_toolkit.AgentManagerToolkit().get_tools()
+built = time.perf_counter()
+print(json.dumps({{"import_ms": (imported - start) * 1000, "construct_ms": (built - imported) * 1000,
+                  "construct_queries": len(queries),
+                  "heavy_modules": sorted(name for name in {heavy!r} if name in sys.modules)}}))
+"""
+
+
+def measure_startup(repeat: int = 5) -> dict:
+    """
+    Imports the toolkit and builds its tools in `repeat` fresh interpreters.
+
+    Returns:
+        dict: Median import and construction times in milliseconds, the most queries run while
+        building the tools and the heavy modules that got loaded.
+    """
+    db_path = os.path.join(tempfile.mkdtemp(prefix="agent_manager_bench_"), "startup.db")
+    script = STARTUP_SCRIPT.format(here=HERE, root=ROOT, db_url=f"sqlite:///{db_path}", heavy=HEAVY_MODULES)
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", script], cwd=ROOT, text=True)
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "repeat": repeat,
+        "import_ms": round(statistics.median(sample["import_ms"] for sample in samples), 4),
+        "construct_ms": round(statistics.median(sample["construct_ms"] for sample in samples), 4),
+        "construct_queries": max(sample["construct_queries"] for sample in samples),
+        "heavy_modules": sorted({name for sample in samples for name in sample["heavy_modules"]}),
+    }
+
+
+def check_startup(startup: dict, budget_ms: float) -> list:
+    """
+    Returns the ways `startup` breaks the budget, empty when it keeps to it.
+    """
+    problems = []
+    total_ms = startup["import_ms"] + startup["construct_ms"]
+    if total_ms > budget_ms:
+        problems.append(f"import and tool construction took {total_ms:.1f} ms, budget {budget_ms:.1f} ms")
+    if startup["construct_queries"]:
+        problems.append(f"building the tools ran {startup['construct_queries']} queries")
+    if startup["heavy_modules"]:
+        problems.append(f"importing the toolkit loaded {', '.join(startup['heavy_modules'])}")
+    return problems
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float):
+    """
+    Returns the benchmarks whose median got slower than the baseline by more than `threshold`
+    (a fraction, 0.2 = 20%), as (name, baseline_ms, current_ms, change) tuples.
+    """
+    regressions = []
+    for name, stats in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before["median_ms"]:
+            continue
+        change = stats["median_ms"] / before["median_ms"] - 1
+        print(f"{name:45} {before['median_ms']:10.3f} ms -> {stats['median_ms']:10.3f} ms  {change:+7.1%}")
+        if change > threshold:
+            regressions.append((name, before["median_ms"], stats["median_ms"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agent manager toolkit microbenchmarks")
+    parser.add_argument("--agents", type=int, default=100, help="Agents in the toolkit's project")
+    parser.add_argument("--executions", type=int, default=20, help="Executions of the benchmarked agent")
+    parser.add_argument("--feeds", type=int, default=500, help="Feed rows of the benchmarked execution")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed calls per benchmark")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare against the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown of a median before --compare fails, as a fraction")
+    parser.add_argument("--import-budget", type=float,
+                        help="Fail when importing the toolkit and building its tools takes longer (ms)")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"agents": args.agents, "executions": args.executions, "feeds": args.feeds,
+                   "repeat": args.repeat},
+        "results": run(args),
+        "startup": measure_startup(),
+    }
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.import_budget is not None:
+        problems = check_startup(report["startup"], args.import_budget)
+        for problem in problems:
+            print(f"STARTUP {problem}")
+        if problems:
+            return 1
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+        if baseline.get("params") != report["params"]:
+            print(f"warning: baseline params {baseline.get('params')} differ from {report['params']}")
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            for name, before, after, change in regressions:
+                print(f"REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms ({change:+.1%})")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
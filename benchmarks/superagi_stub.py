@@ -0,0 +1,409 @@
+"""
+Minimal stand-in for the parts of SuperAGI the agent manager toolkit imports.
+
+Used by the benchmarks and the tests, so the toolkit can be measured and exercised against SQLite
+without a SuperAGI deployment. The models mirror the columns the toolkit reads and writes; the worker
+tasks only record the calls made to them. Call `install()` before importing any toolkit module.
+"""
+import ast
+import json
+import logging
+import os
+import sys
+import types
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, BigInteger, create_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import StaticPool
+
+CONFIG = {
+    "STORAGE_TYPE": "FILE",
+    "RESOURCES_INPUT_ROOT_DIR": "workspace/input/{agent_id}",
+    "RESOURCES_OUTPUT_ROOT_DIR": "workspace/output/{agent_id}/{agent_execution_id}",
+    "AGENT_MANAGER_STATUS_LISTENER": "false",
+    "DB_URL": "sqlite://",
+}
+
+_engine = None
+
+
+def get_config(key, default=None):
+    return CONFIG.get(key, default)
+
+
+def connect_db():
+    global _engine
+    if _engine is None or str(_engine.url) != CONFIG["DB_URL"]:
+        if _engine is not None:
+            _engine.dispose()
+        if CONFIG["DB_URL"] in ("sqlite://", "sqlite:///:memory:"):
+            # One shared connection, or every session would see its own empty database
+            _engine = create_engine(CONFIG["DB_URL"], connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        else:
+            _engine = create_engine(CONFIG["DB_URL"], connect_args={"check_same_thread": False})
+    return _engine
+
+
+logger = logging.getLogger("superagi_stub")
+
+Base = declarative_base()
+
+
+class DBBaseModel(Base):
+    __abstract__ = True
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class Organisation(DBBaseModel):
+    __tablename__ = 'organisations'
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    description = Column(String)
+
+
+class Project(DBBaseModel):
+    __tablename__ = 'projects'
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    organisation_id = Column(Integer)
+    description = Column(String)
+
+
+class Toolkit(DBBaseModel):
+    __tablename__ = 'toolkits'
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    description = Column(String)
+    show_toolkit = Column(Boolean)
+    organisation_id = Column(Integer)
+    tool_code_link = Column(String)
+
+
+class Tool(DBBaseModel):
+    __tablename__ = 'tools'
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    description = Column(String)
+    folder_name = Column(String)
+    class_name = Column(String)
+    file_name = Column(String)
+    toolkit_id = Column(Integer)
+
+
+class Agent(DBBaseModel):
+    __tablename__ = 'agents'
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    project_id = Column(Integer)
+    description = Column(String)
+    agent_workflow_id = Column(Integer)
+    is_deleted = Column(Boolean, default=False)
+
+    @classmethod
+    def get_agent_from_id(cls, session, agent_id):
+        return session.query(Agent).filter(Agent.id == agent_id).first()
+
+
+class AgentConfiguration(DBBaseModel):
+    __tablename__ = 'agent_configurations'
+    id = Column(Integer, primary_key=True)
+    agent_id = Column(Integer)
+    key = Column(String)
+    value = Column(Text)
+
+
+class AgentExecution(DBBaseModel):
+    __tablename__ = 'agent_executions'
+    id = Column(Integer, primary_key=True)
+    status = Column(String)
+    name = Column(String)
+    agent_id = Column(Integer)
+    last_execution_time = Column(DateTime)
+    num_of_calls = Column(Integer, default=0)
+    num_of_tokens = Column(Integer, default=0)
+    current_agent_step_id = Column(Integer)
+    permission_id = Column(Integer)
+    iteration_workflow_step_id = Column(Integer)
+
+    @classmethod
+    def get_agent_execution_from_id(cls, session, agent_execution_id):
+        return session.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).first()
+
+
+class AgentExecutionConfiguration(DBBaseModel):
+    __tablename__ = 'agent_execution_configs'
+    id = Column(Integer, primary_key=True)
+    agent_execution_id = Column(Integer)
+    key = Column(String)
+    value = Column(Text)
+
+    @classmethod
+    def add_or_update_agent_execution_config(cls, session, execution, agent_execution_configs):
+        for key, value in agent_execution_configs.items():
+            config = session.query(AgentExecutionConfiguration).filter(
+                AgentExecutionConfiguration.agent_execution_id == execution.id,
+                AgentExecutionConfiguration.key == key).first()
+            if config:
+                config.value = str(value)
+            else:
+                session.add(AgentExecutionConfiguration(agent_execution_id=execution.id, key=key, value=str(value)))
+        session.commit()
+
+    @classmethod
+    def build_agent_execution_config(cls, session, agent, results_agent, results_agent_execution, total_calls,
+                                     total_tokens):
+        response = {result.key: result.value for result in results_agent}
+        response.update({result.key: result.value for result in results_agent_execution})
+        return cls._finish_config(agent, response, total_calls, total_tokens)
+
+    @classmethod
+    def build_scheduled_agent_execution_config(cls, session, agent, results_agent, total_calls, total_tokens):
+        response = {result.key: result.value for result in results_agent}
+        return cls._finish_config(agent, response, total_calls, total_tokens)
+
+    @staticmethod
+    def _finish_config(agent, response, total_calls, total_tokens):
+        for key in ("goal", "instruction"):
+            value = response.get(key)
+            # stored as JSON by the UI and as str(list) by executions
+            response[key] = ast.literal_eval(value) if isinstance(value, str) and value.startswith("[") else value or []
+        response.update(name=agent.name, description=agent.description, calls=total_calls, tokens=total_tokens)
+        return response
+
+
+class AgentExecutionFeed(DBBaseModel):
+    __tablename__ = 'agent_execution_feeds'
+    id = Column(Integer, primary_key=True)
+    agent_execution_id = Column(Integer)
+    agent_id = Column(Integer)
+    feed = Column(Text)
+    role = Column(String)
+    extra_info = Column(String)
+
+
+class AgentExecutionPermission(DBBaseModel):
+    __tablename__ = 'agent_execution_permissions'
+    id = Column(Integer, primary_key=True)
+    agent_execution_id = Column(Integer)
+    agent_id = Column(Integer)
+    status = Column(String)
+    tool_name = Column(String)
+    question = Column(Text)
+    user_feedback = Column(Text)
+
+
+class Resource(DBBaseModel):
+    __tablename__ = 'resources'
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    storage_type = Column(String)
+    path = Column(String)
+    size = Column(BigInteger)
+    type = Column(String)
+    channel = Column(String)
+    agent_id = Column(Integer)
+    agent_execution_id = Column(Integer)
+    summary = Column(Text)
+
+
+class StorageType(Enum):
+    FILE = 'FILE'
+    S3 = 'S3'
+
+    @classmethod
+    def get_storage_type(cls, store):
+        return cls(store)
+
+
+class _WorkflowStep:
+    def __init__(self, step_id):
+        self.id = step_id
+        self.action_type = "TOOL"
+        self.action_reference_id = step_id
+
+
+class AgentWorkflow:
+    @classmethod
+    def fetch_trigger_step_id(cls, session, workflow_id):
+        return _WorkflowStep(workflow_id or 1)
+
+
+class IterationWorkflow:
+    @classmethod
+    def fetch_trigger_step_id(cls, session, workflow_id):
+        return _WorkflowStep(workflow_id or 1)
+
+
+class FakeTask:
+    """
+    Celery task stand-in that records the arguments of every `delay` call.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def delay(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+
+execute_agent = FakeTask()
+summarize_resource = FakeTask()
+
+
+def get_time_difference(timestamp1, timestamp2):
+    if isinstance(timestamp1, str):
+        timestamp1 = datetime.fromisoformat(timestamp1)
+    if isinstance(timestamp2, str):
+        timestamp2 = datetime.fromisoformat(timestamp2)
+    difference = timestamp2 - timestamp1
+    hours, seconds = divmod(difference.seconds, 3600)
+    return {"years": difference.days // 365, "months": difference.days % 365 // 30, "days": difference.days % 365 % 30,
+            "hours": hours, "minutes": seconds // 60}
+
+
+def parse_feed(feed):
+    # Like SuperAGI's: the time difference is taken against now, assistant entries are summarised,
+    # and entries of other roles are returned as the model itself
+    feed.time_difference = get_time_difference(feed.updated_at, str(datetime.now()))
+    if feed.role == "assistant":
+        try:
+            parsed = json.loads(feed.feed, strict=False)
+            final_output = ""
+            if "reasoning" in parsed["thoughts"]:
+                final_output = "Thoughts: " + parsed["thoughts"]["reasoning"] + "\n"
+            if "plan" in parsed["thoughts"]:
+                final_output += "Plan: " + parsed["thoughts"]["plan"] + "\n"
+            if "criticism" in parsed["thoughts"]:
+                final_output += "Critic: " + parsed["thoughts"]["criticism"] + "\n"
+            if "tool" in parsed:
+                final_output += "Tool: " + parsed["tool"]["name"] + "\n"
+            if "command" in parsed:
+                final_output += "Tool: " + parsed["command"]["name"] + "\n"
+            return {"role": "assistant", "feed": final_output, "updated_at": feed.updated_at,
+                    "time_difference": feed.time_difference}
+        except Exception:
+            return {"role": "assistant", "feed": feed.feed, "updated_at": feed.updated_at,
+                    "time_difference": feed.time_difference}
+    if feed.role == "user":
+        return {"role": "user", "feed": feed.feed, "updated_at": feed.updated_at,
+                "time_difference": feed.time_difference}
+    return feed
+
+
+class ResourceHelper:
+    @staticmethod
+    def get_root_input_dir():
+        return get_config("RESOURCES_INPUT_ROOT_DIR") + "/"
+
+    @staticmethod
+    def get_root_output_dir():
+        return get_config("RESOURCES_OUTPUT_ROOT_DIR") + "/"
+
+    @staticmethod
+    def get_formatted_agent_level_path(agent, path, agent_execution_id=None):
+        path = path.replace("{agent_id}", str(agent.id))
+        if agent_execution_id is not None:
+            path = path.replace("{agent_execution_id}", str(agent_execution_id))
+        return path
+
+    @staticmethod
+    def get_agent_write_resource_path(file_name, agent, agent_execution):
+        root_dir = ResourceHelper.get_formatted_agent_level_path(agent, ResourceHelper.get_root_output_dir(),
+                                                                 agent_execution.id if agent_execution else None)
+        return os.path.join(root_dir, file_name)
+
+    @staticmethod
+    def get_agent_read_resource_path(file_name, agent, agent_execution):
+        input_path = os.path.join(ResourceHelper.get_formatted_agent_level_path(
+            agent, ResourceHelper.get_root_input_dir(), agent_execution.id if agent_execution else None), file_name)
+        if os.path.exists(input_path):
+            return input_path
+        return ResourceHelper.get_agent_write_resource_path(file_name, agent, agent_execution)
+
+
+class BaseToolkitConfiguration:
+    def __init__(self, session=None, toolkit_id=None):
+        self.session = session
+        self.toolkit_id = toolkit_id
+
+
+class BaseTool(BaseModel):
+    name: str = None
+    description: str = None
+    args_schema: Any = None
+    permission_required: bool = True
+    toolkit_config: Any = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def execute(self, *args, **kwargs):
+        return self._execute(*args, **kwargs)
+
+
+class BaseToolkit(BaseModel):
+    name: str = None
+    description: str = None
+
+
+MODULES = {
+    "superagi.config.config": {"get_config": get_config},
+    "superagi.lib.logger": {"logger": logger},
+    "superagi.models.db": {"connect_db": connect_db},
+    "superagi.models.base_model": {"DBBaseModel": DBBaseModel},
+    "superagi.models.agent": {"Agent": Agent},
+    "superagi.models.agent_config": {"AgentConfiguration": AgentConfiguration},
+    "superagi.models.agent_execution": {"AgentExecution": AgentExecution},
+    "superagi.models.agent_execution_config": {"AgentExecutionConfiguration": AgentExecutionConfiguration},
+    "superagi.models.agent_execution_feed": {"AgentExecutionFeed": AgentExecutionFeed},
+    "superagi.models.agent_execution_permission": {"AgentExecutionPermission": AgentExecutionPermission},
+    "superagi.models.organisation": {"Organisation": Organisation},
+    "superagi.models.project": {"Project": Project},
+    "superagi.models.resource": {"Resource": Resource},
+    "superagi.models.tool": {"Tool": Tool},
+    "superagi.models.toolkit": {"Toolkit": Toolkit},
+    "superagi.models.workflows.agent_workflow": {"AgentWorkflow": AgentWorkflow},
+    "superagi.models.workflows.iteration_workflow": {"IterationWorkflow": IterationWorkflow},
+    "superagi.worker": {"execute_agent": execute_agent, "summarize_resource": summarize_resource},
+    "superagi.helper.feed_parser": {"parse_feed": parse_feed},
+    "superagi.helper.time_helper": {"get_time_difference": get_time_difference},
+    "superagi.helper.resource_helper": {"ResourceHelper": ResourceHelper},
+    "superagi.types.storage_types": {"StorageType": StorageType},
+    "superagi.tools.base_tool": {"BaseTool": BaseTool, "BaseToolkit": BaseToolkit,
+                                 "BaseToolkitConfiguration": BaseToolkitConfiguration},
+}
+
+
+def install(db_url: Optional[str] = None):
+    """
+    Registers the stub modules in `sys.modules` and creates the SuperAGI tables.
+
+    Args:
+        db_url (str, optional): SQLAlchemy URL of the benchmark database, in-memory SQLite by default.
+
+    Returns:
+        Engine: The engine `connect_db()` returns.
+    """
+    if db_url:
+        CONFIG["DB_URL"] = db_url
+    for name, attributes in MODULES.items():
+        parts = name.split(".")
+        for index in range(1, len(parts) + 1):
+            package = ".".join(parts[:index])
+            if package not in sys.modules:
+                module = types.ModuleType(package)
+                module.__path__ = []
+                sys.modules[package] = module
+                if index > 1:
+                    setattr(sys.modules[".".join(parts[:index - 1])], parts[index - 1], module)
+        for key, value in attributes.items():
+            setattr(sys.modules[name], key, value)
+
+    engine = connect_db()
+    Base.metadata.create_all(engine)
+    return engine
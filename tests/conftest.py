@@ -0,0 +1,110 @@
+"""
+Shared fixtures. Every test runs against a fresh SQLite database with the stub SuperAGI modules of
+`benchmarks/superagi_stub.py`, from a temporary working directory so FILE storage stays out of the
+tree.
+"""
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
+
+import superagi_stub  # noqa: E402
+
+superagi_stub.install()
+
+
+@pytest.fixture
+def config(monkeypatch):
+    """
+    Returns a function overriding SuperAGI config keys for the test.
+    """
+    def set_config(**values):
+        for key, value in values.items():
+            monkeypatch.setitem(superagi_stub.CONFIG, key, value)
+    return set_config
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    from agent_manager_helpers_db import dispose_engine
+    from agent_manager_helpers_notify import stop_status_watcher
+    from agent_manager_helpers_cache import get_agent_catalog, get_agent_config_cache, get_parsed_feed_cache
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(superagi_stub.CONFIG, "DB_URL", superagi_stub.CONFIG["DB_URL"])
+    engine = superagi_stub.install(f"sqlite:///{tmp_path / 'superagi.db'}")
+    for cache in (get_agent_catalog(), get_agent_config_cache(), get_parsed_feed_cache()):
+        cache.invalidate()
+    superagi_stub.execute_agent.calls.clear()
+    yield engine
+    stop_status_watcher()
+    dispose_engine()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def session(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def project(session):
+    """
+    An organisation with its default project and an Agent Manager toolkit.
+    """
+    organisation = superagi_stub.Organisation(name="Test", description="")
+    session.add(organisation)
+    session.flush()
+    project = superagi_stub.Project(name="Default Project", organisation_id=organisation.id, description="")
+    toolkit = superagi_stub.Toolkit(name="Agent Manager Toolkit", description="", organisation_id=organisation.id,
+                                    show_toolkit=True)
+    session.add_all([project, toolkit])
+    session.flush()
+    session.add(superagi_stub.Tool(name="Dynamic Agent Tool", description="", folder_name="agent_manager",
+                                   class_name="DynamicAgentTool", file_name="agent_manager_dynamic_agent.py",
+                                   toolkit_id=toolkit.id))
+    session.commit()
+    return SimpleNamespace(organisation=organisation, project=project, toolkit=toolkit)
+
+
+@pytest.fixture
+def make_agent(session, project):
+    """
+    Returns a function creating an agent of the default project with the given configuration.
+    """
+    def make(name="Agent", description="", **configs):
+        agent = superagi_stub.Agent(name=name, description=description, project_id=project.project.id,
+                                    agent_workflow_id=1)
+        session.add(agent)
+        session.flush()
+        configs = {"goal": '["Do the work"]', "instruction": "[]", "toolkits": "{1}", **configs}
+        session.add_all([superagi_stub.AgentConfiguration(agent_id=agent.id, key=key, value=value)
+                         for key, value in configs.items()])
+        session.commit()
+        return agent
+    return make
+
+
+@pytest.fixture
+def make_execution(session):
+    """
+    Returns a function creating an execution of an agent.
+    """
+    def make(agent, status="RUNNING", **columns):
+        agent_execution = superagi_stub.AgentExecution(agent_id=agent.id, name=f"Run of {agent.name}", status=status,
+                                                       **columns)
+        session.add(agent_execution)
+        session.commit()
+        return agent_execution
+    return make
@@ -0,0 +1,148 @@
+import io
+import os
+
+import pytest
+
+import agent_manager_helpers_blobs
+from superagi.models.resource import Resource
+from agent_manager_helpers_blobs import BlobStore
+from agent_manager_helpers_resources import ResourceManager
+from agent_manager_models import ResourceBlob
+
+
+@pytest.fixture
+def blob_store(session, config, monkeypatch):
+    # Clones fall back to copies on filesystems without copy-on-write, which is enough to test with
+    config(AGENT_MANAGER_DEDUP_RESOURCES="true")
+    monkeypatch.setattr(agent_manager_helpers_blobs, "supports_reflink", lambda directory: True)
+    return BlobStore(session)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def _add_resource(session, blob_store, agent_execution, name, content):
+    blob = blob_store.put(io.BytesIO(content.encode()), 1024)
+    resource = Resource(name=name, path=blob.path, storage_type="FILE", size=blob.size, channel="OUTPUT",
+                        agent_id=agent_execution.agent_id, agent_execution_id=agent_execution.id)
+    session.add(resource)
+    session.flush()
+    blob_store.add_reference(resource.id, blob.digest)
+    session.commit()
+    return resource, blob
+
+
+def test_handed_over_files_do_not_alias_the_blob(session, blob_store, make_agent, make_execution):
+    parent = make_execution(make_agent("Parent"))
+    child_agent = make_agent("Child")
+    child = make_execution(child_agent)
+    _, blob = _add_resource(session, blob_store, parent, "report.txt", "draft")
+
+    (resource,) = ResourceManager(child_agent.id, session).transfer_files(["report.txt"], make_agent("Other"), parent,
+                                                                          child)
+    assert _read(resource.path) == "draft"
+    assert not os.path.samefile(resource.path, blob.path)
+
+    with open(resource.path, "w") as f:
+        f.write("edited by the child")
+    assert _read(blob.path) == "draft"
+    assert session.query(ResourceBlob).one().ref_count == 2
+
+
+def test_collect_garbage_deletes_unreferenced_blobs(session, blob_store, make_agent, make_execution):
+    agent_execution = make_execution(make_agent())
+    kept, kept_blob = _add_resource(session, blob_store, agent_execution, "kept.txt", "kept")
+    dropped, dropped_blob = _add_resource(session, blob_store, agent_execution, "dropped.txt", "dropped")
+    session.delete(dropped)
+    session.commit()
+
+    assert blob_store.collect_garbage(grace_seconds=0) == 1
+
+    assert [blob.digest for blob in session.query(ResourceBlob).all()] == [kept_blob.digest]
+    assert os.path.exists(kept_blob.path) and not os.path.exists(dropped_blob.path)
+
+
+def test_dedup_is_ignored_without_copy_on_write(session, config, make_agent, make_execution, monkeypatch):
+    config(AGENT_MANAGER_DEDUP_RESOURCES="true")
+    monkeypatch.setattr(agent_manager_helpers_blobs, "supports_reflink", lambda directory: False)
+    agent_execution = make_execution(make_agent())
+    with open("report.txt", "w") as f:
+        f.write("report")
+    session.add(Resource(name="report.txt", path="report.txt", storage_type="FILE", size=6, channel="INPUT",
+                         agent_id=agent_execution.agent_id, agent_execution_id=agent_execution.id))
+    session.commit()
+
+    assert not BlobStore.is_enabled()
+    assert BlobStore(session).migrate_existing() == 0
+    assert not os.path.exists("workspace/blobs") or not any(files for _, _, files in os.walk("workspace/blobs"))
+    assert session.query(ResourceBlob).count() == 0
+
+
+class FakeS3:
+    class exceptions:
+        class ClientError(Exception):
+            def __init__(self, code):
+                self.response = {"Error": {"Code": code}}
+
+    def __init__(self, objects):
+        self.objects = dict(objects)
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.ClientError("404")
+        return {"ContentLength": len(self.objects[Key])}
+
+    def upload_fileobj(self, file, Bucket, Key, Config=None):
+        self.objects[Key] = file.read()
+
+    def copy(self, source, Bucket, Key):
+        self.objects[Key] = self.objects[source["Key"]]
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+
+def test_migrate_keeps_the_s3_keys_agents_read(session, config, make_agent, make_execution):
+    config(STORAGE_TYPE="S3", BUCKET_NAME="bucket")
+    agent_execution = make_execution(make_agent())
+    session.add_all([Resource(name=name, path=f"resources/{name}", storage_type="S3", size=6, channel="INPUT",
+                              agent_id=agent_execution.agent_id, agent_execution_id=agent_execution.id)
+                     for name in ("a.txt", "b.txt")])
+    session.commit()
+    s3 = FakeS3({"resources/a.txt": b"report", "resources/b.txt": b"report"})
+
+    assert BlobStore(session, s3).migrate_existing() == 2
+
+    (blob,) = session.query(ResourceBlob).all()
+    assert sorted(s3.objects) == sorted(["resources/a.txt", "resources/b.txt", blob.path])
+    assert {resource.path for resource in session.query(Resource).all()} == {"resources/a.txt", "resources/b.txt"}
+    assert blob.ref_count == 2
+
+
+class _Upload(io.BytesIO):
+    filename = "report.txt"
+
+
+def test_s3_uploads_and_hand_offs_land_on_per_agent_keys(session, config, make_agent, make_execution, monkeypatch):
+    config(STORAGE_TYPE="S3", BUCKET_NAME="bucket", AGENT_MANAGER_DEDUP_RESOURCES="true",
+           RESOURCES_INPUT_ROOT_DIR="/workspace/input/{agent_id}")
+    s3 = FakeS3({})
+    monkeypatch.setattr(ResourceManager, "s3", s3)
+    parent_agent, child_agent = make_agent("Parent"), make_agent("Child")
+    parent, child = make_execution(parent_agent), make_execution(child_agent)
+
+    uploaded = ResourceManager(parent_agent.id, session).upload(_Upload(b"report"), "report.txt", 6, "text/plain",
+                                                                parent.id)
+    (handed_over,) = ResourceManager(child_agent.id, session).transfer_files(["report.txt"], parent_agent, parent,
+                                                                             child)
+
+    (blob,) = session.query(ResourceBlob).all()
+    assert uploaded.path == f"resources/workspace/input/{parent_agent.id}/report.txt"
+    assert handed_over.path == f"resources/workspace/input/{child_agent.id}/report.txt"
+    assert s3.objects[uploaded.path] == s3.objects[handed_over.path] == s3.objects[blob.path] == b"report"
+    assert blob.ref_count == 2
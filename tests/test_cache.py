@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from agent_manager_helpers_cache import get_agent_catalog, TTLCache
+
+
+def _other_process(engine, statement, **params):
+    # Written on its own connection, the way the SuperAGI API process would
+    with engine.begin() as connection:
+        connection.execute(text(statement), params)
+
+
+def test_ttl_cache_reloads_on_version_change():
+    cache = TTLCache(ttl=60)
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get_or_load_version("key", 1, loader) == 1
+    assert cache.get_or_load_version("key", 1, loader) == 1
+    assert cache.get_or_load_version("key", 2, loader) == 2
+    assert len(loads) == 2
+
+
+def test_catalog_sees_agents_created_elsewhere(engine, session, project, make_agent):
+    make_agent("Writer", "Writes reports")
+    catalog = get_agent_catalog()
+    entry = catalog.get(lambda: session, project.toolkit.id)
+    assert [name for _, name, _ in entry.agents] == ["Writer"]
+    assert catalog.get(lambda: session, project.toolkit.id) is entry
+
+    _other_process(engine, "INSERT INTO agents (name, description, project_id, is_deleted, created_at, updated_at) "
+                           "VALUES ('Reviewer', 'Reviews reports', :project_id, 0, :now, :now)",
+                   project_id=project.project.id, now=datetime.now())
+
+    entry = catalog.get(lambda: session, project.toolkit.id)
+    assert [name for _, name, _ in entry.agents] == ["Writer", "Reviewer"]
+    assert "Reviewer" in entry.agent_lines
+
+
+def test_catalog_sees_agents_renamed_elsewhere(engine, session, project, make_agent):
+    agent = make_agent("Writer", "Writes reports")
+    catalog = get_agent_catalog()
+    catalog.get(lambda: session, project.toolkit.id)
+
+    _other_process(engine, "UPDATE agents SET name = 'Editor', updated_at = :now WHERE id = :id",
+                   id=agent.id, now=datetime.now() + timedelta(seconds=1))
+
+    entry = catalog.get(lambda: session, project.toolkit.id)
+    assert [name for _, name, _ in entry.agents] == ["Editor"]
+    assert [result[0] for result in entry.index.search("editor")] == [agent.id]
+
+
+def test_config_snapshot_sees_changes_made_elsewhere(engine, session, make_agent):
+    from agent_manager_helpers_data import get_agent_config_snapshot
+
+    agent = make_agent(model="gpt-4", toolkits="{1,2}")
+    assert get_agent_config_snapshot(session, agent.id)["model"] == "gpt-4"
+
+    _other_process(engine, "UPDATE agent_configurations SET value = 'gpt-4o', updated_at = :now "
+                           "WHERE agent_id = :id AND key = 'model'",
+                   id=agent.id, now=datetime.now() + timedelta(seconds=1))
+    assert get_agent_config_snapshot(session, agent.id)["model"] == "gpt-4o"
+
+    _other_process(engine, "DELETE FROM agent_configurations WHERE agent_id = :id AND key = 'model'", id=agent.id)
+    assert "model" not in get_agent_config_snapshot(session, agent.id)
+
+
+def test_config_snapshot_copies_are_independent(session, make_agent):
+    from agent_manager_helpers_data import get_agent_config_snapshot
+
+    agent = make_agent(toolkits="{1,2}")
+    get_agent_config_snapshot(session, agent.id)["toolkits"].append(3)
+
+    assert get_agent_config_snapshot(session, agent.id)["toolkits"] == [1, 2]
@@ -0,0 +1,21 @@
+from superagi_stub import Agent, connect_db
+
+from agent_manager_helpers_db import get_engine, session_scope
+
+
+def test_engine_is_superagis(engine):
+    assert get_engine() is connect_db()
+
+
+def test_nested_scopes_share_the_outer_session(engine, project):
+    with session_scope() as outer:
+        outer.add(Agent(name="Outer", project_id=project.project.id))
+        with session_scope() as inner:
+            assert inner is outer
+            inner.add(Agent(name="Inner", project_id=project.project.id))
+        # Still open and uncommitted after the inner block
+        assert outer.is_active
+        outer.flush()
+
+    with session_scope() as session:
+        assert sorted(agent.name for agent in session.query(Agent).all()) == ["Inner", "Outer"]
@@ -0,0 +1,37 @@
+from superagi.tools.base_tool import BaseToolkitConfiguration
+from agent_manager_dynamic_agent import DynamicAgentTool
+
+
+def _bind(session, project, agent, agent_execution):
+    tool = DynamicAgentTool()
+    tool.toolkit_config = BaseToolkitConfiguration(session=session, toolkit_id=project.toolkit.id)
+    tool.agent_id = agent.id
+    tool.agent_execution_id = agent_execution.id
+    return tool
+
+
+def test_each_tool_lists_the_agents_relevant_to_its_own_goal(session, project, config, make_agent, make_execution):
+    config(AGENT_MANAGER_DYNAMIC_AGENT_TOP_K=1)
+    class_description = DynamicAgentTool.DynamicAgentToolDescription
+    make_agent("Translator", "Translates documents into French")
+    make_agent("Accountant", "Prepares invoices and tax returns")
+    writer = make_agent("Writer", goal='["Translate the report into French"]')
+    bookkeeper = make_agent("Bookkeeper", goal='["File the tax returns and invoices"]')
+
+    writer_tool = _bind(session, project, writer, make_execution(writer))
+    bookkeeper_tool = _bind(session, project, bookkeeper, make_execution(bookkeeper))
+
+    assert "Translator" in writer_tool.description and "Accountant" not in writer_tool.description
+    assert "Accountant" in bookkeeper_tool.description and "Translator" not in bookkeeper_tool.description
+    assert "Translator" in writer_tool.description
+    assert DynamicAgentTool.DynamicAgentToolDescription == class_description
+
+
+def test_binding_the_tool_does_not_query_the_database(session, project, make_agent, make_execution, monkeypatch):
+    agent = make_agent("Writer")
+    agent_execution = make_execution(agent)
+    loads = []
+    monkeypatch.setattr(DynamicAgentTool, "set_attributes", lambda self: loads.append(self))
+
+    _bind(session, project, agent, agent_execution)
+    assert loads == []
@@ -0,0 +1,48 @@
+import threading
+import time
+
+import pytest
+
+from superagi.models.agent_execution import AgentExecution
+from agent_manager_helpers_data import execute_fan_out_agent_tool
+
+
+def _finish_runs_of(session_factory, agent_ids, delay=0.2):
+    def finish():
+        time.sleep(delay)
+        session = session_factory()
+        try:
+            for agent_execution in session.query(AgentExecution).filter(AgentExecution.agent_id.in_(agent_ids)).all():
+                agent_execution.status = "COMPLETED"
+            session.commit()
+        finally:
+            session.close()
+    thread = threading.Thread(target=finish)
+    thread.start()
+    return thread
+
+
+@pytest.mark.parametrize("job_timeout", [0, None])
+def test_fan_out_without_a_timeout_waits_for_every_job(session, session_factory, config, make_agent, make_execution,
+                                                       job_timeout):
+    config(AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    source = make_agent("Lead")
+    workers = [make_agent("Researcher"), make_agent("Writer")]
+    thread = _finish_runs_of(session_factory, [worker.id for worker in workers])
+
+    result = execute_fan_out_agent_tool(session, source.id, make_execution(source).id,
+                                        [{"target_agent_id": worker.id} for worker in workers], job_timeout=job_timeout)
+    thread.join()
+
+    assert result["wait_state"] == "Success"
+    # The session stays usable after the configuration of each target agent was read from it
+    assert [job["execution"].status for job in result["jobs"]] == ["COMPLETED", "COMPLETED"]
+
+
+def test_fan_out_size_is_limited(session, config, make_agent, make_execution):
+    config(AGENT_MANAGER_MAX_FAN_OUT=1)
+    source = make_agent("Lead")
+
+    with pytest.raises(ValueError, match="at most 1"):
+        execute_fan_out_agent_tool(session, source.id, make_execution(source).id,
+                                   [{"target_agent_id": source.id}] * 2)
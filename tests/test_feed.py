@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from agent_manager_helpers_data import get_agent_execution_feed, get_agent_execution_feed_digest
+from superagi.models.agent_execution_feed import AgentExecutionFeed
+
+
+def _add_feeds(session, agent_execution, *entries):
+    feeds = [AgentExecutionFeed(agent_execution_id=agent_execution.id, agent_id=agent_execution.agent_id, role=role,
+                                feed=feed) for role, feed in entries]
+    session.add_all(feeds)
+    session.commit()
+    return feeds
+
+
+def test_digest_reads_entries_of_every_role(session, make_agent, make_execution):
+    agent_execution = make_execution(make_agent())
+    _add_feeds(session, agent_execution, ("system", "You are an agent"), ("user", "Write the report"),
+               ("tool", "Error: the file was not found"))
+
+    digest = get_agent_execution_feed_digest(agent_execution.id, session)
+
+    assert digest["final_result"]["feed"] == "Write the report"
+    assert [entry["feed"] for entry in digest["errors"]] == ["Error: the file was not found"]
+    assert [entry["feed"] for entry in digest["tail"]] == ["You are an agent"]
+
+
+def test_feed_time_fields_are_current(session, make_agent, make_execution, monkeypatch):
+    import agent_manager_helpers_data
+
+    agent_execution = make_execution(make_agent())
+    _add_feeds(session, agent_execution, ("user", "Write the report"), ("system", "You are an agent"))
+    assert [feed["time_difference"]["hours"] for feed in get_agent_execution_feed(agent_execution.id, session)["feeds"]] \
+        == [0, 0]
+
+    later = datetime.now() + timedelta(hours=2, minutes=5)
+    monkeypatch.setattr(agent_manager_helpers_data, "datetime", type("later", (datetime,), {"now": staticmethod(lambda: later)}))
+    feeds = get_agent_execution_feed(agent_execution.id, session)["feeds"]
+
+    assert [feed["time_difference"]["hours"] for feed in feeds] == [2, 2]
+    assert [(feed["role"], feed["feed"]) for feed in feeds] == [("user", "Write the report"), ("system", "You are an agent")]
+    assert all(isinstance(feed, dict) for feed in feeds)
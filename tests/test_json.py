@@ -0,0 +1,25 @@
+import enum
+import json
+from datetime import datetime
+
+import pytest
+
+import agent_manager_helpers
+from agent_manager_helpers import dumps
+
+
+class Color(enum.Enum):
+    RED = 1
+
+
+@pytest.mark.skipif(agent_manager_helpers.orjson is None, reason="orjson is not installed")
+def test_orjson_backend_encodes_like_json(session, make_agent, make_execution, monkeypatch):
+    agent_execution = make_execution(make_agent(), last_execution_time=datetime(2024, 5, 1, 12, 30, 15, 250))
+    value = {"execution": agent_execution, "color": Color.RED, "colors": [Color.RED],
+             "at": datetime(2024, 5, 1, 12, 30)}
+
+    monkeypatch.setattr(agent_manager_helpers, "_json_backend", "json")
+    expected = json.loads(dumps(value))
+    monkeypatch.setattr(agent_manager_helpers, "_json_backend", "orjson")
+    assert json.loads(dumps(value)) == expected
+    assert expected["color"] == "RED"
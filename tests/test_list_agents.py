@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from superagi.tools.base_tool import BaseToolkitConfiguration
+from agent_manager_helpers_data import get_agents
+from agent_manager_list_agent import ListAgentTool
+
+
+def test_pages_through_agents(session, project, make_agent):
+    agents = [make_agent(f"Agent {index}") for index in range(3)]
+
+    first = get_agents(session, project.toolkit.id, limit=2)
+    assert [agent.id for agent in first.agents] == [agents[0].id, agents[1].id]
+    last = get_agents(session, project.toolkit.id, limit=2, after_id=first.next_after_id)
+    assert [agent.id for agent in last.agents] == [agents[2].id]
+    assert last.next_after_id is None
+
+
+def test_limit_zero_returns_an_empty_page(session, project, make_agent):
+    make_agent()
+
+    listing = get_agents(session, project.toolkit.id, limit=0)
+    assert listing.agents == [] and listing.next_after_id is None
+    assert json.loads(listing.to_json())["project"]["id"] == project.project.id
+
+
+def test_unknown_profile_lists_the_valid_ones(session, project, make_agent):
+    make_agent()
+    tool = ListAgentTool(toolkit_config=BaseToolkitConfiguration(session=session, toolkit_id=project.toolkit.id))
+
+    assert json.loads(tool._execute(profile="summary"))["agents"]
+    with pytest.raises(ValueError, match="expected one of: full, summary"):
+        tool._execute(profile="short")
+
+
+def _list_tool(session, project):
+    return ListAgentTool(toolkit_config=BaseToolkitConfiguration(session=session, toolkit_id=project.toolkit.id))
+
+
+def test_summary_profile_keeps_identifying_fields(session, project, make_agent):
+    agent = make_agent("Writer", "Writes things")
+
+    listing = json.loads(_list_tool(session, project)._execute(profile="summary"))
+    assert listing["agents"] == [{"id": agent.id, "name": "Writer", "description": "Writes things"}]
+
+
+def test_fields_take_precedence_over_the_profile(session, project, make_agent):
+    agent = make_agent("Writer")
+
+    listing = json.loads(_list_tool(session, project)._execute(fields=["id", "name"], profile="summary"))
+    assert listing["agents"] == [{"id": agent.id, "name": "Writer"}]
+
+
+def test_compact_listing_is_a_table(session, project, make_agent):
+    first, second = make_agent("First"), make_agent("Second")
+
+    listing = json.loads(_list_tool(session, project)._execute(fields=["id", "name"], compact=True))
+    assert listing["agents"] == {"columns": ["id", "name"], "rows": [[first.id, "First"], [second.id, "Second"]]}
+
+
+def test_ndjson_has_a_line_per_agent(session, project, make_agent):
+    first, second = make_agent("First"), make_agent("Second")
+
+    lines = _list_tool(session, project)._execute(profile="summary", output_format="ndjson").splitlines()
+    header, *agents = [json.loads(line) for line in lines]
+    assert header["project"]["id"] == project.project.id and header["next_after_id"] is None
+    assert [agent["id"] for agent in agents] == [first.id, second.id]
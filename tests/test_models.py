@@ -0,0 +1,28 @@
+from sqlalchemy import inspect, text
+
+import agent_manager_models
+import superagi_stub
+from agent_manager_models import AGENT_MANAGER_MODELS, AGENT_MANAGER_SCHEMA_VERSION, ensure_agent_manager_tables
+
+
+def test_tables_stay_out_of_superagis_metadata():
+    for model in AGENT_MANAGER_MODELS:
+        assert model.__tablename__ not in superagi_stub.DBBaseModel.metadata.tables
+
+
+def test_tables_are_created_and_upgraded_by_version(engine, monkeypatch):
+    ensure_agent_manager_tables(engine)
+    assert {model.__tablename__ for model in AGENT_MANAGER_MODELS} <= set(inspect(engine).get_table_names())
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT version FROM agent_manager_schema")).scalar() == AGENT_MANAGER_SCHEMA_VERSION
+
+    monkeypatch.setattr(agent_manager_models, "AGENT_MANAGER_SCHEMA_VERSION", AGENT_MANAGER_SCHEMA_VERSION + 1)
+    monkeypatch.setattr(agent_manager_models, "AGENT_MANAGER_SCHEMA_UPGRADES", {
+        AGENT_MANAGER_SCHEMA_VERSION + 1: ["ALTER TABLE agent_manager_run_tree ADD COLUMN label VARCHAR"]})
+    monkeypatch.setattr(agent_manager_models, "_ready_engines", set())
+    ensure_agent_manager_tables(engine)
+    ensure_agent_manager_tables(engine)
+
+    assert "label" in [column["name"] for column in inspect(engine).get_columns("agent_manager_run_tree")]
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT version FROM agent_manager_schema")).scalar() == AGENT_MANAGER_SCHEMA_VERSION + 1
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from superagi.models.agent_execution import AgentExecution
+from agent_manager_helpers_notify import ExecutionNotifier, StatusWatcher, wait_for_agent_execution
+
+
+def _later(delay, change):
+    thread = threading.Timer(delay, change)
+    thread.start()
+    return thread
+
+
+def test_notifier_wakes_only_waiters_of_the_changed_execution():
+    notifier = ExecutionNotifier()
+    snapshot = notifier.snapshot([1, 2])
+    notifier.publish(3, "COMPLETED")
+    assert notifier.wait_any(snapshot, 0.05) == []
+
+    _later(0.1, lambda: notifier.publish(2, "COMPLETED"))
+    started = time.monotonic()
+    assert notifier.wait_any(snapshot, 5) == [2]
+    assert time.monotonic() - started < 1
+
+
+def test_waiter_wakes_on_a_committed_status_change(session_factory, session, make_agent, make_execution):
+    agent_execution = make_execution(make_agent())
+
+    def finish():
+        other = session_factory()
+        other.query(AgentExecution).filter(AgentExecution.id == agent_execution.id).one().status = "COMPLETED"
+        other.commit()
+        other.close()
+    thread = _later(0.1, finish)
+    waited = wait_for_agent_execution(session, agent_execution, max_wait_time=5, poll_interval=60)
+    thread.join()
+
+    assert agent_execution.status == "COMPLETED"
+    assert waited < 1
+
+
+def test_waiter_polls_for_changes_nobody_announced(session_factory, session, make_agent, make_execution):
+    agent_execution = make_execution(make_agent())
+
+    def finish_behind_the_orms_back():
+        with session_factory() as other:
+            other.execute(AgentExecution.__table__.update().values(status="COMPLETED"))
+            other.commit()
+    thread = _later(0.1, finish_behind_the_orms_back)
+    waited = wait_for_agent_execution(session, agent_execution, max_wait_time=5, poll_interval=0.3)
+    thread.join()
+
+    assert agent_execution.status == "COMPLETED"
+    assert 0.3 <= waited < 2
+
+
+def test_watcher_handles_a_burst_of_changes_in_one_round(engine):
+    notifier = ExecutionNotifier()
+    rounds = []
+    watcher = StatusWatcher(notifier, interval=60, tasks={"count": lambda session: rounds.append(time.monotonic())},
+                            min_interval=0.5)
+    watcher.start()
+    try:
+        for agent_execution_id in range(20):
+            notifier.publish(agent_execution_id, "COMPLETED")
+            time.sleep(0.01)
+        time.sleep(0.8)
+    finally:
+        watcher.stop()
+        watcher.join()
+
+    # The first round at start, then one for the whole burst
+    assert len(rounds) == 2
+    assert rounds[1] - rounds[0] >= 0.5
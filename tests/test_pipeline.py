@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+import superagi_stub
+from superagi.models.agent_execution import AgentExecution
+from agent_manager_helpers_pipeline import run_agent_pipeline
+
+
+def _finish(session, agent_execution_id, status="COMPLETED"):
+    session.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).one().status = status
+    session.commit()
+
+
+def _started_ids():
+    return [args[0] for args, _ in superagi_stub.execute_agent.calls]
+
+
+def test_pipeline_resumes_without_starting_stages_twice(session, config, make_agent, make_execution):
+    # A single worker slot is never blocked, so each call checks on the stages once and returns
+    config(AGENT_MANAGER_WORKER_SLOTS=1, AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    source = make_agent("Lead")
+    source_execution = make_execution(source)
+    research, write = make_agent("Researcher"), make_agent("Writer")
+    stages = [{"name": "research", "target_agent_id": research.id},
+              {"name": "write", "target_agent_id": write.id, "depends_on": ["research"]}]
+
+    result = run_agent_pipeline(session, source.id, source_execution.id, stages)
+    assert [stage["wait_state"] for stage in result["stages"]] == ["Waiting", "Pending"]
+    research_id = result["stages"][0]["agent_execution_id"]
+
+    resumed = run_agent_pipeline(session, source.id, source_execution.id, pipeline_id=result["pipeline_id"])
+    assert resumed["stages"][0]["agent_execution_id"] == research_id
+    assert _started_ids() == [research_id]
+
+    _finish(session, research_id)
+    resumed = run_agent_pipeline(session, source.id, source_execution.id, pipeline_id=result["pipeline_id"])
+    assert [stage["wait_state"] for stage in resumed["stages"]] == ["Success", "Waiting"]
+    write_id = resumed["stages"][1]["agent_execution_id"]
+    assert _started_ids() == [research_id, write_id]
+
+    _finish(session, write_id)
+    resumed = run_agent_pipeline(session, source.id, source_execution.id, pipeline_id=result["pipeline_id"])
+    assert resumed["status"] == "COMPLETED" and resumed["wait_state"] == "Success"
+    assert _started_ids() == [research_id, write_id]
+
+
+def test_pipeline_size_is_limited(session, config, make_agent, make_execution):
+    config(AGENT_MANAGER_MAX_PIPELINE_STAGES=2)
+    source = make_agent("Lead")
+    stages = [{"name": f"stage_{index}", "target_agent_id": source.id} for index in range(3)]
+
+    with pytest.raises(ValueError, match="at most 2"):
+        run_agent_pipeline(session, source.id, make_execution(source).id, stages)
+
+
+def test_stage_timeout_is_limited(session, config, make_agent, make_execution):
+    config(AGENT_MANAGER_AWAIT_MAX_TIMEOUT=0.2, AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    source, worker = make_agent("Lead"), make_agent("Worker")
+
+    started = time.monotonic()
+    result = run_agent_pipeline(session, source.id, make_execution(source).id, [{"target_agent_id": worker.id}],
+                                stage_timeout=600)
+
+    assert time.monotonic() - started < 5
+    assert result["stages"][0]["wait_state"] == "Timeout (0.2 seconds)"
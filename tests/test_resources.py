@@ -0,0 +1,140 @@
+import io
+import os
+
+import pytest
+
+import superagi_stub
+from superagi.models.resource import Resource
+from agent_manager_helpers_resources import ResourceManager
+
+
+class Upload(io.BytesIO):
+    """
+    An uploaded file that records the sizes it was read with.
+    """
+
+    filename = "report.txt"
+
+    def __init__(self, content):
+        super().__init__(content)
+        self.reads = []
+
+    def read(self, size=-1):
+        self.reads.append(size)
+        return super().read(size)
+
+
+def test_chunk_size_is_configurable_but_at_least_5_mb(config):
+    assert ResourceManager.get_chunk_size() == 8 * 1024 * 1024
+    config(AGENT_MANAGER_UPLOAD_CHUNK_SIZE=16 * 1024 * 1024)
+    assert ResourceManager.get_chunk_size() == 16 * 1024 * 1024
+    config(AGENT_MANAGER_UPLOAD_CHUNK_SIZE=1024)
+    assert ResourceManager.get_chunk_size() == 5 * 1024 * 1024
+
+
+def test_upload_streams_in_chunks_and_measures_the_size(session, config, make_agent, make_execution):
+    config(AGENT_MANAGER_UPLOAD_CHUNK_SIZE=1024)
+    agent = make_agent()
+    agent_execution = make_execution(agent)
+    content = os.urandom(12 * 1024 * 1024)
+    upload = Upload(content)
+
+    resource = ResourceManager(agent.id, session).upload(upload, "report.txt", 1, "text/plain", agent_execution.id)
+
+    assert set(upload.reads) == {5 * 1024 * 1024}
+    assert resource.size == len(content)
+    with open(resource.path, "rb") as f:
+        assert f.read() == content
+    assert os.listdir(os.path.dirname(resource.path)) == ["report.txt"]
+    assert superagi_stub.summarize_resource.calls[-1][0] == (agent.id, resource.id)
+
+
+def test_upload_rejects_unsupported_file_types(session, make_agent):
+    agent = make_agent()
+
+    with pytest.raises(ValueError, match="not supported"):
+        ResourceManager(agent.id, session).upload(Upload(b"MZ"), "tool.exe", 2, "application/octet-stream")
+
+
+def _add_resource(session, agent, path, content, storage_type="FILE"):
+    if storage_type == "FILE":
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+    resource = Resource(name=os.path.basename(path), path=path, storage_type=storage_type, size=len(content),
+                        channel="OUTPUT", agent_id=agent.id)
+    session.add(resource)
+    session.commit()
+    return resource
+
+
+def test_ranged_reads_of_local_files(session, config, make_agent):
+    config(AGENT_MANAGER_DOWNLOAD_CHUNK_SIZE=4)
+    agent = make_agent()
+    resource = _add_resource(session, agent, "workspace/output/report.txt", b"0123456789")
+    manager = ResourceManager(agent.id, session)
+
+    assert manager.download_range(resource.id, 2, 3) == b"234"
+    assert manager.download_range(resource.id, 8) == b"89"
+    assert manager.download_range(resource.id, 8, 10) == b"89"
+    assert manager.download_range(resource.id, 20) == b""
+    assert list(manager.iter_chunks(resource.id, offset=1, length=7)) == [b"1234", b"567"]
+    assert list(manager.iter_chunks(resource.id, chunk_size=6)) == [b"012345", b"6789"]
+    with pytest.raises(ValueError, match="Invalid byte range"):
+        manager.download_range(resource.id, -1)
+
+
+def test_memory_mapped_reads(session, make_agent):
+    agent = make_agent()
+    resource = _add_resource(session, agent, "workspace/output/report.txt", b"0123456789")
+    empty = _add_resource(session, agent, "workspace/output/empty.txt", b"")
+    manager = ResourceManager(agent.id, session)
+
+    with manager.open_mmap(resource.id) as mapping:
+        assert mapping[3:6] == b"345"
+    with manager.open_mmap(empty.id) as mapping:
+        assert len(mapping) == 0
+
+
+class RangedS3:
+    class exceptions:
+        class ClientError(Exception):
+            def __init__(self, code):
+                self.response = {"Error": {"Code": code}}
+
+    def __init__(self, content):
+        self.content = content
+        self.ranges = []
+
+    def get_object(self, Bucket, Key, Range):
+        self.ranges.append(Range)
+        start, end = Range[len("bytes="):].split("-")
+        if int(start) >= len(self.content):
+            raise self.exceptions.ClientError("InvalidRange")
+        body = self.content[int(start):int(end) + 1 if end else None]
+        return {"Body": RangedS3.Body(body)}
+
+    class Body(io.BytesIO):
+        def iter_chunks(self, chunk_size):
+            while True:
+                chunk = self.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+
+def test_ranged_reads_of_s3_objects_use_one_ranged_get(session, config, make_agent, monkeypatch):
+    config(BUCKET_NAME="bucket")
+    s3 = RangedS3(b"0123456789")
+    monkeypatch.setattr(ResourceManager, "s3", s3)
+    agent = make_agent()
+    resource = _add_resource(session, agent, "resources/report.txt", b"0123456789", storage_type="S3")
+    manager = ResourceManager(agent.id, session)
+
+    assert list(manager.iter_chunks(resource.id, chunk_size=2, offset=2, length=5)) == [b"23", b"45", b"6"]
+    assert manager.download_range(resource.id, 7) == b"789"
+    assert manager.download_range(resource.id, 20) == b""
+    assert s3.ranges == ["bytes=2-6", "bytes=7-", "bytes=20-"]
+    with pytest.raises(ValueError, match="only supported for FILE"):
+        with manager.open_mmap(resource.id):
+            pass
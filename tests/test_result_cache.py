@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from agent_manager_helpers_resources import ResourceManager
+from agent_manager_helpers_result_cache import find_cached_run, get_run_cache_key, remember_run
+
+CONFIG = {"goal": ["Summarize the report"]}
+
+
+@pytest.fixture
+def request_run(session, make_agent, make_execution):
+    """
+    Returns a function computing the cache key of a run of "Worker" requested by `source`.
+    """
+    worker = make_agent("Worker")
+
+    def cache_key(source, files=(), config=CONFIG):
+        return get_run_cache_key(session, source.agent_id, source.id, worker.id, config, list(files))
+    cache_key.worker = worker
+    return cache_key
+
+
+def _write_input(agent_id, name, content):
+    path = os.path.join(f"workspace/input/{agent_id}", name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def test_same_request_hits_until_the_run_expires(session, request_run, make_agent, make_execution):
+    source = make_execution(make_agent("Lead"))
+    cached = make_execution(request_run.worker, status="COMPLETED")
+    cache_key = request_run(source)
+    assert find_cached_run(session, cache_key) is None
+
+    remember_run(session, cache_key, request_run.worker.id, cached.id)
+
+    assert find_cached_run(session, request_run(source)) is cached
+    assert find_cached_run(session, request_run(source, config={"goal": ["Something else"]})) is None
+    assert find_cached_run(session, cache_key, ttl=0) is None
+    assert find_cached_run(session, cache_key) is None
+
+
+def test_other_parents_get_their_own_runs(session, request_run, make_agent, make_execution):
+    source, other = make_execution(make_agent("Lead")), make_execution(make_agent("Reviewer"))
+    remember_run(session, request_run(source), request_run.worker.id,
+                 make_execution(request_run.worker, status="COMPLETED").id)
+
+    assert find_cached_run(session, request_run(other)) is None
+
+
+def test_changed_input_files_miss(session, request_run, make_agent, make_execution):
+    source = make_execution(make_agent("Lead"))
+    _write_input(source.agent_id, "report.txt", "draft")
+    cache_key = request_run(source, ["report.txt"])
+    remember_run(session, cache_key, request_run.worker.id, make_execution(request_run.worker, status="COMPLETED").id)
+
+    assert request_run(source, ["report.txt"]) == cache_key
+    _write_input(source.agent_id, "report.txt", "final")
+    assert request_run(source, ["report.txt"]) != cache_key
+    assert request_run(source, ["missing.txt"]) is None
+
+
+class HeadOnlyS3:
+    def __init__(self, etag):
+        self.etag = etag
+
+    def head_object(self, Bucket, Key):
+        return {"ETag": self.etag, "ContentLength": 5}
+
+    def get_object(self, Bucket, Key):
+        raise AssertionError("input files must not be downloaded to compute the key")
+
+
+def test_s3_inputs_are_keyed_without_downloading(request_run, config, make_agent, make_execution, monkeypatch):
+    config(STORAGE_TYPE="S3", BUCKET_NAME="bucket")
+    source = make_execution(make_agent("Lead"))
+    monkeypatch.setattr(ResourceManager, "s3", HeadOnlyS3('"first"'))
+    cache_key = request_run(source, ["report.txt"])
+
+    monkeypatch.setattr(ResourceManager, "s3", HeadOnlyS3('"second"'))
+    assert cache_key is not None and request_run(source, ["report.txt"]) != cache_key
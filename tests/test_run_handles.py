@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from superagi.models.agent_execution import AgentExecution
+from superagi.models.agent_execution_feed import AgentExecutionFeed
+from agent_manager_helpers_data import await_agent_runs, execute_save_scheduled_agent_tool, format_run_handle, \
+    parse_run_handle
+
+
+def _add_feed(session, agent_execution_id, agent_id, feed):
+    session.add(AgentExecutionFeed(agent_execution_id=agent_execution_id, agent_id=agent_id, role="assistant", feed=feed))
+    session.commit()
+
+
+def test_handles_round_trip():
+    assert parse_run_handle(format_run_handle(3, 14, 15)) == (3, 14, 15)
+    assert parse_run_handle(format_run_handle(3, 14)) == (3, 14, None)
+    assert parse_run_handle("14") == (None, 14, None)
+    with pytest.raises(ValueError):
+        parse_run_handle("3:fourteen")
+
+
+def test_await_returns_new_feed_entries_until_the_run_finishes(session, session_factory, config, make_agent,
+                                                                make_execution):
+    config(AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    source, worker = make_agent("Lead"), make_agent("Worker")
+    started = execute_save_scheduled_agent_tool(session, source.id, make_execution(source).id, worker.id,
+                                                wait_for_complete=False)
+    agent_execution_id = started["agent_execution_id"]
+    assert started["wait_state"] == "Never Waited"
+
+    _add_feed(session, agent_execution_id, worker.id, "Researching")
+    (run,) = await_agent_runs(session, [started["handle"]], timeout=0)["runs"]
+    assert (run["done"], run["wait_state"]) == (False, "Running")
+    assert [feed["feed"] for feed in run["feed"]["feeds"]] == ["Researching"]
+
+    def finish():
+        other = session_factory()
+        _add_feed(other, agent_execution_id, worker.id, "Done")
+        other.query(AgentExecution).filter(AgentExecution.id == agent_execution_id).one().status = "COMPLETED"
+        other.commit()
+        other.close()
+    thread = threading.Timer(0.1, finish)
+    thread.start()
+    result = await_agent_runs(session, [run["handle"]], timeout=5)
+    thread.join()
+
+    (run,) = result["runs"]
+    assert result["wait_state"] == "Done"
+    assert (run["status"], run["wait_state"]) == ("COMPLETED", "Success")
+    assert [feed["feed"] for feed in run["feed"]["feeds"]] == ["Done"]
+    (run,) = await_agent_runs(session, [run["handle"]], timeout=0)["runs"]
+    assert run["feed"]["feeds"] == []
+
+
+def test_await_reports_unknown_runs(session, make_agent, make_execution):
+    other = make_execution(make_agent("Other"))
+
+    runs = await_agent_runs(session, ["999:999:0", format_run_handle(other.agent_id + 1, other.id)], timeout=0)["runs"]
+
+    assert [run["wait_state"] for run in runs] == ["Not Found", "Not Found"]
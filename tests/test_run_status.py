@@ -0,0 +1,78 @@
+import threading
+
+from sqlalchemy import event
+
+from superagi.models.agent_execution import AgentExecution
+from superagi.models.agent_execution_feed import AgentExecutionFeed
+from agent_manager_helpers_data import get_agent_run_statuses, poll_agent_run_statuses
+
+
+def test_statuses_are_read_in_one_query_in_the_order_given(session, make_agent, make_execution, engine):
+    agent = make_agent()
+    running = make_execution(agent, num_of_calls=2, num_of_tokens=20)
+    finished = make_execution(agent, status="COMPLETED")
+    session.add(AgentExecutionFeed(agent_execution_id=running.id, agent_id=agent.id, role="user", feed="Go"))
+    session.commit()
+
+    running_id, finished_id = running.id, finished.id
+    queries = []
+    def count_query(*args):
+        queries.append(args[2])
+    event.listen(engine, "before_cursor_execute", count_query)
+    try:
+        statuses = get_agent_run_statuses(session, [finished_id, 999, running_id, finished_id])
+    finally:
+        event.remove(engine, "before_cursor_execute", count_query)
+
+    assert len(queries) == 1
+    assert [(status["agent_execution_id"], status["status"], status["done"]) for status in statuses] == \
+        [(finished_id, "COMPLETED", True), (999, None, True), (running_id, "RUNNING", False)]
+    assert (statuses[2]["num_of_calls"], statuses[2]["feed_length"]) == (2, 1)
+
+
+def test_long_poll_returns_on_status_changes(session, session_factory, config, make_agent, make_execution):
+    config(AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    agent = make_agent()
+    first, second = make_execution(agent), make_execution(agent)
+
+    def finish():
+        other = session_factory()
+        other.query(AgentExecution).filter(AgentExecution.id == second.id).one().status = "COMPLETED"
+        other.commit()
+        other.close()
+    thread = threading.Timer(0.1, finish)
+    thread.start()
+    result = poll_agent_run_statuses(session, [first.id, second.id], timeout=5, poll_interval=60)
+    thread.join()
+
+    assert result["changed"] == [second.id]
+    assert [status["status"] for status in result["runs"]] == ["RUNNING", "COMPLETED"]
+
+
+def test_long_poll_notices_new_feed_entries_on_its_fallback_read(session, session_factory, config, make_agent,
+                                                                  make_execution):
+    config(AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    agent = make_agent()
+    agent_execution = make_execution(agent)
+
+    def write_feed():
+        other = session_factory()
+        other.add(AgentExecutionFeed(agent_execution_id=agent_execution.id, agent_id=agent.id, role="assistant",
+                                     feed="Thinking"))
+        other.commit()
+        other.close()
+    thread = threading.Timer(0.1, write_feed)
+    thread.start()
+    result = poll_agent_run_statuses(session, [agent_execution.id], timeout=5, poll_interval=0.3)
+    thread.join()
+
+    assert result["changed"] == [agent_execution.id]
+    assert result["runs"][0]["feed_length"] == 1
+
+
+def test_zero_timeout_only_reads(session, make_agent, make_execution):
+    agent_execution = make_execution(make_agent())
+
+    result = poll_agent_run_statuses(session, [agent_execution.id], timeout=0)
+
+    assert result["changed"] == [] and result["runs"][0]["status"] == "RUNNING"
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from superagi.models.agent_execution import AgentExecution
+from agent_manager_helpers_data import execute_save_scheduled_agent_tool, get_agent_execution
+from agent_manager_helpers_run_tree import cancel_timed_out_run, get_run_tree_totals, record_child_run
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_terminating_a_parent_cancels_its_tree_without_waiters(session, config, make_agent, make_execution):
+    config(AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    agent = make_agent()
+    parent = make_execution(agent)
+    child = make_execution(agent, status="PAUSED")
+    grandchild = make_execution(agent, status="WAITING_FOR_PERMISSION")
+    finished = make_execution(agent, status="COMPLETED")
+    record_child_run(session, child.id, parent.id)
+    record_child_run(session, grandchild.id, child.id)
+    record_child_run(session, finished.id, parent.id)
+
+    parent.status = "TERMINATED"
+    session.commit()
+
+    def cancelled():
+        session.expire_all()
+        return get_run_tree_totals(session, parent.id)["active_runs"] == 0
+    _wait_until(cancelled)
+    assert [child.status, grandchild.status, finished.status] == ["TERMINATED", "TERMINATED", "COMPLETED"]
+
+
+def test_timed_out_run_is_cancelled_with_its_tree(session, make_agent, make_execution):
+    agent = make_agent()
+    parent = make_execution(agent)
+    child = make_execution(agent)
+    grandchild = make_execution(agent, status="PAUSED")
+    record_child_run(session, child.id, parent.id)
+    record_child_run(session, grandchild.id, child.id)
+
+    assert sorted(cancel_timed_out_run(session, child)) == sorted([child.id, grandchild.id])
+    assert [child.status, grandchild.status, parent.status] == ["TERMINATED", "TERMINATED", "RUNNING"]
+
+
+def test_paused_run_is_kept_unless_its_parent_was_terminated(session, make_agent, make_execution):
+    agent = make_agent()
+    parent = make_execution(agent)
+    child = make_execution(agent, status="WAITING_FOR_PERMISSION")
+    record_child_run(session, child.id, parent.id)
+
+    assert cancel_timed_out_run(session, child) == []
+    assert child.status == "WAITING_FOR_PERMISSION"
+
+    parent.status = "TERMINATED"
+    session.commit()
+    assert cancel_timed_out_run(session, child) == [child.id]
+    assert child.status == "TERMINATED"
+
+
+def test_run_asking_for_permission_survives_the_wait(session, session_factory, config, make_agent, make_execution):
+    config(AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    source, target = make_agent("Lead"), make_agent("Worker")
+    source_execution = make_execution(source)
+
+    def ask_for_permission():
+        time.sleep(0.2)
+        other = session_factory()
+        try:
+            other.query(AgentExecution).filter(AgentExecution.agent_id == target.id).one().status = \
+                "WAITING_FOR_PERMISSION"
+            other.commit()
+        finally:
+            other.close()
+    thread = threading.Thread(target=ask_for_permission)
+    thread.start()
+    result = execute_save_scheduled_agent_tool(session, source.id, source_execution.id, target.id)
+    thread.join()
+
+    assert result["wait_state"] != "Errored"
+    session.expire_all()
+    assert get_agent_execution(result["agent_execution_id"], session).status == "WAITING_FOR_PERMISSION"
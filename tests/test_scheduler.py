@@ -0,0 +1,75 @@
+import time
+
+import superagi_stub
+import agent_manager_helpers_scheduler
+from agent_manager_helpers_scheduler import dispatch_queued_runs, submit_run
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def _submit(session, make_execution, agent, priority=0):
+    agent_execution = make_execution(agent, status="CREATED")
+    return agent_execution, submit_run(session, agent_execution, priority=priority)
+
+
+def test_queued_run_starts_when_a_run_finishes_without_waiters(session, config, make_agent, make_execution):
+    config(AGENT_MANAGER_MAX_RUNS=1, AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    agent = make_agent()
+    first, first_started = _submit(session, make_execution, agent)
+    second, second_started = _submit(session, make_execution, agent)
+    assert (first_started, second_started) == (True, False)
+
+    first.status = "COMPLETED"
+    session.commit()
+
+    def started():
+        session.refresh(second)
+        return second.status == "RUNNING"
+    _wait_until(started)
+    assert [args[0] for args, _ in superagi_stub.execute_agent.calls] == [first.id, second.id]
+
+
+def test_agent_at_its_limit_does_not_hold_up_others(session, config, make_agent, make_execution, monkeypatch):
+    config(AGENT_MANAGER_MAX_RUNS_PER_AGENT=1, AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    monkeypatch.setattr(agent_manager_helpers_scheduler, "DISPATCH_BATCH_SIZE", 2)
+    busy, idle = make_agent("Busy"), make_agent("Idle")
+    results = [_submit(session, make_execution, busy, priority=5)[1] for _ in range(4)]
+    assert results == [True, False, False, False]
+
+    assert _submit(session, make_execution, idle)[1]
+
+
+def test_dispatch_leaves_the_callers_transaction_alone(session, config, make_agent, make_execution):
+    config(AGENT_MANAGER_MAX_RUNS=1, AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    agent = make_agent()
+    running, _ = _submit(session, make_execution, agent)
+    _submit(session, make_execution, agent)
+    running.status = "COMPLETED"
+    session.commit()
+
+    pending = superagi_stub.Agent(name="Pending", project_id=agent.project_id)
+    session.add(pending)
+    dispatch_queued_runs(session)
+
+    assert pending in session.new
+    session.rollback()
+    assert session.query(superagi_stub.Agent).filter_by(name="Pending").first() is None
+
+
+def test_paused_run_keeps_its_slot(session, config, make_agent, make_execution):
+    config(AGENT_MANAGER_MAX_RUNS=1, AGENT_MANAGER_BACKGROUND_INTERVAL=60)
+    agent = make_agent()
+    first, _ = _submit(session, make_execution, agent)
+    second, _ = _submit(session, make_execution, agent)
+
+    first.status = "WAITING_FOR_PERMISSION"
+    session.commit()
+
+    assert dispatch_queued_runs(session) == 0
+    session.refresh(second)
+    assert second.status == "CREATED"
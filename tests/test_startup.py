@@ -0,0 +1,10 @@
+from bench_agent_manager import check_startup, measure_startup
+
+
+def test_building_the_tools_stays_cheap():
+    startup = measure_startup(repeat=1)
+
+    assert startup["construct_queries"] == 0
+    assert startup["heavy_modules"] == []
+    # Timings vary too much between machines to hold a test run to the benchmark's budget
+    assert check_startup(startup, budget_ms=float("inf")) == []
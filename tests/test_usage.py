@@ -0,0 +1,70 @@
+from superagi_stub import AgentExecution
+
+import agent_manager_helpers_usage
+import agent_manager_models
+from agent_manager_helpers_usage import get_agent_usage_totals, rebuild_agent_usage_rollups
+from agent_manager_models import AGENT_MANAGER_SCHEMA_VERSION
+
+
+def test_totals_count_executions_made_before_first_use(session, make_agent, make_execution):
+    agent = make_agent()
+    make_execution(agent, num_of_calls=2, num_of_tokens=200)
+    make_execution(agent, num_of_calls=3, num_of_tokens=300)
+
+    assert get_agent_usage_totals(session, agent.id) == (5, 500)
+
+
+def test_totals_follow_changes_of_agents_first_seen_later(session_factory, session, make_agent, make_execution):
+    first = make_agent("First")
+    make_execution(first, num_of_calls=1, num_of_tokens=10)
+    assert get_agent_usage_totals(session, first.id) == (1, 10)
+
+    # An agent without a rollup row yet: its changes create the row instead of being dropped
+    second = make_agent("Second")
+    assert get_agent_usage_totals(session, second.id) == (0, 0)
+    other = session_factory()
+    agent_execution = AgentExecution(agent_id=second.id, status="RUNNING", num_of_calls=4, num_of_tokens=40)
+    other.add(agent_execution)
+    other.commit()
+    agent_execution.num_of_calls = 6
+    other.commit()
+    assert get_agent_usage_totals(session, second.id) == (6, 40)
+
+    other.delete(agent_execution)
+    other.commit()
+    other.close()
+    assert get_agent_usage_totals(session, second.id) == (0, 0)
+
+
+def test_rebuild_repairs_drift(session, make_agent, make_execution):
+    agent = make_agent()
+    make_execution(agent, num_of_calls=2, num_of_tokens=20)
+    get_agent_usage_totals(session, agent.id)
+    # Written behind the ORM's back
+    session.execute(AgentExecution.__table__.update().values(num_of_calls=7))
+    session.commit()
+    assert get_agent_usage_totals(session, agent.id) == (2, 20)
+
+    rebuild_agent_usage_rollups(session, [agent.id])
+    assert get_agent_usage_totals(session, agent.id) == (7, 20)
+
+
+def _restart(monkeypatch):
+    # What a new process knows: nothing is ready yet
+    monkeypatch.setattr(agent_manager_helpers_usage, "_ready_engines", set())
+    monkeypatch.setattr(agent_manager_models, "_ready_engines", set())
+
+
+def test_rollups_are_seeded_once_and_after_upgrades(session, make_agent, make_execution, monkeypatch):
+    agent = make_agent()
+    make_execution(agent, num_of_calls=2, num_of_tokens=20)
+    assert get_agent_usage_totals(session, agent.id) == (2, 20)
+    session.execute(AgentExecution.__table__.update().values(num_of_calls=7))
+    session.commit()
+
+    _restart(monkeypatch)
+    assert get_agent_usage_totals(session, agent.id) == (2, 20)
+
+    _restart(monkeypatch)
+    monkeypatch.setattr(agent_manager_models, "AGENT_MANAGER_SCHEMA_VERSION", AGENT_MANAGER_SCHEMA_VERSION + 1)
+    assert get_agent_usage_totals(session, agent.id) == (7, 20)